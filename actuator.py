@@ -0,0 +1,203 @@
+# actuator.py
+"""
+执行器工作线程
+所有舵机动作 (手动喂食、定时喂食、检测触发的自动喂食、疏通抖动) 都提交到同一个队列，由单个线程依次执行。
+请求处理函数和检测线程只提交任务并拿到 Future，不会在持有锁的情况下阻塞在硬件上，
+两个喂食动作也不会同时驱动舵机 (舵机绑定到执行器线程后，其他线程无法直接驱动)。
+
+每个任务有一个递增的 job id，状态依次为 queued -> running -> done / failed (排队中取消为 cancelled)；
+最近的任务可以通过 job() 查询，状态变化时调用 on_status 推送 (例如作为 SSE 事件)。
+任务抛出异常时先调用 on_failure (关闭喂食口)，再把任务标记为失败。
+"""
+import collections
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Job:
+
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "status": self.status,
+            "submitted": round(self.submitted, 3),
+            "started": round(self.started, 3) if self.started else None,
+            "finished": round(self.finished, 3) if self.finished else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _summarize(result):
+    """把任务返回值转换为可以 JSON 序列化的摘要"""
+    if hasattr(result, "to_dict"):
+        return result.to_dict()
+    if result is None or isinstance(result, (bool, int, float, str, dict, list)):
+        return result
+    return str(result)
+
+
+class Actuator:
+    """
+    参数:
+        on_failure: 任务抛出异常后在执行器线程中调用，让硬件回到安全状态
+        on_status: 任务状态变化时调用 on_status(job_dict)
+        history: 保留多少个已结束任务供查询
+    """
+
+    def __init__(self, name="actuator", on_failure=None, on_status=None, history=100):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._closed = False
+        self._ids = itertools.count(1)
+        self._jobs = collections.OrderedDict() # job id -> Job
+        self.history = history
+        self.on_failure = on_failure
+        self.on_status = on_status
+        self.current = None # 正在执行的任务名
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    @property
+    def thread(self):
+        return self._thread
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def own(self, device):
+        """把设备 (例如 servo_motion.ServoController) 绑定到执行器线程，之后只能通过提交任务驱动"""
+        device.bind(self._thread)
+
+    def _notify(self, job):
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(job.to_dict())
+        except Exception as e:
+            print(f"执行器状态推送失败: {e}")
+
+    def _set_status(self, job, status, **fields):
+        with self._lock:
+            job.status = status
+            for key, value in fields.items():
+                setattr(job, key, value)
+        self._notify(job)
+
+    def submit(self, label, fn, *args, **kwargs):
+        """提交一个硬件动作，返回 concurrent.futures.Future (结果为 fn 的返回值，future.job_id 为任务 id)"""
+        future = Future()
+        with self._lock:
+            job = Job(next(self._ids), label)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history and next(iter(self._jobs.values())).finished:
+                self._jobs.popitem(last=False)
+        future.job_id = job.id
+        job.future = future
+        if self._closed:
+            error = RuntimeError("执行器已关闭")
+            self._set_status(job, "failed", error=str(error), finished=time.time())
+            future.set_exception(error)
+            return future
+        self._notify(job)
+        self._queue.put((job, future, fn, args, kwargs))
+        return future
+
+    def cancel(self, job_id):
+        """取消还在排队的任务，返回是否成功"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # 执行器线程取出任务时 set_running_or_notify_cancel 会跳过已取消的 Future
+            if job is None or job.status != "queued" or not job.future.cancel():
+                return False
+            self.cancelled += 1
+        self._set_status(job, "cancelled", finished=time.time())
+        return True
+
+    def job(self, job_id):
+        """查询任务状态，不存在 (或已从历史中移除) 时返回 None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def jobs(self, limit=20):
+        with self._lock:
+            return [job.to_dict() for job in list(self._jobs.values())[-limit:]][::-1]
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def busy(self):
+        with self._lock:
+            return self.current is not None or not self._queue.empty()
+
+    def _fail_safe(self, label):
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure()
+        except Exception as e:
+            print(f"执行器任务 {label} 失败后恢复安全状态时出错: {e}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self.current = job.label
+            self._set_status(job, "running", started=time.time())
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                print(f"执行器任务 {job.label} 失败: {e}")
+                self._fail_safe(job.label)
+                with self._lock:
+                    self.failed += 1
+                    self.current = None
+                self._set_status(job, "failed", error=str(e), finished=time.time())
+                future.set_exception(e)
+            else:
+                with self._lock:
+                    self.completed += 1
+                    self.current = None
+                self._set_status(job, "done", result=_summarize(result), finished=time.time())
+                future.set_result(result)
+
+    def close(self, timeout=None):
+        """停止接收新任务，执行完已排队的任务后退出"""
+        self._closed = True
+        self._queue.put(None)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "current": self.current,
+                "pending": self._queue.qsize(),
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+            }
@@ -0,0 +1,20 @@
+# annotate.py
+"""在视频帧上绘制检测框（轻量实现，不依赖 ultralytics 的 plot()）"""
+import cv2
+
+BOX_COLOR = (0, 200, 255) # BGR
+TEXT_COLOR = (0, 0, 0)
+
+
+def draw_detections(frame_bgr, detections, color=BOX_COLOR):
+    """在 BGR 帧上原地绘制检测框和标签"""
+    for det in detections:
+        x1, y1, x2, y2 = (int(v) for v in det["box"])
+        cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), color, 2)
+        label = f"{det['name']} {det['conf']:.2f}"
+        (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
+        top = max(y1 - text_h - baseline, 0)
+        cv2.rectangle(frame_bgr, (x1, top), (x1 + text_w, top + text_h + baseline), color, -1)
+        cv2.putText(frame_bgr, label, (x1, top + text_h), cv2.FONT_HERSHEY_SIMPLEX, 0.45,
+                    TEXT_COLOR, 1, cv2.LINE_AA)
+    return frame_bgr
@@ -6,17 +6,56 @@ import threading
 import hardware # 导入我们整合的硬件模块
 from flask import Flask, render_template, Response, request, jsonify, redirect, url_for, session, flash
 from picamera2 import Picamera2
-from ultralytics import YOLO
 import RPi.GPIO as GPIO # 需要导入 GPIO 以便 hardware 模块正常工作
 from functools import wraps
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import models # 导入我们创建的用户和喂食计划模型
+import inference_worker # 推理子进程池
+import inference_backend # 推理后端 (ultralytics / onnxruntime)
+from frame_ring import FrameRing, PicameraFrameSource
+from inference_scheduler import InferenceScheduler, BurstConfirmer
+from motion_gate import MotionGate
+import annotate # 检测框绘制
+from mjpeg_broadcaster import MJPEGBroadcaster, StreamProfile
+from event_hub import SnapshotHub
+from actuator import Actuator
+from feed_scheduler import FeedScheduler
+from sensor_history import SensorHistory
 from datetime import datetime, timedelta
 
 # --- 配置 ---
-WEIGHTS_PATH = "best.pt"
+WEIGHTS_PATH = "best.pt" # 模型路径，可改为导出的 best.onnx / best_int8.onnx 等
+INFERENCE_BACKEND = "ultralytics" # 推理后端: 'ultralytics' 或 'onnxruntime'
 IMG_SIZE = 320 # 图像大小，应与 detect.py 保持一致
 CONF_THRESHOLD = 0.5 # 置信度阈值
 DEVICE = "cpu" # 或者 "cuda" 如果有 GPU
+INFERENCE_WORKERS = 1 # 推理子进程数量，0 表示在 Flask 进程内推理
+INFERENCE_TIMEOUT = 10 # 单帧推理超时时间（秒）
+FRAME_RING_SLOTS = 8 # 共享内存帧环的槽位数量（需大于 BURST_SIZE + 2）
+INFER_IDLE_FPS = 2.0 # 空闲时的目标推理帧率
+INFER_ACTIVE_FPS = 8.0 # 最近检测到猫咪时的目标推理帧率
+INFER_ACTIVE_HOLD = 10.0 # 检测到猫咪后保持高推理帧率的时间（秒）
+MOTION_GATE_ENABLED = True # 是否启用运动门控（画面无变化时跳过推理）
+MOTION_ROI = None # 食盆区域 (x1, y1, x2, y2)，None 表示整幅画面
+MOTION_THRESHOLD = 0.01 # 变化像素比例阈值
+MOTION_PIXEL_DELTA = 25 # 灰度差阈值
+MOTION_MAX_SKIP = 30.0 # 最长连续跳过时间（秒），超过后强制推理一次
+BURST_ENABLED = True # 出现运动或首次检测到猫咪时，连拍多帧批量推理后投票确认
+BURST_SIZE = 4 # 连拍帧数 N
+BURST_VOTES = 3 # 至少 k 帧检测到猫咪才确认
+SCHEDULE_CATCH_UP = "latest" # 错过定时喂食时间槽时的补发策略: skip / latest / all
+SCHEDULE_GRACE = 60.0 # 到期后多少秒内执行仍算准时
+FEED_REQUEST_TIMEOUT = 30.0 # 手动喂食请求等待执行器完成的最长时间（秒）
+DB_WRITE_FLUSH = 1.0 # 喂食记录等批量写入数据库的间隔（秒）
+SENSOR_HISTORY_FLUSH = 60.0 # 传感器历史批量写入数据库的间隔（秒）
+# 视频流配置：客户端通过 /video_feed?profile=thumb 选择，同一配置的所有客户端共享一次编码
+JPEG_ENCODER = "auto" # auto / turbojpeg / opencv，auto 在装有 PyTurboJPEG 时使用 libjpeg-turbo
+STREAM_PROFILES = [
+    # 原始分辨率，跟随摄像头帧率；4:2:0 抽样在弱 Wi-Fi 下每帧字节数最少
+    StreamProfile("full", quality=75, subsampling="420", encoder=JPEG_ENCODER),
+    # 低带宽缩略图
+    StreamProfile("thumb", width=160, height=160, quality=50, fps=5, subsampling="420", encoder=JPEG_ENCODER),
+]
 
 # --- 全局变量 ---
 app = Flask(__name__)
@@ -24,8 +63,9 @@ app.secret_key = "cat_feeder_secret_key"  # 用于会话加密
 app.permanent_session_lifetime = timedelta(days=30)  # 设置会话有效期
 
 camera = None
-model = None
-last_frame = None # 用于存储最新的视频帧 (带标注)
+frame_source = None # 帧源 (Picamera2 或合成帧源)
+frame_ring = None # 共享内存帧环
+inference = None # 推理器 (InferenceWorkerPool 或 LocalInference)
 last_sensor_data = {
     "temperature": None,
     "humidity": None,
@@ -37,9 +77,21 @@ feeding_mode = "manual" # 'manual' or 'auto'
 feed_cooldown = 60 # 自动喂食冷却时间（秒）
 last_auto_feed_time = 0
 cat_detected_flag = False # 标记是否检测到猫
+last_detections = [] # 最近一次推理得到的检测框，供视频流绘制
+stream_broadcaster = MJPEGBroadcaster(STREAM_PROFILES) # 视频流广播器 (带标注的最新帧)
+inference_scheduler = InferenceScheduler(INFER_IDLE_FPS, INFER_ACTIVE_FPS, INFER_ACTIVE_HOLD)
+motion_gate = MotionGate(roi=MOTION_ROI, pixel_delta=MOTION_PIXEL_DELTA,
+                         motion_threshold=MOTION_THRESHOLD, max_skip_seconds=MOTION_MAX_SKIP)
+burst_confirmer = BurstConfirmer(BURST_SIZE, BURST_VOTES)
+feed_scheduler = None # 定时喂食调度器 (初始化数据库后创建)
+sensor_history = SensorHistory(flush_interval=SENSOR_HISTORY_FLUSH) # 温湿度、重量历史
+# 推送给浏览器的共享状态快照，字段与 /api/sensor_data 返回的一致
+state_hub = SnapshotHub(dict(last_sensor_data, mode=feeding_mode, schedules=[]))
+# 舵机执行器线程，所有喂食动作串行执行；任务失败时关闭喂食口，状态变化作为 job 事件推送
+actuator = Actuator(on_failure=hardware.close_gate_safely,
+                    on_status=lambda job: state_hub.publish_event("job", job))
 
 # 线程锁，用于安全地访问共享变量
-frame_lock = threading.Lock()
 sensor_lock = threading.Lock()
 mode_lock = threading.Lock()
 detection_lock = threading.Lock()
@@ -47,16 +99,28 @@ detection_lock = threading.Lock()
 # --- 初始化 ---
 def initialize_system():
     """初始化硬件、摄像头和模型"""
-    global camera, model
+    global camera, frame_source, frame_ring, inference, feed_scheduler
     print("正在初始化系统...")
     try:
         # 初始化数据库
         models.init_db()
+        models.start_write_queue(flush_interval=DB_WRITE_FLUSH)
+        feed_scheduler = FeedScheduler(run_scheduled_feed, catch_up=SCHEDULE_CATCH_UP, grace=SCHEDULE_GRACE)
+        schedules_changed(models.get_feeding_schedules())
+        models.add_schedule_listener(schedules_changed)
         print("数据库初始化成功。")
         
         # 初始化硬件 (GPIO, 传感器, 舵机)
         if not hardware.initialize_hardware():
             raise RuntimeError("硬件初始化失败!")
+        if hardware.feed_controller:
+            # 用最近的喂食记录恢复过冲补偿
+            hardware.feed_controller.model.seed(models.get_feed_overshoots())
+        hardware.feed_calibration.load(models.get_feed_calibration())
+        if hardware.servo:
+            # 之后舵机只能由执行器线程驱动
+            actuator.own(hardware.servo)
+        actuator.start()
         print("硬件初始化成功。")
 
         # 初始化摄像头
@@ -70,12 +134,21 @@ def initialize_system():
         time.sleep(2)
         print("摄像头启动成功。")
 
-        # 加载模型
-        model = YOLO(WEIGHTS_PATH)
+        # 创建共享内存帧环，摄像头画面直接写入预分配的槽位
+        frame_source = PicameraFrameSource(camera)
+        frame_ring = FrameRing(frame_source.shape, slots=FRAME_RING_SLOTS)
+
+        # 加载模型 (在推理子进程中加载)
+        inference = inference_worker.create_inference(
+            inference_backend.load_backend,
+            (INFERENCE_BACKEND, WEIGHTS_PATH, IMG_SIZE, CONF_THRESHOLD, DEVICE),
+            ring=frame_ring, workers=INFERENCE_WORKERS
+        )
         # 尝试进行一次推理以预热模型（可选）
-        dummy_frame = camera.capture_array("main")
-        model(dummy_frame, imgsz=IMG_SIZE, conf=CONF_THRESHOLD, device=DEVICE, verbose=False)
-        print(f"YOLO 模型 '{WEIGHTS_PATH}' 加载成功。")
+        frame_ring.capture(frame_source)
+        with frame_ring.pin_latest() as dummy_frame:
+            inference.infer(dummy_frame, timeout=INFERENCE_TIMEOUT)
+        print(f"YOLO 模型 '{WEIGHTS_PATH}' 加载成功 (后端: {INFERENCE_BACKEND}, 推理进程数: {INFERENCE_WORKERS})。")
 
         print("系统初始化完成。")
         return True
@@ -83,6 +156,10 @@ def initialize_system():
     except Exception as e:
         print(f"系统初始化过程中发生错误: {e}")
         # 尝试清理资源
+        if inference:
+            inference.close()
+        if frame_ring:
+            frame_ring.close()
         if camera:
             try:
                 camera.stop()
@@ -106,6 +183,10 @@ def sensor_reading_thread():
                 last_sensor_data["weight"] = weight if weight is not None else None
                 # cat_detected 状态由 detection_thread 更新
                 # last_detection_time 由 detection_thread 更新
+                sensor_values = {k: last_sensor_data[k] for k in ("temperature", "humidity", "weight")}
+            # 数值不变时不会产生推送
+            state_hub.update(**sensor_values)
+            sensor_history.append(time.time(), **sensor_values)
 
             # print(f"Sensor Update: T={temp}, H={hum}, W={weight}") # Debug
         except Exception as e:
@@ -115,55 +196,211 @@ def sensor_reading_thread():
         # 读取间隔
         time.sleep(2)
 
-def detection_thread():
-    """后台线程：持续进行猫咪检测和处理自动喂食"""
-    global last_frame, last_sensor_data, feeding_mode, last_auto_feed_time, cat_detected_flag
-    if not camera or not model:
-        print("错误：摄像头或模型未初始化，检测线程无法启动。")
+def schedules_changed(schedules):
+    """喂食计划增删改后由 models 回调：刷新推送给浏览器的计划列表并重建调度器的时间堆"""
+    state_hub.update(schedules=schedules)
+    feed_scheduler.reload(schedules)
+
+def run_scheduled_feed(slot):
+    """定时喂食时间槽到期 (调度线程回调)：自动模式下把喂食动作交给执行器，结果作为 feed 事件推送"""
+    with mode_lock:
+        current_mode = feeding_mode
+    if current_mode != 'auto':
+        print(f"定时喂食 {slot.time} 到期，当前为手动模式，不执行")
+        return
+
+    current_time = time.time()
+    if current_time - last_auto_feed_time <= feed_cooldown:
+        time_left = round(feed_cooldown - (current_time - last_auto_feed_time), 1)
+        print(f"定时喂食冷却中，还需等待 {time_left} 秒")
+        state_hub.publish_event("feed", {
+            "scheduled_feed": True, "feed_amount": slot.amount, "feed_success": False,
+            "feed_cooldown": True, "cooldown_time": time_left,
+            "feed_message": f"喂食冷却中，跳过 {slot.time} 的定时喂食",
+        })
         return
 
+    print(f"定时喂食计划触发，喂食量：{slot.amount}g")
+    future = actuator.submit("scheduled_feed", hardware.feed, slot.amount)
+    future.add_done_callback(lambda f: finish_scheduled_feed(slot, f))
+
+def finish_scheduled_feed(slot, future):
+    """执行器完成定时喂食后记录日志并通知浏览器；确实出粮时才开始喂食冷却"""
+    global last_auto_feed_time
+    event = {"scheduled_feed": True, "feed_amount": slot.amount}
+    error = future.exception()
+    result = future.result() if error is None else None
+    if result is not None and result.fed():
+        last_auto_feed_time = time.time()
+        # 闭环喂食提前结束 (卡料、料仓空) 时也按实际出粮量记录；记录归到计划的创建者名下
+        models.log_feeding(slot.user_id, slot.amount, 'auto', **result.log_fields())
+        event["feed_result"] = result.to_dict()
+    if result:
+        event.update(feed_success=True, feed_message=f"已执行定时喂食，{describe_feed(result)}")
+    else:
+        reason = str(error) if error else feed_failure_reason(result)
+        event.update(feed_success=False, feed_message=f"定时喂食失败：{reason}")
+        print(f"定时喂食执行失败：{reason}")
+    state_hub.publish_event("feed", event)
+
+def describe_feed(result):
+    """喂食结果的提示文字"""
+    if result.dispensed is None:
+        return f"喂食量：{result.requested}g"
+    return f"目标 {result.requested}g，实际出粮 {result.dispensed:.1f}g"
+
+def feed_failure_reason(result):
+    """喂食失败的原因说明"""
+    reasons = {
+        "stalled": "出粮停止，可能卡料或料仓已空",
+        "timeout": "超过最长喂食时间仍未达到目标",
+        "sensor": "称重数据中断",
+        "servo": "舵机控制失败，已尝试强制关闭喂食口",
+    }
+    reason = reasons.get(result.stopped_by, "舵机控制失败")
+    if result.dispensed is not None:
+        reason += f" (实际出粮 {result.dispensed:.1f}g)"
+    return reason
+
+def open_feeder_briefly():
+    """检测触发的自动喂食：打开舵机一段时间后关闭，返回是否成功"""
+    if not hardware.open_gate():
+        return False
+    time.sleep(2) # 保持打开一段时间（例如2秒）
+    if not hardware.close_gate():
+        raise RuntimeError("关闭喂食口失败") # 由执行器的失败处理再尝试一次
+    return True
+
+def run_manual_feed(user_id, amount, mode):
+    """手动喂食任务 (在执行器线程中运行)：喂食并记录，返回推送给浏览器的结果"""
+    result = hardware.feed(amount)
+    if result.fed():
+        # 闭环喂食提前结束时按实际出粮量记录
+        models.log_feeding(user_id, amount, mode, **result.log_fields())
+    message = f"成功喂食，{describe_feed(result)}" if result else f"喂食失败: {feed_failure_reason(result)}"
+    return {"ok": bool(result), "message": message, "feed": result.to_dict()}
+
+def capture_thread():
+    """
+    后台线程：按摄像头帧率采集画面
+    有客户端观看视频流时，叠加最近的检测框后按各码流配置编码一次；没有客户端时完全跳过绘制和编码
+    """
+    frame_bgr = None # 复用的 BGR 缓冲区
     while True:
-        current_time = time.time()
-        local_cat_detected = False # 本次循环是否检测到
         try:
-            # 捕获图像
-            frame_raw = camera.capture_array("main")
+            # 捕获图像 (直接写入帧环槽位，由摄像头控制节奏)
+            frame_ring.capture(frame_source)
 
-            # 进行推理
-            results = model(frame_raw, imgsz=IMG_SIZE, conf=CONF_THRESHOLD, device=DEVICE, verbose=False)
+            due_profiles = stream_broadcaster.due_profiles()
+            if not due_profiles:
+                continue
 
-            # 绘制结果并更新最新帧
-            annotated_frame_rgb = results[0].plot() # 假设 plot() 返回 RGB
+            with detection_lock:
+                detections = last_detections
 
-            # *** 新增：将颜色通道从 RGB 翻转到 BGR ***
-            annotated_frame_bgr = cv2.cvtColor(annotated_frame_rgb, cv2.COLOR_RGB2BGR)
+            # 将颜色通道从 RGB 翻转到 BGR，绘制检测框后交给广播器编码
+            with frame_ring.pin_latest() as frame:
+                frame_bgr = cv2.cvtColor(frame.array, cv2.COLOR_RGB2BGR, dst=frame_bgr)
+            annotate.draw_detections(frame_bgr, detections)
+            stream_broadcaster.publish(frame_bgr, due_profiles)
+        except Exception as e:
+            print(f"采集线程错误: {e}")
+            time.sleep(1)
+
+def has_cat(detections):
+    """检测结果中是否有猫"""
+    # 注意: 需要根据你的 'best.pt' 模型的实际类别来调整
+    return any(det["name"] == 'cat' for det in detections)
+
+def run_burst(first_frame, first_detections=None):
+    """
+    连拍确认：以 first_frame 为第一帧，再收集后续新帧凑满 BURST_SIZE 帧，作为一个批次推理后投票
+    first_detections 不为 None 表示第一帧已经推理过，直接使用其结果参与投票
+    返回:
+        (是否确认检测到猫, 最后一帧的检测结果, 最后一帧的序号, 参与投票的帧数)
+    """
+    frames = [first_frame]
+    try:
+        while len(frames) < burst_confirmer.size:
+            if frame_ring.wait_newer(frames[-1].seq, timeout=1.0) <= frames[-1].seq:
+                break
+            frames.append(frame_ring.pin_latest())
+        for frame in frames[1:]:
+            inference_scheduler.take(frame.seq)
+
+        if first_detections is None:
+            batch = inference.infer_batch(frames, timeout=INFERENCE_TIMEOUT)
+        else:
+            batch = [first_detections]
+            if len(frames) > 1:
+                batch += inference.infer_batch(frames[1:], timeout=INFERENCE_TIMEOUT)
+    finally:
+        # 第一帧由调用方负责释放
+        for frame in frames[1:]:
+            frame.release()
 
-            with frame_lock:
-                # 将处理后的 BGR 帧编码为 JPEG
-                ret, buffer = cv2.imencode('.jpg', annotated_frame_bgr) # 使用 BGR 帧进行编码
-                if ret:
-                    last_frame = buffer.tobytes()
+    confirmed = burst_confirmer.vote([has_cat(detections) for detections in batch])
+    return confirmed, batch[-1], frames[-1].seq, len(frames)
 
-            # 检查是否有检测到目标 (假设 'cat' 是类别 0 或特定类别名称)
-            detected_cats = 0
-            if len(results[0].boxes) > 0:
-                 # 检查检测到的类别名称或 ID
-                 # 注意: 需要根据你的 'best.pt' 模型的实际类别来调整
-                 for box in results[0].boxes:
-                     class_id = int(box.cls[0])
-                     class_name = model.names[class_id] # 获取类别名称
-                     # print(f"Detected: {class_name} (ID: {class_id})") # Debug
-                     if class_name == 'cat': # 或者使用 ID if class_id == 0:
-                         detected_cats += 1
+def detection_thread():
+    """后台线程：按调度器决定的帧率分析最新帧，处理猫咪检测和自动喂食"""
+    global last_sensor_data, feeding_mode, last_auto_feed_time, cat_detected_flag, last_detections
+    if not camera or not inference:
+        print("错误：摄像头或模型未初始化，检测线程无法启动。")
+        return
 
+    last_seq = -1
+    scene_idle = True # 上一帧是否被运动门控判定为静止
+    while True:
+        local_cat_detected = False # 本次循环是否检测到
+        try:
+            # 等待调度器允许下一次推理
+            wait = inference_scheduler.wait_time()
+            if wait > 0:
+                time.sleep(wait)
 
-            local_cat_detected = detected_cats > 0
+            # 丢弃旧帧：只分析帧环中最新的一帧
+            if frame_ring.wait_newer(last_seq, timeout=1.0) <= last_seq:
+                continue
+            current_time = time.time()
+            with detection_lock:
+                confirmed = cat_detected_flag
+            with frame_ring.pin_latest() as frame:
+                last_seq = frame.seq
+                # 运动门控：画面无变化时跳过推理，沿用上一次的检测结果
+                if MOTION_GATE_ENABLED and not motion_gate.check(frame.array):
+                    inference_scheduler.take(frame.seq, infer=False)
+                    scene_idle = True
+                    continue
+                motion_onset = MOTION_GATE_ENABLED and scene_idle
+                scene_idle = False
+
+                inference_scheduler.take(frame.seq)
+                infer_start = time.perf_counter()
+                inferred_frames = 1
+                if BURST_ENABLED and not confirmed and motion_onset:
+                    # 画面刚开始变化：直接连拍批量推理
+                    local_cat_detected, detections, last_seq, inferred_frames = run_burst(frame)
+                else:
+                    detections = inference.infer(frame, timeout=INFERENCE_TIMEOUT)
+                    local_cat_detected = has_cat(detections)
+                    if BURST_ENABLED and local_cat_detected and not confirmed:
+                        # 首次检测到猫咪：再连拍几帧投票确认，避免单帧误检
+                        local_cat_detected, detections, last_seq, inferred_frames = run_burst(frame, detections)
+                motion_gate.record_inference_time(time.perf_counter() - infer_start, inferred_frames)
+
+            inference_scheduler.record(local_cat_detected)
 
             # 更新全局检测状态
             with detection_lock:
+                last_detections = detections
                 cat_detected_flag = local_cat_detected
                 if local_cat_detected:
                     last_sensor_data["last_detection_time"] = current_time
+                detection_time = last_sensor_data["last_detection_time"]
+            # 检测时间取整到秒，猫咪在画面中时最多每秒推送一次
+            state_hub.update(cat_detected=local_cat_detected,
+                             last_detection_time=int(detection_time) if detection_time else None)
 
 
             # --- 自动喂食逻辑 ---
@@ -175,21 +412,14 @@ def detection_thread():
                  # 检查冷却时间
                  if current_time - last_auto_feed_time > feed_cooldown:
                      print("冷却时间已过，执行自动喂食...")
-                     success = hardware.set_servo_angle(90) # 打开舵机（假设90度是打开）
-                     if success:
-                         time.sleep(2) # 保持打开一段时间（例如2秒）
-                         hardware.set_servo_angle(0) # 关闭舵机（假设0度是关闭）
-                         last_auto_feed_time = current_time # 更新上次喂食时间
-                         print("自动喂食完成。")
-                     else:
-                         print("自动喂食舵机控制失败。")
+                     # 舵机动作交给执行器，检测线程继续分析画面
+                     last_auto_feed_time = current_time # 更新上次喂食时间
+                     future = actuator.submit("auto_feed", open_feeder_briefly)
+                     future.add_done_callback(
+                         lambda f: print("自动喂食完成。" if not f.exception() and f.result() else "自动喂食舵机控制失败。"))
                  else:
                      print(f"自动喂食冷却中... 还需 {feed_cooldown - (current_time - last_auto_feed_time):.1f} 秒")
 
-
-            # 短暂休眠，避免CPU占用过高，同时控制检测帧率
-            time.sleep(0.1) # 大约 10 FPS
-
         except Exception as e:
             print(f"检测线程错误: {e}")
             time.sleep(1) # 发生错误时等待长一点
@@ -289,102 +519,180 @@ def logout():
 @login_required
 def video_feed():
     """提供视频流"""
-    def generate_frames():
-        while True:
-            with frame_lock:
-                frame_bytes = last_frame
-            if frame_bytes is None:
-                # 可以生成一个 "无信号" 或 "加载中" 的图像
-                time.sleep(0.1)
-                continue
+    profile = request.args.get('profile', stream_broadcaster.default_profile)
+    if profile not in stream_broadcaster.profile_names():
+        return jsonify({"status": "error", "message": f"未知的视频流配置: {profile}"}), 400
+    fps = request.args.get('fps', type=float)
 
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.05) # 控制发送帧率
+    def generate_frames():
+        # 广播器在新帧编码后唤醒本客户端，没有新帧时不会重复发送
+        for frame_bytes in stream_broadcaster.stream(profile, fps=fps):
+            # 分段发送，避免每个客户端都把整帧拼接拷贝一次
+            yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+            yield frame_bytes
+            yield b'\r\n'
 
     return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/api/sensor_data')
 @login_required
 def api_sensor_data():
-    """提供最新的传感器数据和模式"""
-    global last_auto_feed_time
-    user_id = session.get('user_id')
-    
-    with sensor_lock, mode_lock, detection_lock:
-        data_copy = last_sensor_data.copy()
-        data_copy["mode"] = feeding_mode
-        # 结合 detection_lock 获取最新状态
-        data_copy["cat_detected"] = cat_detected_flag
-        
-        # 获取最新的喂食计划，用于前端显示
-        data_copy["schedules"] = models.get_feeding_schedules()
-        
-        # 检查是否需要根据时间计划进行喂食
-        should_feed, amount = models.should_feed_now()
-        if should_feed and feeding_mode == 'auto':
-            # 获取当前时间
-            current_time = time.time()
-            
-            # 检查是否超过喂食冷却时间
-            if current_time - last_auto_feed_time > feed_cooldown:
-                print(f"定时喂食计划触发，喂食量：{amount}g")
-                
-                # 实际执行喂食操作
-                try:
-                    hardware.feed(amount)
-                    # 更新最后喂食时间
-                    last_auto_feed_time = current_time
-                    # 记录喂食事件
-                    models.log_feeding(user_id, amount, 'auto')
-                    # 设置成功标志
-                    data_copy["scheduled_feed"] = True
-                    data_copy["feed_amount"] = amount
-                    data_copy["feed_success"] = True
-                    data_copy["feed_message"] = f"已执行定时喂食，喂食量：{amount}g"
-                except Exception as e:
-                    # 喂食失败
-                    data_copy["scheduled_feed"] = True
-                    data_copy["feed_amount"] = amount
-                    data_copy["feed_success"] = False
-                    data_copy["feed_message"] = f"定时喂食失败：{str(e)}"
-                    print(f"定时喂食执行失败：{str(e)}")
-            else:
-                # 喂食冷却中
-                time_left = feed_cooldown - (current_time - last_auto_feed_time)
-                data_copy["scheduled_feed"] = True
-                data_copy["feed_amount"] = amount
-                data_copy["feed_cooldown"] = True
-                data_copy["cooldown_time"] = round(time_left, 1)
-                data_copy["feed_message"] = f"喂食冷却中，还需等待 {round(time_left, 1)} 秒"
-                print(f"定时喂食冷却中，还需等待 {round(time_left, 1)} 秒")
-        else:
-            data_copy["scheduled_feed"] = False
-            
-    return jsonify(data_copy)
+    """提供最新的传感器数据和模式（不支持 SSE 的浏览器轮询使用）"""
+    return Response(state_hub.snapshot_json(), mimetype='application/json')
+
+@app.route('/api/events')
+@login_required
+def api_events():
+    """推送传感器、检测、模式和喂食计划的变化 (Server-Sent Events)"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    response = Response(state_hub.stream(last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # 反向代理不要缓冲事件流
+    return response
+
+@app.route('/api/sensor_history')
+@login_required
+def api_sensor_history():
+    """
+    传感器历史曲线
+    参数: field=temperature|humidity|weight, start/end 为秒级时间戳 (默认最近 24 小时),
+          resolution=0|60|3600|86400 (默认按时间跨度自动选择)
+    """
+    field = request.args.get('field', 'weight')
+    end = request.args.get('end', type=float) or time.time()
+    start = request.args.get('start', type=float) or end - 86400
+    resolution = request.args.get('resolution', type=int)
+    try:
+        return jsonify(sensor_history.query(field, start, end, resolution))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route('/api/feeding_stats')
+@login_required
+def api_feeding_stats():
+    """最近 days 天 (默认 90) 每天或每周的喂食次数和克数，按模式分组"""
+    days = request.args.get('days', 90, type=int)
+    group = request.args.get('group', 'day')
+    if not 1 <= days <= 3660 or group not in ('day', 'week'):
+        return jsonify({"status": "error", "message": "days 应为 1~3660，group 应为 day 或 week"}), 400
+    stats = models.get_feeding_stats(days, group)
+    if stats is None:
+        return jsonify({"status": "error", "message": "读取喂食统计失败"}), 500
+    return jsonify(stats)
+
+@app.route('/api/detection_stats')
+@login_required
+def api_detection_stats():
+    """提供检测流水线的运行统计"""
+    stats = {
+        "scheduler": inference_scheduler.stats(),
+        "motion_gate": motion_gate.stats(),
+        "burst": burst_confirmer.stats(),
+        "stream": stream_broadcaster.stats(),
+        "events": state_hub.stats(),
+    }
+    return jsonify(stats)
+
+@app.route('/api/feeder_status')
+@login_required
+def api_feeder_status():
+    """提供定时喂食调度器、舵机执行器、重量采样线程、闭环喂食控制器和心率血氧读取线程的状态"""
+    return jsonify({
+        "scheduler": feed_scheduler.stats(),
+        "actuator": actuator.stats(),
+        "servo": hardware.servo.stats() if hardware.servo else None,
+        "weight_sampler": hardware.weight_sampler_stats(),
+        "feed_controller": hardware.feed_controller.stats() if hardware.feed_controller else None,
+        "heart_rate_reader": hardware.heart_rate_reader_stats(),
+    })
+
+@app.route('/api/db_stats')
+@login_required
+def api_db_stats():
+    """提供数据库连接池和设置缓存的统计"""
+    return jsonify({
+        "pool": models.pool_stats(),
+        "settings_cache": models.settings_cache_stats(),
+        "write_queue": models.write_queue_stats(),
+        "sensor_history": sensor_history.stats(),
+    })
+
+@app.route('/api/detection_stats/reset', methods=['POST'])
+@login_required
+def api_detection_stats_reset():
+    """重置运动门控计数（例如每天开始统计前调用）"""
+    motion_gate.reset_stats()
+    return jsonify({"status": "success", "message": "统计已重置"})
 
 @app.route('/api/feed', methods=['POST'])
 @login_required
 def api_feed():
-    """触发喂食操作"""
+    """
+    触发喂食操作：提交到执行器后立即返回 job_id (202)，结果通过 /api/jobs/<id> 查询或 job 事件推送；
+    请求中 wait 为真时等待喂食完成再返回 (兼容旧的调用方式)
+    """
     user_id = session.get('user_id')
+    data = request.get_json(silent=True) or {}
     
     # 获取喂食量，如果未指定则使用默认值
-    feed_amount = request.json.get('amount') if request.is_json else None
+    feed_amount = data.get('amount')
     if not feed_amount:
         feed_amount = float(models.get_user_setting(user_id, 'default_feed_amount', '30'))
+    mode = 'manual' if feeding_mode == 'manual' else 'auto'
+    
+    # 发出喂食指令，由执行器线程驱动舵机并记录喂食事件
+    future = actuator.submit("manual_feed", run_manual_feed, user_id, feed_amount, mode)
+    if not data.get('wait'):
+        return jsonify({"status": "accepted", "job_id": future.job_id,
+                        "message": f"喂食指令已排队 ({feed_amount}g)"}), 202
     
     try:
-        # 发出喂食指令 (假设 hardware 模块有提供这样的接口)
-        hardware.feed(feed_amount)
-        
-        # 记录喂食事件
-        mode = 'manual' if feeding_mode == 'manual' else 'auto'
-        models.log_feeding(user_id, feed_amount, mode)
-        
-        return jsonify({"status": "success", "message": f"成功喂食 {feed_amount}g 猫粮"})
+        outcome = future.result(timeout=FEED_REQUEST_TIMEOUT)
+    except FutureTimeoutError:
+        return jsonify({"status": "error", "job_id": future.job_id,
+                        "message": "喂食指令已排队，但执行器长时间未完成，请稍后查看喂食记录"}), 504
     except Exception as e:
-        return jsonify({"status": "error", "message": f"喂食失败: {str(e)}"}), 500
+        return jsonify({"status": "error", "job_id": future.job_id, "message": f"喂食失败: {str(e)}"}), 500
+    status = "success" if outcome["ok"] else "error"
+    return jsonify({"status": status, "job_id": future.job_id, "message": outcome["message"],
+                    "result": outcome["feed"]}), 200 if outcome["ok"] else 500
+
+@app.route('/api/feeder/agitate', methods=['POST'])
+@login_required
+def api_feeder_agitate():
+    """抖动喂食口疏通卡料 (打开 -> 抖动 -> 关闭)，立即返回 job_id"""
+    def agitate():
+        if not hardware.open_gate():
+            raise RuntimeError("舵机控制失败")
+        hardware.agitate_gate()
+        if not hardware.close_gate():
+            raise RuntimeError("关闭喂食口失败")
+        return True
+    future = actuator.submit("agitate", agitate)
+    return jsonify({"status": "accepted", "job_id": future.job_id, "message": "疏通指令已排队"}), 202
+
+@app.route('/api/jobs')
+@login_required
+def api_jobs():
+    """最近的执行器任务"""
+    return jsonify(actuator.jobs(limit=request.args.get('limit', 20, type=int)))
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def api_job(job_id):
+    """查询执行器任务状态: queued / running / done / failed / cancelled"""
+    job = actuator.job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "任务不存在"}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def api_job_cancel(job_id):
+    """取消还在排队的任务"""
+    if not actuator.cancel(job_id):
+        return jsonify({"status": "error", "message": "任务不存在或已开始执行"}), 409
+    return jsonify({"status": "success", "message": "任务已取消"})
 
 @app.route('/api/mode', methods=['POST'])
 @login_required
@@ -399,9 +707,37 @@ def api_mode():
 
     with mode_lock:
         feeding_mode = new_mode
+    state_hub.update(mode=new_mode)
     print(f"喂食模式已切换为: {new_mode}")
     return jsonify({"status": "success", "message": f"模式已切换为 {new_mode}", "current_mode": new_mode})
 
+# --- 出粮流量标定 ---
+@app.route('/api/calibration')
+@login_required
+def api_calibration():
+    """查看流量标定模型和料仓余量估计"""
+    return jsonify(hardware.feed_calibration.stats())
+
+@app.route('/api/calibration/reset', methods=['POST'])
+@login_required
+def api_calibration_reset():
+    """丢弃学习到的流量模型，恢复为 FEED_RATE 先验"""
+    hardware.feed_calibration.reset()
+    return jsonify({"status": "success", "message": "流量标定已重置", "calibration": hardware.feed_calibration.stats()})
+
+@app.route('/api/calibration/refill', methods=['POST'])
+@login_required
+def api_calibration_refill():
+    """加粮后调用，可选参数 level 为加粮后的余量 (克)，默认加满"""
+    data = request.get_json(silent=True) or {}
+    level = data.get('level')
+    try:
+        level = hardware.feed_calibration.refill(None if level is None else float(level))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "无效的余量"}), 400
+    return jsonify({"status": "success", "message": f"料仓余量已设为 {level:.0f}g",
+                    "calibration": hardware.feed_calibration.stats()})
+
 # --- 喂食计划管理 ---
 @app.route('/api/schedule', methods=['POST'])
 @login_required
@@ -419,7 +755,7 @@ def add_schedule():
     
     try:
         amount = float(amount)
-        success, result = models.add_feeding_schedule(feed_time, amount)
+        success, result = models.add_feeding_schedule(feed_time, amount, session.get('user_id'))
         
         if success:
             return jsonify({
@@ -496,11 +832,8 @@ def update_settings():
     if 'auto_feed_enabled' in data:
         updates['auto_feed_enabled'] = '1' if data['auto_feed_enabled'] else '0'
     
-    # 更新设置
-    success = True
-    for key, value in updates.items():
-        if not models.set_user_setting(user_id, key, value):
-            success = False
+    # 在一个事务中更新所有设置
+    success = models.set_user_settings(user_id, updates)
     
     if success:
         return jsonify({"status": "success", "message": "设置更新成功"})
@@ -512,9 +845,12 @@ if __name__ == '__main__':
     if initialize_system():
         # 启动后台线程
         sensor_thread = threading.Thread(target=sensor_reading_thread, daemon=True)
+        capture_worker = threading.Thread(target=capture_thread, daemon=True)
         detect_thread = threading.Thread(target=detection_thread, daemon=True)
         sensor_thread.start()
+        capture_worker.start()
         detect_thread.start()
+        feed_scheduler.start()
 
         # 启动 Flask 应用
         # host='0.0.0.0' 允许局域网访问
@@ -525,6 +861,17 @@ if __name__ == '__main__':
 
     # 在程序退出时清理 GPIO (虽然 Flask run 通常会阻塞，但以防万一)
     print("应用即将退出，清理资源...")
+    state_hub.close()
+    sensor_history.flush()
+    models.stop_write_queue()
+    if feed_scheduler:
+        feed_scheduler.close()
+    actuator.close(timeout=15)
+    stream_broadcaster.close()
+    if inference:
+        inference.close()
+    if frame_ring:
+        frame_ring.close()
     if camera:
         try:
             camera.stop()
@@ -0,0 +1,150 @@
+# bench_actuator.py
+"""
+仿真测试：执行器队列 + 舵机运动曲线
+多个线程 (模拟 Flask 请求、检测线程、传感器回调) 同时提交喂食动作到 actuator.Actuator，
+舵机使用 fake_gpio.FakePWM。统计提交调用的耗时 (应与动作时长无关)，
+检查舵机指令全部来自执行器线程、各任务的执行区间互不重叠、任务失败后喂食口被关闭、
+排队中的任务可以取消，并比较平滑转动与直接跳转的单步最大角度变化。不满足校验时以非零状态退出。
+
+用法:
+    python bench_actuator.py --clients 4 --jobs 5
+"""
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+
+from actuator import Actuator
+from fake_gpio import FakePWM
+from servo_motion import ServoController, ramp_profile
+
+OPEN_ANGLE, CLOSE_ANGLE = 90, 0 # 与 hardware.py 一致
+
+
+class RecordingPWM(FakePWM):
+    """记录每条占空比指令及发出指令的线程"""
+
+    def __init__(self, pin, frequency):
+        super().__init__(pin, frequency)
+        self.writes = []
+
+    def ChangeDutyCycle(self, duty_cycle):
+        super().ChangeDutyCycle(duty_cycle)
+        self.writes.append((time.perf_counter(), threading.current_thread().name, duty_cycle))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行器队列与舵机运动曲线")
+    parser.add_argument("--clients", type=int, default=4, help="同时提交动作的线程数")
+    parser.add_argument("--jobs", type=int, default=5, help="每个线程提交的喂食次数")
+    parser.add_argument("--open-time", type=float, default=0.05, help="每次喂食的打开时间（秒）")
+    parser.add_argument("--ramp", type=float, default=0.1, help="开关喂食口的平滑转动时间（秒）")
+    args = parser.parse_args()
+
+    pwm = RecordingPWM(18, 50)
+    pwm.start(0)
+    servo = ServoController(pwm, settle=0.01)
+    closed_after_failure = []
+    spans = []
+    spans_lock = threading.Lock()
+
+    def close_gate_safely():
+        servo.move(CLOSE_ANGLE)
+        closed_after_failure.append(servo.angle)
+
+    def feed(open_time):
+        started = time.perf_counter()
+        servo.move(OPEN_ANGLE, args.ramp)
+        time.sleep(open_time)
+        servo.move(CLOSE_ANGLE, args.ramp)
+        servo.release()
+        with spans_lock:
+            spans.append((started, time.perf_counter()))
+        return open_time
+
+    actuator = Actuator(on_failure=close_gate_safely).start()
+    actuator.own(servo)
+
+    # 其他线程直接驱动舵机应被拒绝
+    try:
+        servo.move(OPEN_ANGLE)
+        guarded = False
+    except RuntimeError:
+        guarded = True
+
+    submit_times, futures = [], []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(args.jobs):
+            t0 = time.perf_counter()
+            future = actuator.submit("feed", feed, args.open_time)
+            with lock:
+                submit_times.append(time.perf_counter() - t0)
+                futures.append(future)
+
+    wall = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    submitted = time.perf_counter() - wall
+
+    # 打开喂食口后失败的任务，执行器应调用 on_failure 关闭喂食口
+    def jammed():
+        servo.move(OPEN_ANGLE)
+        raise RuntimeError("模拟卡料")
+    failing = actuator.submit("jammed", jammed)
+    queued = actuator.submit("feed", feed, args.open_time)
+    cancelled = actuator.cancel(queued.job_id)
+
+    for future in futures:
+        future.result(timeout=60)
+    failed = failing.exception(timeout=60) is not None
+    drained = time.perf_counter() - wall
+    actuator.close(timeout=5)
+
+    submit_times = np.array(submit_times) * 1e3
+    job_time = args.open_time + 2 * (args.ramp + servo.settle)
+    print(f"{len(futures)} 个喂食动作 ({args.clients} 个线程提交)，单个动作约 {job_time * 1e3:.0f}ms")
+    print(f"提交耗时: 平均 {submit_times.mean():.3f}ms，最大 {submit_times.max():.3f}ms (全部提交用时 {submitted * 1e3:.1f}ms)")
+    print(f"全部执行完成用时: {drained:.2f}s")
+
+    spans.sort()
+    overlaps = sum(1 for (_, end), (start, _) in zip(spans, spans[1:]) if start < end)
+    writers = {name for _, name, _ in pwm.writes}
+    print(f"发出舵机指令的线程: {sorted(writers)}，执行区间重叠: {overlaps} 次")
+    print(f"直接驱动舵机被拒绝: {'是' if guarded else '否'}，失败后关闭喂食口: {closed_after_failure}，"
+          f"排队任务取消: {'成功' if cancelled else '失败'}")
+    print(f"执行器统计: {actuator.stats()}")
+
+    ramp_step = np.abs(np.diff([CLOSE_ANGLE] + [angle for angle, _ in ramp_profile(CLOSE_ANGLE, OPEN_ANGLE, args.ramp)]))
+    print(f"单步最大角度变化: 直接跳转 {abs(OPEN_ANGLE - CLOSE_ANGLE):.0f} 度，平滑转动 {ramp_step.max():.1f} 度")
+
+    failures = []
+    if submit_times.max() > job_time * 1e3 / 2:
+        failures.append("提交调用被硬件动作阻塞")
+    if writers != {actuator.thread.name}:
+        failures.append("存在执行器线程以外的舵机指令")
+    if overlaps:
+        failures.append("喂食动作的执行区间重叠")
+    if not guarded:
+        failures.append("其他线程可以直接驱动舵机")
+    if not failed or closed_after_failure != [CLOSE_ANGLE]:
+        failures.append("任务失败后没有关闭喂食口")
+    if not cancelled or not queued.cancelled():
+        failures.append("无法取消排队中的任务")
+    if ramp_step.max() >= abs(OPEN_ANGLE - CLOSE_ANGLE) / 2:
+        failures.append("平滑转动的单步角度变化过大")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
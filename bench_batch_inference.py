@@ -0,0 +1,87 @@
+# bench_batch_inference.py
+"""
+基准测试：比较批大小 1/2/4/8 时的推理吞吐量
+桩模型的耗时 = 每次调用的固定开销 + 每帧开销，模拟真实模型中预处理/调度等可被批量摊薄的部分。
+
+用法:
+    python bench_batch_inference.py --frames 64 --overhead-ms 20 --per-frame-ms 15
+"""
+import argparse
+import time
+
+import inference_worker
+from frame_ring import FrameRing, SyntheticFrameSource
+from inference_backend import InferenceBackend
+
+
+def _busy(ms):
+    deadline = time.perf_counter() + ms / 1000.0
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StubBatchBackend(InferenceBackend):
+    """桩后端：固定调用开销 + 每帧开销"""
+    names = {0: "cat"}
+
+    def __init__(self, overhead_ms, per_frame_ms):
+        self.overhead_ms = overhead_ms
+        self.per_frame_ms = per_frame_ms
+
+    def predict(self, frame):
+        return self.predict_batch([frame])[0]
+
+    def predict_batch(self, frames):
+        _busy(self.overhead_ms + self.per_frame_ms * len(frames))
+        return [[] for _ in frames]
+
+
+def make_stub_backend(overhead_ms, per_frame_ms):
+    return StubBatchBackend(overhead_ms, per_frame_ms)
+
+
+def run(inference, ring, source, batch_size, total_frames):
+    """返回 (每秒处理帧数, 平均每批耗时 ms)"""
+    batches = max(1, total_frames // batch_size)
+    start = time.perf_counter()
+    for _ in range(batches):
+        frames = []
+        for _ in range(batch_size):
+            ring.capture(source)
+            frames.append(ring.pin_latest())
+        try:
+            inference.infer_batch(frames, timeout=30)
+        finally:
+            for frame in frames:
+                frame.release()
+    elapsed = time.perf_counter() - start
+    return batches * batch_size / elapsed, elapsed / batches * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量推理吞吐量对比")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--overhead-ms", type=float, default=20.0)
+    parser.add_argument("--per-frame-ms", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1, help="0 表示在当前进程内推理")
+    parser.add_argument("--size", type=int, default=320)
+    args = parser.parse_args()
+
+    batch_sizes = (1, 2, 4, 8)
+    ring = FrameRing((args.size, args.size, 3), slots=max(batch_sizes) + 2)
+    source = SyntheticFrameSource(ring.shape)
+    inference = inference_worker.create_inference(make_stub_backend, (args.overhead_ms, args.per_frame_ms),
+                                                  ring=ring, workers=args.workers)
+    print(f"桩模型: 每次调用 {args.overhead_ms}ms + 每帧 {args.per_frame_ms}ms, 共 {args.frames} 帧")
+    try:
+        for batch_size in batch_sizes:
+            fps, batch_ms = run(inference, ring, source, batch_size, args.frames)
+            print(f"batch={batch_size}  {fps:7.1f} 帧/秒  每批 {batch_ms:7.1f}ms  "
+                  f"每帧 {batch_ms / batch_size:6.1f}ms")
+    finally:
+        inference.close()
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
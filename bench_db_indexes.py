@@ -0,0 +1,167 @@
+# bench_db_indexes.py
+"""
+基准测试：索引迁移 (版本 1 的索引 + 版本 2 的唯一约束) 前后的查询耗时
+生成一个包含大量合成喂食记录的数据库。之后的迁移给 feeding_logs 增加了 get_feeding_logs 要读取的列，
+所以在最新表结构上先删除版本 1、2 创建的索引测量一次，再按迁移中的语句重建索引后重新测量:
+    get_feeding_logs     - WHERE user_id = ? 和 WHERE user_id IS NULL 各取 ORDER BY timestamp DESC LIMIT 10 后合并
+    读取用户设置          - WHERE user_id = ?
+    当前分钟的喂食计划    - WHERE time = ?
+每个查询打印前后的 EXPLAIN QUERY PLAN；校验前后返回的结果相同 (查询出错时 models 会返回空结果)，
+以及建索引后 get_feeding_logs 走 idx_feeding_logs_user_time、不再扫描整个 feeding_logs。不满足校验时以非零状态退出。
+在临时目录中创建数据库，不会影响 catfeeder.db。
+
+用法:
+    python bench_db_indexes.py --logs 1000000 --users 2000 --schedules 500
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import models
+
+
+def populate(path, logs, users, schedules, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    start = datetime(2020, 1, 1)
+    span = int(timedelta(days=5 * 365).total_seconds())
+    batch = 50000
+    for offset in range(0, logs, batch):
+        rows = []
+        for _ in range(min(batch, logs - offset)):
+            ts = start + timedelta(seconds=rng.randrange(span))
+            # 约 1% 为没有归属用户的定时喂食记录
+            user_id = rng.randrange(1, users + 1) if rng.random() >= 0.01 else None
+            rows.append((user_id, rng.choice([10.0, 20.0, 30.0]),
+                         rng.choice(["auto", "manual"]), ts.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.executemany("INSERT INTO feeding_logs (user_id, amount, mode, timestamp) VALUES (?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO system_settings (user_id, setting_key, setting_value) VALUES (?, ?, ?)",
+        [(user_id, key, value) for user_id in range(1, users + 1)
+         for key, value in (("default_feed_amount", "30"), ("min_food_level", "0.5"), ("auto_feed_enabled", "1"))])
+    conn.executemany("INSERT INTO feeding_schedules (time, amount) VALUES (?, ?)",
+                     [(f"{rng.randrange(24):02d}:{rng.randrange(60):02d}", 20.0) for _ in range(schedules)])
+    conn.commit()
+    conn.close()
+
+
+def measure(fn, runs):
+    """返回 (中位数 ms, 最大值 ms)"""
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples), max(samples)
+
+
+# 版本 1、2 中创建索引的语句
+INDEX_STATEMENTS = [sql for version, _, statements in models.MIGRATIONS if version in (1, 2)
+                    for sql in statements if re.match(r"\s*CREATE (UNIQUE )?INDEX", sql)]
+
+
+def index_name(sql):
+    return re.search(r"INDEX IF NOT EXISTS (\w+)", sql).group(1)
+
+
+def run_queries(users, runs):
+    """返回 {查询: ((p50, max), 结果)}"""
+    rng = random.Random(1)
+    user_ids = [rng.randrange(1, users + 1) for _ in range(runs)]
+    queries = {
+        "get_feeding_logs": lambda i: models.get_feeding_logs(user_ids[i], 10),
+        "用户设置": lambda i: models._query_user_settings(user_ids[i]),
+        "当前分钟的计划": lambda i: models._should_feed_now_uncached(),
+    }
+    return {name: (measure(fn, runs), [fn(i) for i in range(runs)]) for name, fn in queries.items()}
+
+
+def explain(path):
+    """返回 {查询: [EXPLAIN QUERY PLAN 的每一步]}"""
+    plans = {
+        "get_feeding_logs": (models._FEEDING_LOGS_QUERY, (1, 10, 10, 10)),
+        "用户设置": (models._USER_SETTINGS_QUERY, (1,)),
+        "当前分钟的计划": (models._SCHEDULE_AT_QUERY, ("08:00",)),
+    }
+    conn = sqlite3.connect(path)
+    try:
+        return {name: [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                for name, (sql, params) in plans.items()}
+    finally:
+        conn.close()
+
+
+def print_plans(title, plans):
+    print(f"\n{title}:")
+    for name, steps in plans.items():
+        print(f"  {name}: {'; '.join(steps)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库索引迁移前后的查询耗时")
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--schedules", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="catfeeder-index-"), "catfeeder.db")
+    models.configure(path)
+    models.init_db()
+    start = time.perf_counter()
+    populate(path, args.logs, args.users, args.schedules)
+    print(f"生成 {args.logs} 条喂食记录、{args.users} 个用户的设置，用时 {time.perf_counter() - start:.1f}s ({path})")
+
+    conn = sqlite3.connect(path)
+    for sql in INDEX_STATEMENTS:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name(sql)}")
+    conn.commit()
+    conn.close()
+    models.configure(path) # 丢弃旧连接，重新读取表结构
+    plans_before = explain(path)
+    before = run_queries(args.users, args.runs)
+
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    for sql in INDEX_STATEMENTS:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+    print(f"创建 {', '.join(index_name(sql) for sql in INDEX_STATEMENTS)} 用时 {time.perf_counter() - start:.1f}s")
+    models.configure(path)
+    plans_after = explain(path)
+    after = run_queries(args.users, args.runs)
+
+    print_plans("迁移前的查询计划", plans_before)
+    print_plans("迁移后的查询计划", plans_after)
+    print(f"\n{'查询':<20} {'迁移前 p50':>12} {'迁移后 p50':>12} {'迁移前 max':>12} {'迁移后 max':>12}")
+    for name in before:
+        ((b50, bmax), _), ((a50, amax), _) = before[name], after[name]
+        print(f"{name:<20} {b50:10.3f}ms {a50:10.3f}ms {bmax:10.3f}ms {amax:10.3f}ms")
+
+    failures = []
+    for name in before:
+        if before[name][1] != after[name][1]:
+            failures.append(f"{name} 迁移前后的结果不同")
+    if not any(before["get_feeding_logs"][1]):
+        failures.append("get_feeding_logs 没有返回记录 (查询可能出错)")
+    logs_plan = " ".join(plans_after["get_feeding_logs"])
+    if "idx_feeding_logs_user_time" not in logs_plan or "SCAN feeding_logs" in logs_plan:
+        failures.append(f"get_feeding_logs 没有使用索引: {logs_plan}")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# bench_feed_calibration.py
+"""
+仿真测试：固定 FEED_RATE 计时 vs 在线标定的流量模型
+出粮过程按 feed_sim.VirtualFeeder 的流量曲线离线计算 (流量随料仓余量下降，每次喂食有随机波动)，
+料仓低于 --refill-below 克时加满。两种方式喂食同样的序列，按料仓余量分段统计误差。
+最后在临时数据库中校验记录的重放和重置。不满足校验时以非零状态退出。
+
+用法:
+    python bench_feed_calibration.py --feeds 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import models
+from feed_calibration import FeedCalibration
+from feed_sim import VirtualFeeder
+
+FEED_RATE, MIN_FEED_TIME, MAX_FEED_TIME = 5.0, 0.5, 10.0 # 与 hardware.py 一致
+CAPACITY = 1000.0
+
+
+def dispensed(feeder, open_time, rng):
+    """打开 open_time 秒的出粮量 (按喂食开始时的流量，加上随机波动)"""
+    grams = open_time * feeder.flow_rate() * rng.lognormal(0.0, 0.08)
+    grams = min(grams, feeder.hopper)
+    feeder.hopper -= grams
+    return grams
+
+
+def simulate(feeds, amounts, refill_below, strategy, seed=0):
+    rng = np.random.default_rng(seed)
+    feeder = VirtualFeeder(hopper=CAPACITY, capacity=CAPACITY)
+    calibration = FeedCalibration(capacity=CAPACITY, prior_rate=FEED_RATE, min_time=MIN_FEED_TIME,
+                                  max_time=MAX_FEED_TIME, store=False)
+    errors, levels = [], []
+    for i in range(feeds):
+        if feeder.hopper < refill_below:
+            feeder.refill()
+            calibration.refill()
+        grams = amounts[rng.integers(len(amounts))]
+        if strategy == "fixed":
+            open_time = max(MIN_FEED_TIME, min(grams / FEED_RATE, MAX_FEED_TIME))
+        else:
+            open_time = calibration.open_time_for(grams)
+        levels.append(feeder.hopper)
+        delta = dispensed(feeder, open_time, rng)
+        errors.append(delta - grams)
+        calibration.record(open_time, delta)
+    return np.array(errors), np.array(levels), calibration
+
+
+def check_persistence():
+    """记录写入数据库后重放得到相同的模型；重置后恢复先验但保留料仓余量"""
+    models.configure(os.path.join(tempfile.mkdtemp(prefix="catfeeder-calibration-"), "catfeeder.db"))
+    models.init_db()
+    rng = np.random.default_rng(1)
+    live = FeedCalibration(capacity=CAPACITY)
+    live.refill(900.0)
+    for _ in range(20):
+        open_time = rng.uniform(1.0, 6.0)
+        live.record(open_time, open_time * rng.uniform(4.0, 7.0))
+    restored = FeedCalibration(capacity=CAPACITY).load(models.get_feed_calibration())
+    same = np.allclose(live.model.theta, restored.model.theta) and abs(live.hopper_level - restored.hopper_level) < 1e-6
+    live.reset()
+    after_reset = FeedCalibration(capacity=CAPACITY).load(models.get_feed_calibration())
+    reset_ok = after_reset.model.samples == 0 and abs(after_reset.hopper_level - live.hopper_level) < 1e-6
+    return same, reset_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出粮流量在线标定")
+    parser.add_argument("--feeds", type=int, default=300)
+    parser.add_argument("--amounts", type=float, nargs="+", default=[10.0, 20.0, 30.0, 40.0])
+    parser.add_argument("--refill-below", type=float, default=80.0, help="料仓余量低于此值 (克) 时加满")
+    args = parser.parse_args()
+
+    fixed, levels, _ = simulate(args.feeds, args.amounts, args.refill_below, "fixed")
+    learned, _, calibration = simulate(args.feeds, args.amounts, args.refill_below, "model")
+
+    print(f"{'料仓余量(g)':<14} {'次数':>5} {'固定流量 MAE(g)':>16} {'标定模型 MAE(g)':>16}")
+    warm = np.arange(args.feeds) >= 10 # 前 10 次为学习阶段
+    for low, high in ((0, 250), (250, 500), (500, 750), (750, CAPACITY + 1)):
+        mask = warm & (levels >= low) & (levels < high)
+        if mask.any():
+            print(f"{f'{low:.0f}-{min(high, CAPACITY):.0f}':<14} {mask.sum():>5} "
+                  f"{np.abs(fixed[mask]).mean():>16.2f} {np.abs(learned[mask]).mean():>16.2f}")
+    fixed_mae, learned_mae = np.abs(fixed[warm]).mean(), np.abs(learned[warm]).mean()
+    print(f"{'全部':<14} {warm.sum():>5} {fixed_mae:>16.2f} {learned_mae:>16.2f}")
+    print(f"前 10 次 (学习阶段) 标定模型 MAE: {np.abs(learned[:10]).mean():.2f}g")
+    print(f"模型: {calibration.stats()}")
+
+    same, reset_ok = check_persistence()
+    print(f"数据库重放: {'一致' if same else '不一致'}，重置: {'正常' if reset_ok else '异常'}")
+
+    failures = []
+    if learned_mae >= fixed_mae / 2:
+        failures.append("标定模型误差没有比固定流量降低一半")
+    if learned_mae > 2.0:
+        failures.append("标定模型平均误差大于 2g")
+    if not same:
+        failures.append("从数据库重放得到的模型与在线模型不一致")
+    if not reset_ok:
+        failures.append("重置后模型或料仓余量不正确")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
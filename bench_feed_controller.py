@@ -0,0 +1,118 @@
+# bench_feed_controller.py
+"""
+仿真测试：闭环称重喂食 vs 按固定 FEED_RATE 计时喂食
+在 feed_sim.VirtualFeeder (虚拟料仓 + 虚拟秤) 上依次喂食 --amounts 中的克数共 --feeds 次，
+料仓逐渐变空、流量随之下降；每次喂食前清空碗 (模拟猫吃完)。
+输出每次的目标量、控制器测得的出粮量、仿真中的真实出粮量和学习到的关闭延迟，
+最后比较两种方式的平均误差，并检查料仓空时控制器能提前停止、关闭喂食口失败时能强制关闭。不满足校验时以非零状态退出。
+
+用法:
+    python bench_feed_controller.py --feeds 8 --amounts 10 20 30
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from feed_controller import FeedController
+from feed_sim import VirtualFeeder
+from weight_sampler import WeightSampler
+
+FEED_RATE = 5.0 # hardware.py 中的固定流量
+MIN_FEED_TIME, MAX_FEED_TIME = 0.5, 10.0
+
+
+def prepare(feeder, sampler):
+    feeder.empty_bowl()
+    sampler.wait_samples(20) # 等滤波器跟上清空后的读数
+    return feeder.true_weight()
+
+
+def timed_feed(feeder, grams, settle):
+    feeder.open_gate()
+    time.sleep(max(MIN_FEED_TIME, min(grams / FEED_RATE, MAX_FEED_TIME)))
+    feeder.close_gate()
+    time.sleep(settle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闭环称重喂食仿真")
+    parser.add_argument("--feeds", type=int, default=8)
+    parser.add_argument("--amounts", type=float, nargs="+", default=[10.0, 20.0, 30.0])
+    parser.add_argument("--rate", type=float, default=80.0, help="秤的输出速率 (SPS)")
+    parser.add_argument("--settle", type=float, default=1.0, help="关闭后等待落料的时间（秒）")
+    args = parser.parse_args()
+
+    feeder = VirtualFeeder(hopper=600.0, rate=args.rate)
+    sampler = WeightSampler(feeder, capacity=4096).start()
+    controller = FeedController(sampler, feeder.open_gate, feeder.close_gate, settle_time=args.settle)
+    sampler.wait_samples(20)
+
+    print(f"{'次数':<4} {'目标(g)':>8} {'测得(g)':>8} {'真实(g)':>8} {'误差(g)':>8} {'流量(g/s)':>10} "
+          f"{'延迟(s)':>8} {'结束原因':>10}")
+    closed_errors, measure_errors = [], []
+    for i in range(args.feeds):
+        grams = args.amounts[i % len(args.amounts)]
+        before = prepare(feeder, sampler)
+        result = controller.dispense(grams)
+        actual = feeder.true_weight() - before
+        closed_errors.append(actual - grams)
+        measure_errors.append(result.dispensed - actual)
+        print(f"{i + 1:<4} {grams:>8.1f} {result.dispensed:>8.1f} {actual:>8.1f} {actual - grams:>+8.1f} "
+              f"{result.flow_rate:>10.2f} {controller.model.lag:>8.3f} {result.stopped_by:>10}")
+
+    # 同样的料仓余量下按固定流量计时喂食
+    timed_feeder = VirtualFeeder(hopper=600.0, rate=args.rate, seed=1)
+    timed_errors = []
+    for i in range(args.feeds):
+        grams = args.amounts[i % len(args.amounts)]
+        timed_feeder.empty_bowl()
+        timed_feed(timed_feeder, grams, args.settle)
+        timed_errors.append(timed_feeder.true_weight() - grams)
+
+    closed_errors = np.abs(closed_errors)
+    half = max(1, args.feeds // 2)
+    print(f"\n闭环称重: 平均误差 {closed_errors.mean():.2f}g (前 {half} 次 {closed_errors[:half].mean():.2f}g，"
+          f"之后 {closed_errors[half:].mean() if args.feeds > half else float('nan'):.2f}g)")
+    print(f"计时喂食: 平均误差 {np.abs(timed_errors).mean():.2f}g")
+    print(f"称重测量误差 (测得 - 真实): 最大 {np.abs(measure_errors).max():.2f}g")
+
+    # 料仓只剩几克时应在 stall_time 内停止并报告实际出粮量
+    feeder.hopper = 3.0
+    before = prepare(feeder, sampler)
+    result = controller.dispense(20.0)
+    actual = feeder.true_weight() - before
+    print(f"料仓将空: 目标 20g，实际 {actual:.1f}g，结束原因 {result.stopped_by}，用时 {result.duration:.1f}s")
+
+    # 平滑关闭失败 (舵机出错返回 False) 时应立即强制关闭并报告失败
+    feeder.refill()
+    forced = []
+    failing = FeedController(sampler, feeder.open_gate, lambda: False, settle_time=args.settle,
+                             force_close=lambda: forced.append(feeder.close_gate()))
+    prepare(feeder, sampler)
+    servo_result = failing.dispense(10.0)
+    print(f"关闭失败: 结束原因 {servo_result.stopped_by}，强制关闭 {len(forced)} 次，"
+          f"测得出粮 {servo_result.to_dict()['dispensed']}g")
+    sampler.close()
+
+    failures = []
+    if closed_errors.mean() >= np.abs(timed_errors).mean():
+        failures.append("闭环喂食误差没有低于计时喂食")
+    if args.feeds > half and closed_errors[half:].mean() > 2.0:
+        failures.append("学习补偿后平均误差仍大于 2g")
+    if np.abs(measure_errors).max() > 1.5:
+        failures.append("测得的出粮量与真实值相差超过 1.5g")
+    if result.stopped_by != "stalled" or result.ok:
+        failures.append("料仓空时没有报告 stalled")
+    if servo_result.ok or servo_result.stopped_by != "servo" or len(forced) != 1:
+        failures.append("关闭喂食口失败时没有强制关闭并报告失败")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_frame_ring.py
+"""
+基准测试：对比旧的“每帧新数组 + tobytes + 每个客户端拷贝”方式与共享内存帧环。
+使用合成帧源，无需 Picamera2。
+
+用法:
+    python bench_frame_ring.py --frames 500 --readers 4
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from frame_ring import FrameRing, SyntheticFrameSource
+
+
+def run_legacy(source, frames, readers):
+    """旧方式：capture_array 分配新数组，tobytes 再拷贝一次，每个读取方再拼接拷贝"""
+    checksum = 0
+    for _ in range(frames):
+        frame = np.empty(source.shape, dtype=np.uint8)
+        source.read_into(frame)
+        last_frame = frame.tobytes()
+        for _ in range(readers):
+            payload = b'--frame\r\n' + last_frame + b'\r\n'
+            checksum += payload[20]
+    return checksum
+
+
+def run_ring(ring, source, frames, readers):
+    """帧环方式：写入预分配槽位，读取方 pin 住最新帧直接访问"""
+    checksum = 0
+    for _ in range(frames):
+        ring.capture(source)
+        for _ in range(readers):
+            with ring.pin_latest() as frame:
+                checksum += int(frame.array[0, 0, 0])
+    return checksum
+
+
+def measure(name, func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frames = args[-2]
+    print(f"{name:<8} {elapsed / frames * 1000:7.3f} ms/帧  {frames / elapsed:8.1f} 帧/秒  "
+          f"峰值内存 {peak / 1024:8.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享内存帧环 vs 逐帧分配的对比")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--size", type=int, default=320)
+    args = parser.parse_args()
+
+    shape = (args.size, args.size, 3)
+    print(f"帧尺寸 {shape}, 帧数 {args.frames}, 读取方 {args.readers}")
+
+    measure("legacy", run_legacy, SyntheticFrameSource(shape), args.frames, args.readers)
+
+    ring = FrameRing(shape)
+    try:
+        measure("ring", run_ring, ring, SyntheticFrameSource(shape), args.frames, args.readers)
+    finally:
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# bench_hx711_modes.py
+"""
+基准测试：HX711 三种读取方式 (忙等 / 定时轮询 / 下降沿中断) 的 CPU 占用
+使用 fake_gpio 模拟 RPi.GPIO 和 HX711 芯片时序，不需要树莓派。
+每种方式运行 --seconds 秒，统计采样率、超时次数和进程 CPU 占用 (扣除芯片模拟本身的开销)。
+同时校验: 边沿检测不可用时退化为轮询；芯片停止输出时读取在超时内返回。
+
+用法:
+    python bench_hx711_modes.py --rate 10 --seconds 5
+    python bench_hx711_modes.py --rate 80 --modes interrupt poll
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import fake_gpio
+
+gpio = fake_gpio.install()
+
+from hx711_reader import READ_MODES, HX711Reader  # noqa: E402
+from hx711v0_5_1 import HX711  # noqa: E402
+from weight_sampler import WeightSampler  # noqa: E402
+
+DOUT, PD_SCK = 5, 6
+
+
+def cpu_percent(seconds, fn=None):
+    """在 seconds 秒内进程 CPU 时间占墙钟时间的百分比"""
+    c0, t0 = time.process_time(), time.monotonic()
+    if fn:
+        fn()
+    time.sleep(seconds)
+    return (time.process_time() - c0) / (time.monotonic() - t0) * 100.0
+
+
+def run_mode(hx, mode, seconds):
+    reader = HX711Reader(hx, mode=mode, timeout=0.5).start()
+    sampler = WeightSampler(reader).start()
+    sampler.wait_samples(2)
+    start = sampler.stats()["samples"]
+    cpu = cpu_percent(seconds)
+    samples = sampler.stats()["samples"] - start
+    reader_stats = reader.stats()
+    reader.close()
+    sampler.close()
+    return cpu, samples / seconds, reader_stats, sampler.latest("median", max_age=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HX711 读取方式 CPU 占用对比")
+    parser.add_argument("--rate", type=float, default=10.0, help="模拟的 HX711 输出速率 (SPS)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", default=list(READ_MODES), choices=READ_MODES)
+    args = parser.parse_args()
+
+    grams = 123.4 + np.random.default_rng(0).normal(0, 0.5, 1000)
+    chip = fake_gpio.FakeHX711Chip(gpio, DOUT, PD_SCK, grams, rate=args.rate, reference_unit=400).start()
+    hx = HX711(DOUT, PD_SCK)
+    hx.setReadingFormat("MSB", "MSB")
+    hx.setReferenceUnit(400)
+    hx.setOffset(0)
+
+    baseline = cpu_percent(args.seconds)
+    print(f"芯片模拟本身 CPU: {baseline:.1f}%\n")
+    print(f"{'方式':<10} {'CPU%':>7} {'采样/秒':>8} {'超时':>5} {'补读':>5} {'读数(g)':>9}")
+    failures = []
+    results = {}
+    for mode in args.modes:
+        cpu, rate, stats, value = run_mode(hx, mode, args.seconds)
+        cpu = max(0.0, cpu - baseline)
+        results[mode] = cpu
+        print(f"{mode:<10} {cpu:>7.1f} {rate:>8.1f} {stats['timeouts']:>5} {stats['recovered']:>5} "
+              f"{value if value is None else round(value, 1):>9}")
+        if rate < args.rate * 0.8:
+            failures.append(f"{mode}: 采样率 {rate:.1f} 低于 {args.rate * 0.8:.1f}")
+        if value is None or abs(value - 123.4) > 2.0:
+            failures.append(f"{mode}: 读数 {value} 与 123.4g 不符")
+    if "spin" in results and "interrupt" in results and results["interrupt"] >= results["spin"]:
+        failures.append("中断方式的 CPU 占用没有低于忙等")
+
+    # 边沿检测被占用 (例如其他进程或内核驱动) 时应退化为轮询
+    gpio.add_event_detect(DOUT, gpio.FALLING, callback=lambda pin: None)
+    reader = HX711Reader(hx, mode="interrupt").start()
+    gpio.remove_event_detect(DOUT)
+    if reader.mode != "poll":
+        failures.append("边沿检测不可用时没有退化为轮询")
+    reader.close()
+
+    # 芯片停止输出后每次读取都应在超时内返回 None
+    chip.close()
+    time.sleep(2.0 / args.rate)
+    hx.readRawBytes(timeout=0.2) # 读走最后一个采样，DOUT 恢复高电平
+    for mode in args.modes:
+        reader = HX711Reader(hx, mode=mode, timeout=0.2).start()
+        t0 = time.monotonic()
+        value = reader.getWeight()
+        elapsed = time.monotonic() - t0
+        reader.close()
+        if value is not None or elapsed > 0.5:
+            failures.append(f"{mode}: 芯片无输出时读取返回 {value}，用时 {elapsed:.2f}s")
+
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_imports.py
+"""
+冒烟测试：在没有树莓派的机器上导入 hardware 和 app
+RPi.GPIO / smbus 由 fake_gpio / fake_smbus 模拟；board、adafruit_dht、picamera2 只在树莓派上可用，
+导入失败时注册空模块占位 (导入时只引用 board.D17 和类名，不会真正访问设备)。
+模块级代码按顺序执行，常量定义在使用之后之类的错误只有在导入时才会暴露，这里逐个导入并检查主要的全局对象。
+导入失败时打印异常并以非零状态退出。
+
+用法:
+    python bench_imports.py
+"""
+import argparse
+import importlib
+import sys
+import time
+import traceback
+import types
+
+import fake_gpio
+import fake_smbus
+
+# 必须在 import hardware 之前安装
+fake_gpio.install()
+fake_smbus.install()
+
+# 模块名 -> 需要的属性 (仅在真实模块不可用时使用)
+DEVICE_MODULES = {
+    "board": {"D17": 17},
+    "adafruit_dht": {"DHT11": object},
+    "picamera2": {"Picamera2": object},
+}
+# 模块 -> 导入后应存在的全局对象
+EXPECTED = {
+    "hardware": ("feed_calibration", "heart_rate_monitor", "feed", "close_gate_safely", "read_heart_rate_spo2"),
+    "app": ("app", "actuator", "state_hub", "stream_broadcaster"),
+}
+
+
+def install_placeholders():
+    """为不可导入的设备模块注册占位模块，返回实际注册的模块名"""
+    installed = []
+    for name, attrs in DEVICE_MODULES.items():
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            for attr, value in attrs.items():
+                setattr(module, attr, value)
+            sys.modules[name] = module
+            installed.append(name)
+    return installed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入 hardware / app 的冒烟测试")
+    parser.add_argument("--modules", nargs="+", default=list(EXPECTED), choices=list(EXPECTED))
+    args = parser.parse_args()
+
+    placeholders = install_placeholders()
+    if placeholders:
+        print(f"占位模块: {', '.join(placeholders)}")
+
+    failures = []
+    for name in args.modules:
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except Exception:
+            traceback.print_exc()
+            failures.append(f"import {name} 失败")
+            continue
+        missing = [attr for attr in EXPECTED[name] if not hasattr(module, attr)]
+        print(f"import {name}: {(time.perf_counter() - started) * 1e3:.0f} ms"
+              + (f"，缺少 {', '.join(missing)}" if missing else ""))
+        if missing:
+            failures.append(f"{name} 缺少 {', '.join(missing)}")
+
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# bench_inference_worker.py
+"""
+基准测试：对比进程内推理与推理子进程两种方式下 Flask 接口的 p99 延迟。
+使用占用 GIL 的桩模型和合成摄像头，无需 Picamera2 / YOLO 权重即可运行。
+最后校验子进程被杀死 (模拟 OOM) 和重启失败后，推理池能在之后的请求中恢复；不满足校验时以非零状态退出。
+
+用法:
+    python bench_inference_worker.py --requests 300 --infer-ms 80 --workers 1
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import sys
+import threading
+import time
+
+from flask import Flask, jsonify
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import inference_worker
+from frame_ring import FrameRing, SyntheticFrameSource
+
+
+class StubModel:
+    """桩模型：用纯 Python 循环占用 GIL 来模拟推理耗时，接口与 InferenceBackend 一致"""
+    names = {0: "cat"}
+
+    def __init__(self, infer_ms):
+        self.infer_ms = infer_ms
+
+    def predict(self, frame):
+        deadline = time.perf_counter() + self.infer_ms / 1000.0
+        x = 0
+        while time.perf_counter() < deadline:
+            for i in range(1000):
+                x += i * i
+        if int(frame[0, 0, 0]) % 2:
+            return [{"class_id": 0, "name": "cat", "conf": 0.9, "box": [40.0, 40.0, 200.0, 200.0]}]
+        return []
+
+
+def make_stub_model(infer_ms):
+    return StubModel(infer_ms)
+
+
+def make_broken_model(infer_ms):
+    raise RuntimeError("模型加载失败")
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def build_app():
+    app = Flask(__name__)
+    lock = threading.Lock()
+    state = {"temperature": 24.5, "humidity": 51.0, "weight": 0.42, "cat_detected": False}
+
+    @app.route('/api/sensor_data')
+    def api_sensor_data():
+        with lock:
+            data = dict(state)
+        return jsonify(data)
+
+    return app
+
+
+def detection_loop(inference, ring, source, stop_event):
+    while not stop_event.is_set():
+        ring.capture(source)
+        with ring.pin_latest() as frame:
+            inference.infer(frame, timeout=30)
+
+
+def measure(port, requests):
+    latencies = []
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for _ in range(requests):
+        start = time.perf_counter()
+        conn.request("GET", "/api/sensor_data")
+        conn.getresponse().read()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        time.sleep(0.005)
+    conn.close()
+    return latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(name, inference, ring, args):
+    server = make_server("127.0.0.1", 0, build_app(), threaded=True,
+                         request_handler=_QuietHandler)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    stop_event = threading.Event()
+    detector = None
+    if inference is not None:
+        detector = threading.Thread(target=detection_loop,
+                                    args=(inference, ring, SyntheticFrameSource(ring.shape), stop_event),
+                                    daemon=True)
+        detector.start()
+        time.sleep(0.5) # 等待检测循环进入稳定状态
+
+    latencies = measure(server.server_port, args.requests)
+
+    stop_event.set()
+    if detector:
+        detector.join()
+    server.shutdown()
+
+    print(f"{name:<12} p50={percentile(latencies, 50):7.2f}ms  "
+          f"p99={percentile(latencies, 99):7.2f}ms  "
+          f"max={max(latencies):7.2f}ms  mean={statistics.mean(latencies):7.2f}ms")
+
+
+def attempt(pool, ring):
+    """推理一帧，返回 (是否成功, 异常类型名)"""
+    with ring.pin_latest() as frame:
+        try:
+            pool.infer(frame, timeout=30)
+            return True, None
+        except Exception as e:
+            return False, type(e).__name__
+
+
+def kill_worker(pool, delay=0.0):
+    """delay 秒后用 SIGKILL 杀死第一个子进程 (模拟 OOM)"""
+    pid = pool._workers[0]["process"].pid
+    timer = threading.Timer(delay, os.kill, (pid, signal.SIGKILL))
+    timer.start()
+    return timer
+
+
+def check_recovery(ring, infer_ms):
+    """空闲时 / 推理中杀死子进程、让重启失败，检查之后的推理能恢复"""
+    ring.capture(SyntheticFrameSource(ring.shape))
+    pool = inference_worker.InferenceWorkerPool(make_stub_model, (max(infer_ms, 200.0),), ring=ring, workers=1)
+    steps = []
+    try:
+        kill_worker(pool).join()
+        time.sleep(0.1)
+        steps.append(("空闲时被杀死", attempt(pool, ring), (True, None)))
+        kill_worker(pool, 0.05)
+        steps.append(("推理中被杀死", attempt(pool, ring), (False, "RuntimeError")))
+        steps.append(("自动重启后", attempt(pool, ring), (True, None)))
+
+        pool.model_factory = make_broken_model
+        kill_worker(pool, 0.05)
+        steps.append(("重启失败", attempt(pool, ring), (False, "RuntimeError")))
+        steps.append(("再次重启失败", attempt(pool, ring), (False, "RuntimeError")))
+        pool.model_factory = make_stub_model
+        steps.append(("恢复后", attempt(pool, ring), (True, None)))
+    finally:
+        pool.close()
+    failures = []
+    for name, result, expected in steps:
+        print(f"{name}: {'成功' if result[0] else '失败 ' + result[1]}")
+        if result != expected:
+            failures.append(f"{name}: 期望 {expected}，实际 {result}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理子进程 vs 进程内推理的接口延迟对比")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--infer-ms", type=float, default=80.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--img-size", type=int, default=320)
+    args = parser.parse_args()
+
+    ring = FrameRing((args.img_size, args.img_size, 3))
+    print(f"桩模型推理耗时 {args.infer_ms}ms, 请求数 {args.requests}")
+
+    try:
+        run_case("idle", None, ring, args)
+
+        local = inference_worker.create_inference(make_stub_model, (args.infer_ms,), ring=ring, workers=0)
+        run_case("in-process", local, ring, args)
+        local.close()
+
+        pool = inference_worker.create_inference(make_stub_model, (args.infer_ms,), ring=ring,
+                                                 workers=args.workers)
+        try:
+            run_case(f"worker x{args.workers}", pool, ring, args)
+        finally:
+            pool.close()
+
+        print()
+        failures = check_recovery(ring, args.infer_ms)
+    finally:
+        ring.close()
+
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# bench_jpeg_encoder.py
+"""
+基准测试：不同编码器 / 质量 / 色度抽样下的每帧编码耗时和字节数
+默认使用带检测框的合成画面，也可以用 --image 指定一张真实截图（更接近实际的压缩率）。
+
+用法:
+    python bench_jpeg_encoder.py --frames 200
+    python bench_jpeg_encoder.py --image pictures/cat.jpg --qualities 50 70 85
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+import annotate
+from frame_ring import SyntheticFrameSource
+from jpeg_encoder import ENCODERS, SUBSAMPLING_CHOICES, EncodeHistogram, timed_encode
+
+
+def make_frames(image_path, size, count):
+    """返回 BGR 帧列表：真实图片 (加轻微噪声避免每帧相同) 或合成画面"""
+    if image_path:
+        base = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if base is None:
+            raise SystemExit(f"无法读取图片: {image_path}")
+        rng = np.random.default_rng(0)
+        return [cv2.add(base, rng.integers(0, 4, base.shape, dtype=np.uint8)) for _ in range(min(count, 16))]
+    source = SyntheticFrameSource((size, size, 3))
+    frames = []
+    rgb = np.empty(source.shape, dtype=np.uint8)
+    for _ in range(min(count, 16)):
+        source.read_into(rgb)
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        annotate.draw_detections(bgr, [{"class_id": 0, "name": "cat", "conf": 0.9,
+                                        "box": [size * 0.2, size * 0.2, size * 0.6, size * 0.7]}])
+        frames.append(bgr)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JPEG 编码耗时与体积对比")
+    parser.add_argument("--image", help="使用真实图片代替合成画面")
+    parser.add_argument("--size", type=int, default=640, help="合成画面边长")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--qualities", type=int, nargs="+", default=[50, 70, 85])
+    args = parser.parse_args()
+
+    frames = make_frames(args.image, args.size, args.frames)
+    height, width = frames[0].shape[:2]
+    print(f"画面 {width}x{height}, 每组合编码 {args.frames} 帧")
+    print(f"{'编码器':<10} {'质量':>4} {'抽样':>4} {'avg':>8} {'p95':>8} {'字节/帧':>9} {'30fps 带宽':>12}")
+    for kind, encoder_cls in ENCODERS.items():
+        try:
+            encoder_cls()
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"{kind:<10} 不可用: {e}")
+            continue
+        for quality in args.qualities:
+            for subsampling in SUBSAMPLING_CHOICES:
+                encoder = encoder_cls(quality, subsampling)
+                histogram = EncodeHistogram()
+                timed_encode(encoder, frames[0]) # 预热
+                for i in range(args.frames):
+                    timed_encode(encoder, frames[i % len(frames)], histogram)
+                stats = histogram.stats()
+                kbps = stats["avg_bytes"] * 8 * 30 / 1000.0
+                print(f"{kind:<10} {quality:>4} {subsampling:>4} {stats['avg_ms']:7.2f}ms {stats['p95_ms']:7.1f}ms "
+                      f"{stats['avg_bytes']:>9} {kbps:9.0f}kbps")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# bench_max30102_fifo.py
+"""
+仿真测试：MAX30102 逐样本轮询读取 vs FIFO 批量读取
+芯片和 I2C 总线由 fake_smbus 模拟 (每个事务按 400kHz 总线计算耗时)，样本为 ppg_sim 的合成 PPG。
+在不同输出速率下分别运行 --seconds 秒:
+    轮询 - 原先 hardware.MAX30102_Sensor.get_sensor_data 的方式：每个样本先读 INTR_STATUS_1，没数据时睡眠 5ms
+    批量 - max30102_reader.MAX30102Reader 后台线程
+比较实际得到的采样率、FIFO 溢出丢失的样本数、每个样本的 I2C 事务数和 CPU 时间。
+校验批量读取解码出的样本与芯片输出完全一致、读取停顿导致溢出时能正确计数，以及 PPGMonitor 算出的心率血氧。
+不满足校验时以非零状态退出。
+
+用法:
+    python bench_max30102_fifo.py --seconds 3 --rates 100 400
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import fake_smbus
+fake_smbus.install() # 必须在 import max30102 之前
+
+import ppg
+from max30102 import MAX30102
+from max30102_reader import MAX30102Reader
+from ppg_sim import synthetic_ppg
+
+SAMPLE_RATE_BITS = {50: 0, 100: 1, 200: 2, 400: 3, 800: 4, 1000: 5} # SPO2_CONFIG[4:2]
+HEART_RATE, SPO2 = 75.0, 97.0
+
+
+def make_sensor(rate):
+    """创建挂在新 FakeSMBus 上的传感器，并把输出速率设为 rate (不做样本平均)"""
+    sensor = MAX30102()
+    sensor.write_register(sensor.REG_FIFO_CONFIG, 0x0F)
+    sensor.write_register(sensor.REG_SPO2_CONFIG, 0x23 | SAMPLE_RATE_BITS[rate] << 2)
+    chip = sensor.bus.devices[sensor.I2C_ADDR]
+    sensor.bus.transactions = 0
+    return sensor, chip
+
+
+def legacy_read(sensor, seconds):
+    """原先的逐样本读取：读 INTR_STATUS_1 等 PPG_RDY，再读 6 字节，没数据时睡眠 5ms"""
+    red_buffer, ir_buffer = [], []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        intr_status = sensor.read_register(sensor.REG_INTR_STATUS_1)
+        if intr_status & 0x40:
+            data = sensor.bus.read_i2c_block_data(sensor.I2C_ADDR, sensor.REG_FIFO_DATA, 6)
+            red_buffer.append(((data[0] << 16) | (data[1] << 8) | data[2]) & 0x3FFFF)
+            ir_buffer.append(((data[3] << 16) | (data[4] << 8) | data[5]) & 0x3FFFF)
+        else:
+            time.sleep(0.005)
+    return np.array(red_buffer), np.array(ir_buffer)
+
+
+def burst_read(sensor, seconds, rate, monitor=None):
+    reader = MAX30102Reader(sensor, fs=rate, monitor=monitor, capacity=int(rate * seconds * 2)).start()
+    time.sleep(seconds)
+    reader.close()
+    reader.poll() # 读出剩余样本
+    window = reader.window()
+    return window["red"].astype(np.int64), window["ir"].astype(np.int64), reader
+
+
+def run(name, rate, seconds, fn):
+    sensor, chip = make_sensor(rate)
+    cpu = time.process_time()
+    red, ir = fn(sensor)[:2]
+    cpu = time.process_time() - cpu
+    # 轮询方式不会主动发现溢出，按芯片产生的样本数计算丢失量
+    exact = np.array_equal(red, chip.red[:len(red)]) and np.array_equal(ir, chip.ir[:len(ir)]) and not chip.dropped
+    print(f"{name:<6} {rate:>7} {len(red) / seconds:>10.1f} {chip.dropped:>8} "
+          f"{sensor.bus.transactions / max(len(red), 1):>10.3f} {cpu / seconds * 100:>9.1f}%")
+    # 最后一次读取之后不再访问总线，芯片不再产生样本；读取过程中新到达的样本留在 FIFO 中
+    return {"received": len(red), "dropped": chip.dropped, "generated": chip.generated, "pending": chip.pending,
+            "transactions": sensor.bus.transactions / max(len(red), 1), "cpu": cpu, "exact": exact}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MAX30102 FIFO 批量读取")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rates", type=int, nargs="+", default=[100, 400], choices=sorted(SAMPLE_RATE_BITS))
+    args = parser.parse_args()
+
+    print(f"{'方式':<6} {'速率(Hz)':>7} {'实际(样本/s)':>10} {'丢失':>8} {'事务/样本':>10} {'CPU':>10}")
+    results = {}
+    for rate in args.rates:
+        results["legacy", rate] = run("轮询", rate, args.seconds, lambda s: legacy_read(s, args.seconds))
+        results["burst", rate] = run("批量", rate, args.seconds, lambda s, r=rate: burst_read(s, args.seconds, r))
+
+    # 停顿超过 FIFO 容量 (32 个样本) 时应读出满的 FIFO 并按 OVF_COUNTER 记录丢失的样本
+    sensor, chip = make_sensor(100)
+    monitor = ppg.PPGMonitor()
+    reader = MAX30102Reader(sensor, monitor=monitor)
+    reader.poll()
+    time.sleep(0.5)
+    stalled = reader.poll()
+    overflow_ok = stalled == 32 and 0 < reader.overflows == min(31, chip.dropped)
+    print(f"\n停顿 0.5s: 芯片丢弃 {chip.dropped} 个样本，读取线程记录溢出 {reader.overflows} 个 (OVF_COUNTER 上限 31)")
+
+    # 连续读取时的心率血氧
+    red, ir = synthetic_ppg(HEART_RATE, SPO2, 30.0, seed=3)
+    fake_smbus.install(lambda: fake_smbus.FakeMAX30102(red, ir))
+    sensor, _ = make_sensor(100)
+    monitor = ppg.PPGMonitor()
+    _, _, reader = burst_read(sensor, 6.0, 100, monitor)
+    heart_rate, spo2 = monitor.latest()
+    print(f"批量读取 + PPGMonitor: 心率 {heart_rate} bpm (实际 {HEART_RATE:.0f})，血氧 {spo2}% (实际 {SPO2:.0f})，"
+          f"读取统计 {reader.stats()}")
+
+    failures = []
+    for rate in args.rates:
+        burst, legacy = results["burst", rate], results["legacy", rate]
+        if burst["dropped"] or burst["received"] + burst["pending"] != burst["generated"]:
+            failures.append(f"{rate}Hz 下批量读取丢失了样本")
+        if not burst["exact"]:
+            failures.append(f"{rate}Hz 下批量读取解码的样本与芯片输出不一致")
+        if burst["transactions"] > legacy["transactions"] / 4:
+            failures.append(f"{rate}Hz 下批量读取的事务数没有降到轮询的 1/4 以下")
+    if not overflow_ok:
+        failures.append("FIFO 溢出没有被正确计数")
+    if heart_rate is None or abs(heart_rate - HEART_RATE) > 3 or abs(spo2 - SPO2) > 1:
+        failures.append("批量读取后算出的心率血氧不正确")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_mjpeg_broadcast.py
+"""
+基准测试：视频流客户端数量增加时的 CPU 开销
+生产线程按固定帧率发布合成画面，N 个订阅线程模拟 /video_feed 客户端读取帧。
+编码只按码流配置进行一次，所以进程 CPU 时间应基本不随客户端数量增长。
+
+用法:
+    python bench_mjpeg_broadcast.py --clients 1 8 32 64 --seconds 5 --fps 30
+"""
+import argparse
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_ring import SyntheticFrameSource
+from mjpeg_broadcaster import MJPEGBroadcaster, StreamProfile
+
+
+def run(clients, seconds, fps, size, thumb_ratio):
+    profiles = [StreamProfile("full", quality=80), StreamProfile("thumb", 160, 160, 50, 5)]
+    broadcaster = MJPEGBroadcaster(profiles)
+    source = SyntheticFrameSource((size, size, 3))
+    delivered = [0] * clients
+    stop = threading.Event()
+
+    def client(index, profile):
+        for _ in broadcaster.stream(profile):
+            delivered[index] += 1
+            if stop.is_set():
+                break
+
+    threads = []
+    for i in range(clients):
+        profile = "thumb" if thumb_ratio and i % thumb_ratio == thumb_ratio - 1 else "full"
+        t = threading.Thread(target=client, args=(i, profile), daemon=True)
+        t.start()
+        threads.append(t)
+    while broadcaster.subscriber_count() < clients:
+        time.sleep(0.01)
+
+    frame_rgb = np.empty(source.shape, dtype=np.uint8)
+    frame_bgr = None
+    interval = 1.0 / fps
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    next_time = wall_start
+    frames = 0
+    while time.perf_counter() - wall_start < seconds:
+        source.read_into(frame_rgb)
+        due = broadcaster.due_profiles()
+        if due:
+            frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR, dst=frame_bgr)
+            broadcaster.publish(frame_bgr, due)
+        frames += 1
+        next_time += interval
+        delay = next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    stop.set()
+    broadcaster.close()
+    for t in threads:
+        t.join(timeout=2)
+    stats = broadcaster.stats()
+    encoded = sum(p["encoded"] for p in stats["profiles"].values())
+    return cpu / wall * 100.0, encoded, sum(delivered) / clients / wall, frames / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MJPEG 广播器多客户端 CPU 开销")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--size", type=int, default=480)
+    parser.add_argument("--thumb-ratio", type=int, default=4, help="每 N 个客户端中有 1 个订阅缩略图，0 表示不用")
+    args = parser.parse_args()
+
+    print(f"画面 {args.size}x{args.size} @ {args.fps}fps, 每轮 {args.seconds}s")
+    for clients in args.clients:
+        cpu, encoded, client_fps, source_fps = run(clients, args.seconds, args.fps, args.size, args.thumb_ratio)
+        print(f"clients={clients:3d}  CPU {cpu:5.1f}%  编码 {encoded:5d} 次  "
+              f"源 {source_fps:5.1f}fps  每客户端平均 {client_fps:5.1f}fps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# bench_ppg.py
+"""
+心率血氧计算的基准测试和校验 (合成 PPG 波形，见 ppg_sim.py)
+1. 固定输入的期望输出: 不同心率 / 血氧 / 采样率 / 噪声下，每个滑动窗口的结果都应在容差内；
+   没放手指 (直流很低) 和纯噪声的窗口应判为无效
+2. 一致性: analyze_windows 的批量结果与逐窗口调用 analyze 相同；PPGMonitor 按随机大小分块输入时结果与批量计算相同
+3. 与原先 hardware.py 中逐个列表计算的算法比较误差和耗时 (加速比与机器有关，只打印不参与校验)
+不满足校验时以非零状态退出。
+
+用法:
+    python bench_ppg.py --seconds 60 --hop 25
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+import ppg
+from ppg_sim import synthetic_ppg
+
+# (心率, 血氧, 采样率, 噪声, 基线漂移)
+GOLDEN = [
+    (45, 98, 100, 0.05, 0.5),
+    (60, 97, 100, 0.05, 0.5),
+    (75, 95, 100, 0.1, 1.0),
+    (90, 92, 100, 0.1, 0.5),
+    (120, 88, 100, 0.1, 0.5),
+    (150, 96, 100, 0.2, 0.5),
+    (180, 94, 100, 0.1, 0.5),
+    (210, 90, 100, 0.1, 0.5),
+    (75, 97, 25, 0.05, 0.5),  # hardware.py 的配置 (SMP_AVE = 4)
+    (140, 93, 25, 0.1, 0.5),
+]
+# 容差针对每个信号 95% 的窗口；合成信号的心跳间隔有 2% 的随机变化，心率高时按 2% 放宽
+HR_TOLERANCE = 3.0    # bpm
+SPO2_TOLERANCE = 1.0  # %
+MIN_VALID = 0.95      # 正常信号中有效窗口的最低比例
+
+
+def legacy_calculate(ir_data, red_data):
+    """原先 hardware.MAX30102_Sensor.calculate_hr_and_spo2 的算法 (100Hz)"""
+    BUFFER_SIZE = len(ir_data)
+    ir_mean = sum(ir_data) / BUFFER_SIZE
+    red_mean = sum(red_data) / BUFFER_SIZE
+    ir_ac = [(val - ir_mean) for val in ir_data]
+    red_ac = [(val - red_mean) for val in red_data]
+    threshold = max(ir_ac) * 0.6 if max(ir_ac) > 0 else 1
+    peaks = []
+    last_peak_index = -int(100 / (220 / 60))
+    for i in range(1, len(ir_ac) - 1):
+        if ir_ac[i] > threshold and ir_ac[i] > ir_ac[i - 1] and ir_ac[i] > ir_ac[i + 1]:
+            if i - last_peak_index >= int(100 / (220 / 60)):
+                peaks.append(i)
+                last_peak_index = i
+    if len(peaks) < 2:
+        return -1, -1, False
+    peak_intervals_ms = [(peaks[i + 1] - peaks[i]) * 10 for i in range(len(peaks) - 1)]
+    heart_rate = 60000 / (sum(peak_intervals_ms) / len(peak_intervals_ms))
+    ac_sq_red = sum([x * x for x in red_ac]) / BUFFER_SIZE
+    ac_sq_ir = sum([x * x for x in ir_ac]) / BUFFER_SIZE
+    R = (math.sqrt(ac_sq_red) / red_mean) / (math.sqrt(ac_sq_ir) / ir_mean)
+    spo2 = max(80.0, min(99.9, 110 - 25 * R))
+    heart_rate = max(40, min(220, heart_rate))
+    return int(round(heart_rate)), round(spo2, 2), True
+
+
+def check_golden(seconds, window_seconds, hop_seconds):
+    failures = []
+    print(f"{'心率':>5} {'血氧':>5} {'采样率':>6} {'噪声':>5} {'窗口数':>6} {'有效':>6} {'心率误差P95':>10} {'血氧误差P95':>10}")
+    for hr, spo2, fs, noise, wander in GOLDEN:
+        red, ir = synthetic_ppg(hr, spo2, seconds, fs=fs, noise=noise, wander=wander, seed=hr)
+        result = ppg.analyze_windows(ir, red, int(window_seconds * fs), max(1, int(hop_seconds * fs)), fs)
+        valid = result["valid"]
+        hr_error = np.percentile(np.abs(result["heart_rate"][valid] - hr), 95) if valid.any() else np.inf
+        spo2_error = np.percentile(np.abs(result["spo2"][valid] - spo2), 95) if valid.any() else np.inf
+        print(f"{hr:>5} {spo2:>5} {fs:>6} {noise:>5} {len(valid):>6} {valid.mean():>6.0%} "
+              f"{hr_error:>10.2f} {spo2_error:>10.2f}")
+        if valid.mean() < MIN_VALID or hr_error > max(HR_TOLERANCE, 0.02 * hr) or spo2_error > SPO2_TOLERANCE:
+            failures.append(f"{hr}bpm / {spo2}% / {fs}Hz 的结果超出容差")
+
+    # 没放手指：红外直流只有几千；纯噪声：直流正常但没有脉搏
+    rng = np.random.default_rng(0)
+    red, ir = synthetic_ppg(75, 97, seconds, red_dc=2000.0, ir_dc=3000.0)
+    n = len(ir)
+    cases = {
+        "没放手指": (ir, red),
+        "纯噪声": (110000 + 200 * rng.standard_normal(n), 90000 + 200 * rng.standard_normal(n)),
+    }
+    for name, (ir, red) in cases.items():
+        valid = ppg.analyze_windows(ir, red, int(window_seconds * 100), int(hop_seconds * 100))["valid"]
+        print(f"{name}: 有效窗口 {valid.mean():.0%}")
+        if valid.mean() > 1 - MIN_VALID:
+            failures.append(f"{name}的窗口被判为有效")
+    return failures
+
+
+def check_consistency(ir, red, window, hop):
+    """批量计算 == 逐窗口计算 == PPGMonitor 分块输入"""
+    batch = ppg.analyze_windows(ir, red, window, hop)
+    single = [ppg.analyze(ir[end - window:end], red[end - window:end]) for end in batch["end"]]
+    expected = [(int(round(h)), round(float(s), 2), True) if v else (-1, -1, False)
+                for h, s, v in zip(batch["heart_rate"], batch["spo2"], batch["valid"])]
+    same_single = single == expected
+
+    monitor = ppg.PPGMonitor(window=window, hop=hop)
+    rng = np.random.default_rng(2)
+    start = 0
+    while start < len(ir):
+        size = int(rng.integers(1, 3 * hop))
+        monitor.push(red[start:start + size], ir[start:start + size])
+        start += size
+    valid = np.flatnonzero(batch["valid"])
+    last = (int(round(batch["heart_rate"][valid[-1]])), round(float(batch["spo2"][valid[-1]]), 2))
+    same_monitor = monitor.windows == len(batch["end"]) and monitor.latest() == last
+    return same_single, same_monitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="心率血氧计算基准测试")
+    parser.add_argument("--seconds", type=float, default=60.0, help="每个合成信号的长度（秒）")
+    parser.add_argument("--window", type=float, default=4.0, help="分析窗口（秒）")
+    parser.add_argument("--hop", type=int, default=25, help="100Hz 下每隔多少个样本更新一次")
+    parser.add_argument("--cases", type=int, default=40, help="与原算法比较误差的随机信号数")
+    args = parser.parse_args()
+    window = int(args.window * ppg.SAMPLE_RATE)
+
+    failures = check_golden(args.seconds, args.window, args.hop / ppg.SAMPLE_RATE)
+
+    # 与原算法比较：随机心率 / 血氧，带基线漂移和噪声
+    rng = np.random.default_rng(1)
+    legacy_errors, new_errors, legacy_time, new_time, windows = [], [], 0.0, 0.0, 0
+    for i in range(args.cases):
+        hr, spo2 = rng.uniform(50, 200), rng.uniform(85, 99)
+        red, ir = synthetic_ppg(hr, spo2, args.seconds, noise=rng.uniform(0.05, 0.3), wander=rng.uniform(0.2, 2.0),
+                                seed=100 + i)
+        ends = np.arange(window, len(ir) + 1, args.hop)
+        windows += len(ends)
+        t0 = time.perf_counter()
+        legacy = [legacy_calculate(ir[end - window:end].tolist(), red[end - window:end].tolist()) for end in ends]
+        legacy_time += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        result = ppg.analyze_windows(ir, red, window, args.hop)
+        new_time += time.perf_counter() - t0
+        legacy_errors += [(abs(h - hr), abs(s - spo2)) if v else (np.nan, np.nan) for h, s, v in legacy]
+        new_errors += [(abs(h - hr), abs(s - spo2)) if v else (np.nan, np.nan)
+                       for h, s, v in zip(result["heart_rate"], result["spo2"], result["valid"])]
+    legacy_errors, new_errors = np.array(legacy_errors), np.array(new_errors)
+
+    print(f"\n{args.cases} 个随机信号，共 {windows} 个窗口 ({args.window:.0f}s 窗口，每 {args.hop} 个样本更新)")
+    print(f"{'算法':<10} {'有效':>6} {'心率 MAE':>9} {'心率误差>5':>10} {'血氧 MAE':>9} {'每窗口耗时(ms)':>14}")
+    for name, errors, elapsed in (("原算法", legacy_errors, legacy_time), ("ppg.py", new_errors, new_time)):
+        ok = ~np.isnan(errors[:, 0])
+        print(f"{name:<10} {ok.mean():>6.0%} {errors[ok, 0].mean():>9.2f} {(errors[ok, 0] > 5).mean():>10.1%} "
+              f"{errors[ok, 1].mean():>9.2f} {elapsed / windows * 1e3:>14.3f}")
+    speedup = legacy_time / new_time
+    print(f"批量计算加速: {speedup:.1f}x")
+
+    red, ir = synthetic_ppg(80, 96, args.seconds, noise=0.1, seed=7)
+    same_single, same_monitor = check_consistency(ir, red, window, args.hop)
+    print(f"批量与逐窗口一致: {'是' if same_single else '否'}，PPGMonitor 分块输入一致: {'是' if same_monitor else '否'}")
+
+    # 原算法把超出范围的结果截断后总是报告有效，所以比较 "有效且心率误差不超过 5bpm" 的窗口比例
+    accurate = np.mean(new_errors[:, 0] <= 5)
+    legacy_accurate = np.mean(legacy_errors[:, 0] <= 5)
+    print(f"有效且心率误差不超过 5bpm 的窗口: 原算法 {legacy_accurate:.1%}，ppg.py {accurate:.1%}")
+    if accurate <= legacy_accurate:
+        failures.append("准确窗口的比例没有高于原算法")
+    if np.nanmean(new_errors[:, 0]) > 2.0:
+        failures.append("心率平均误差大于 2bpm")
+    if np.nanmean(new_errors[:, 1]) > 1.0:
+        failures.append("血氧平均误差大于 1%")
+    if not same_single:
+        failures.append("批量计算与逐窗口计算结果不同")
+    if not same_monitor:
+        failures.append("PPGMonitor 分块输入的结果与批量计算不同")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_schedule_cache.py
+"""
+基准测试：喂食计划查询，逐次打开 SQLite 连接 vs 内存缓存
+每次“轮询”等价于旧版 /api/sensor_data 的数据库部分: 读取全部计划 + 检查当前是否有到期计划。
+在临时目录中创建数据库，不会影响 catfeeder.db。
+
+用法:
+    python bench_schedule_cache.py --pollers 1 10 100 --seconds 3 --schedules 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import models
+
+
+def poll_uncached():
+    models._query_feeding_schedules()
+    models._should_feed_now_uncached()
+
+
+def poll_cached():
+    models.get_feeding_schedules()
+    models.should_feed_now()
+
+
+def run(poll, pollers, seconds):
+    """返回 (每秒轮询次数, p50 ms, p99 ms)"""
+    latencies = [[] for _ in range(pollers)]
+    stop = threading.Event()
+    barrier = threading.Barrier(pollers + 1)
+
+    def worker(index):
+        samples = latencies[index]
+        barrier.wait()
+        while not stop.is_set():
+            start = time.perf_counter()
+            poll()
+            samples.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(pollers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    merged = sorted(v for samples in latencies for v in samples)
+    if not merged:
+        return 0.0, 0.0, 0.0
+    p50 = merged[len(merged) // 2] * 1000.0
+    p99 = merged[min(len(merged) - 1, int(len(merged) * 0.99))] * 1000.0
+    return len(merged) / elapsed, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="喂食计划查询：数据库 vs 内存缓存")
+    parser.add_argument("--pollers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--schedules", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="catfeeder-bench-")
+    models.configure(os.path.join(workdir, "catfeeder.db"))
+    models.init_db()
+    rng = random.Random(0)
+    for _ in range(args.schedules):
+        models.add_feeding_schedule(f"{rng.randrange(24):02d}:{rng.randrange(60):02d}", rng.choice([10, 20, 30]))
+    print(f"计划数 {args.schedules}，每组 {args.seconds}s，数据库 {workdir}")
+
+    print(f"{'轮询线程':>8} {'路径':<8} {'轮询/秒':>10} {'p50':>9} {'p99':>9}")
+    for pollers in args.pollers:
+        for name, poll in (("sqlite", poll_uncached), ("cache", poll_cached)):
+            rate, p50, p99 = run(poll, pollers, args.seconds)
+            print(f"{pollers:>8} {name:<8} {rate:>10.0f} {p50:>8.3f}ms {p99:>8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
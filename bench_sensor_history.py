@@ -0,0 +1,105 @@
+# bench_sensor_history.py
+"""
+基准测试：传感器历史的写入吞吐和区间查询耗时
+按 --interval 秒的间隔生成 --days 天的合成温湿度 / 重量采样，经 SensorHistory.append 批量写入，
+然后查询最近 1 小时 / 1 天 / 1 周 / 全部范围，并与直接扫描原始采样按本地日期计算的每日平均值比对。
+在 --tz 时区下运行 (默认有夏令时的非 UTC 时区)，日汇总应按本地零点划分；
+并校验迁移 8 用小时汇总重建的日汇总与增量写入的结果一致。
+在临时目录中创建数据库，不会影响 catfeeder.db。
+
+用法:
+    python bench_sensor_history.py --days 365 --interval 60 --tz America/New_York
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import models
+from sensor_history import SensorHistory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器历史写入与查询")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--interval", type=float, default=60.0, help="采样间隔（秒），实际运行时为 2 秒")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tz", default="America/New_York", help="运行时的本地时区 (TZ 环境变量)")
+    args = parser.parse_args()
+    os.environ["TZ"] = args.tz
+    time.tzset()
+
+    models.configure(os.path.join(tempfile.mkdtemp(prefix="catfeeder-history-"), "catfeeder.db"))
+    models.init_db()
+    # 原始采样保留全部时间，便于最后校验汇总结果
+    history = SensorHistory(flush_interval=1e9, capacity=4096, raw_retention=(args.days + 1) * 86400)
+
+    end = 1_700_000_000.0
+    start = end - args.days * 86400
+    ts = np.arange(start, end, args.interval)
+    rng = np.random.default_rng(0)
+    temperature = 22 + 4 * np.sin(ts / 86400 * 2 * math.pi) + rng.normal(0, 0.3, len(ts))
+    humidity = 50 + 10 * np.sin(ts / 86400 * 2 * math.pi + 1) + rng.normal(0, 1, len(ts))
+    weight = np.abs(1.0 + 0.5 * np.sin(ts / 43200 * 2 * math.pi)) + rng.normal(0, 0.01, len(ts))
+    weight[rng.random(len(ts)) < 0.01] = np.nan # 偶发读取失败
+
+    t0 = time.perf_counter()
+    for i in range(len(ts)):
+        w = weight[i]
+        history.append(float(ts[i]), temperature=float(temperature[i]), humidity=float(humidity[i]),
+                       weight=None if np.isnan(w) else float(w))
+    history.flush()
+    elapsed = time.perf_counter() - t0
+    print(f"写入 {len(ts)} 条采样 ({args.days} 天) 用时 {elapsed:.1f}s，{len(ts) / elapsed:.0f} 条/秒，"
+          f"平均每次批量写入 {history.stats()['avg_flush_ms']}ms")
+
+    print(f"\n{'范围':<8} {'分辨率':>8} {'点数':>6} {'p50':>9}")
+    for label, span in (("1 小时", 3600), ("1 天", 86400), ("1 周", 7 * 86400), ("全部", args.days * 86400)):
+        samples, result = [], None
+        for _ in range(args.runs):
+            q0 = time.perf_counter()
+            result = history.query("temperature", end - span, end)
+            samples.append((time.perf_counter() - q0) * 1000.0)
+        samples.sort()
+        print(f"{label:<8} {result['resolution']:>7}s {len(result['points']):>6} {samples[len(samples) // 2]:8.2f}ms")
+
+    # 校验：日汇总的平均值与直接扫描原始采样按本地日期计算的结果一致
+    daily = history.query("weight", start, end, resolution=86400)["points"]
+    conn = models._connect()
+    try:
+        rows = conn.execute(
+            "SELECT CAST(strftime('%s', date(ts, 'unixepoch', 'localtime'), 'utc') AS INTEGER), AVG(weight) "
+            "FROM sensor_samples WHERE weight IS NOT NULL GROUP BY 1 ORDER BY 1").fetchall()
+        # 迁移 8：删除日汇总后用小时汇总重建
+        rebuild = next(statements for version, _, statements in models.MIGRATIONS if version == 8)
+        for statement in rebuild:
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+    rebuilt = history.query("weight", start, end, resolution=86400)["points"]
+
+    failures = []
+    mismatched = [(p, r) for p, r in zip(daily, rows) if p[0] != r[0] or abs(p[3] - r[1]) > 1e-3]
+    if len(daily) != len(rows) or mismatched:
+        failures.append(f"日汇总与原始采样不一致 ({len(daily)} vs {len(rows)} 天, 示例 {mismatched[:2]})")
+    midnight = [p[0] for p in daily if time.localtime(p[0])[3:6] != (0, 0, 0)]
+    if midnight:
+        failures.append(f"日汇总的时间戳不是本地零点: {midnight[:3]}")
+    # 小时汇总按 UTC 整点对齐，只有 UTC 偏移为整小时的时区才能由小时汇总精确重建
+    whole_hours = all(time.localtime(t).tm_gmtoff % 3600 == 0 for t in (start, end))
+    if whole_hours and rebuilt != daily:
+        failures.append("迁移 8 重建的日汇总与增量写入的结果不同")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"\n校验通过：{len(daily)} 个日汇总 ({args.tz}) 与原始采样一致"
+          + ("，迁移重建结果相同" if whole_hours else ""))
+
+if __name__ == '__main__':
+    main()
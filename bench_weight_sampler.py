@@ -0,0 +1,148 @@
+# bench_weight_sampler.py
+"""
+基准测试：HX711 连续采样引擎
+1. 精度：合成 (或 --trace 指定的录制) 重量序列 —— 空碗、加粮、猫进食时碰碗造成的尖峰 + 高斯噪声，
+   比较原始值、旧版 5 次平均和中位数 / EMA / 卡尔曼滤波相对真实重量的误差，以及碰碗时的最大偏差；
+2. 延迟：SimulatedHX711 以 --rate SPS 实时回放，比较旧版 read_weight_kg (5 次阻塞读取 + 50ms 间隔)
+   与从采样线程读取最新估计的耗时。
+合成数据上会校验滤波结果，不满足时以非零状态退出。
+
+用法:
+    python bench_weight_sampler.py --rate 10 --seconds 3
+    python bench_weight_sampler.py --trace recorded.csv
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from weight_sampler import FILTERS, SimulatedHX711, WeightSampler
+
+
+def synthetic_trace(rate, rng):
+    """返回 (读数, 真实重量, 是否为碰碗尖峰)，单位克"""
+    segments = [(0.0, 30), (50.0, 60)] # 空碗 30 秒，加 50g 猫粮后静置 60 秒
+    truth = np.concatenate([np.full(int(seconds * rate), grams) for grams, seconds in segments])
+    eating = np.linspace(50.0, 10.0, int(120 * rate)) # 进食两分钟，逐渐吃掉 40g
+    truth = np.concatenate([truth, eating, np.full(int(30 * rate), 10.0)])
+    readings = truth + rng.normal(0.0, 1.5, len(truth))
+    spikes = np.zeros(len(truth), dtype=bool)
+    start = int(90 * rate)
+    for i in rng.choice(np.arange(start, start + len(eating) - 3), size=25, replace=False):
+        width = rng.integers(1, 3) # 碰碗持续 1~2 个采样
+        spikes[i:i + width] = True
+        readings[i:i + width] += rng.uniform(80.0, 300.0)
+    readings[rng.random(len(truth)) < 0.005] = np.nan # 偶发读取失败
+    return readings, truth, spikes
+
+
+def old_average(readings, reads=5):
+    """旧版 read_weight_kg：连续 reads 个采样取算术平均 (每次调用的结果)"""
+    out = np.full(len(readings), np.nan)
+    for i in range(reads - 1, len(readings)):
+        values = readings[i - reads + 1:i + 1]
+        values = values[~np.isnan(values)]
+        if len(values):
+            out[i] = values.mean()
+    return out
+
+
+def accuracy(readings, truth, spikes, rate):
+    sampler = WeightSampler(source=None, capacity=len(readings))
+    for i, value in enumerate(readings):
+        if not np.isnan(value):
+            sampler.push(value, ts=i / rate)
+    window = sampler.window()
+    valid = ~np.isnan(readings)
+    results = {"old_avg5": old_average(readings)[valid]}
+    for name in FILTERS:
+        results[name] = window[name]
+    truth, spikes = truth[valid], spikes[valid]
+    # 跳过开头 1 秒 (滤波器预热) 和加粮的阶跃附近，单独统计阶跃后的收敛时间
+    settled = np.ones(len(truth), dtype=bool)
+    settled[:int(rate)] = False
+    step = int(np.argmax(truth > 25.0))
+    settled[step:step + int(5 * rate)] = False
+    print(f"{'方法':<10} {'RMSE(g)':>9} {'最大误差(g)':>12} {'碰碗最大偏差(g)':>16} {'阶跃收敛(s)':>12}")
+    summary = {}
+    for name, estimate in results.items():
+        err = np.abs(estimate - truth)
+        rmse = float(np.sqrt(np.nanmean(err[settled] ** 2)))
+        spike_err = float(np.nanmax(err[spikes & settled])) if (spikes & settled).any() else 0.0
+        after = np.flatnonzero(err[step:] < 2.0)
+        settle = after[0] / rate if len(after) else float("inf")
+        summary[name] = (rmse, spike_err, settle)
+        print(f"{name:<10} {rmse:>9.2f} {float(np.nanmax(err[settled])):>12.1f} {spike_err:>16.1f} {settle:>12.1f}")
+    return summary
+
+
+def latency(trace, rate, seconds):
+    source = SimulatedHX711(trace, rate=rate, loop=True)
+    t0 = time.perf_counter()
+    calls = 0
+    while time.perf_counter() - t0 < seconds:
+        values = []
+        for _ in range(5):
+            value = source.getWeight()
+            if value is not None:
+                values.append(value)
+            time.sleep(0.05)
+        calls += 1
+    old_ms = (time.perf_counter() - t0) / calls * 1000.0
+
+    sampler = WeightSampler(SimulatedHX711(trace, rate=rate, loop=True)).start()
+    sampler.wait_samples(2)
+    time.sleep(seconds)
+    n = 100_000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        sampler.latest()
+    new_us = (time.perf_counter() - t0) / n * 1e6
+    stats = sampler.stats()
+    sampler.close()
+    print(f"\n旧版 read_weight_kg: {old_ms:.0f}ms/次 (阻塞)")
+    print(f"采样线程 latest():   {new_us:.2f}us/次，实测采样率 {stats['rate']} SPS (目标 {rate:g})，"
+          f"失败 {stats['errors']} 次")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HX711 连续采样与流式滤波")
+    parser.add_argument("--rate", type=float, default=10.0, help="HX711 输出速率 (SPS)，RATE 引脚接地为 10，接高为 80")
+    parser.add_argument("--seconds", type=float, default=3.0, help="延迟测试时长（秒）")
+    parser.add_argument("--trace", help="录制的采样文件 (克，每行一个值或 CSV 最后一列)，不指定时使用合成数据")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = SimulatedHX711.from_file(args.trace).samples
+        print(f"回放 {args.trace}: {len(trace)} 个采样")
+        sampler = WeightSampler(source=None, capacity=len(trace))
+        for value in trace[~np.isnan(trace)]:
+            sampler.push(value)
+        window = sampler.window()
+        for name in FILTERS:
+            print(f"{name:<8} 标准差 {np.nanstd(window[name]):.2f}g，最后 {window[name][-1]:.1f}g")
+        latency(trace, args.rate, args.seconds)
+        return
+
+    readings, truth, spikes = synthetic_trace(args.rate, np.random.default_rng(0))
+    summary = accuracy(readings, truth, spikes, args.rate)
+    latency(readings, args.rate, args.seconds)
+
+    failures = []
+    if summary["kalman"][0] >= summary["raw"][0] / 2:
+        failures.append("卡尔曼滤波 RMSE 没有比原始读数降低一半")
+    if summary["median"][1] >= 20.0 or summary["kalman"][1] >= 20.0:
+        failures.append("碰碗尖峰没有被中位数滤波剔除")
+    if summary["kalman"][2] > 5.0:
+        failures.append("加粮后 5 秒内没有收敛")
+    if failures:
+        for failure in failures:
+            print(f"校验失败: {failure}")
+        sys.exit(1)
+    print("\n校验通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# compare_backends.py
+"""
+推理后端对比：在固定图片集上运行所有后端，比较延迟和与参考后端的一致性
+
+用法:
+    python compare_backends.py --images test_images/ \\
+        --backend ultralytics:best.pt \\
+        --backend onnxruntime:best.onnx \\
+        --backend onnxruntime:best_int8.onnx
+
+第一个 --backend 作为参考结果，其余后端按类别 + IoU 匹配计算精确率、召回率和平均 IoU。
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from export_model import list_images, load_bgr
+from inference_backend import load_backend
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(reference, candidate, iou_threshold):
+    """贪心匹配同类别检测框，返回 (匹配数, 匹配框的 IoU 列表)"""
+    used = set()
+    ious = []
+    for ref in sorted(reference, key=lambda d: -d["conf"]):
+        best, best_iou = None, iou_threshold
+        for i, det in enumerate(candidate):
+            if i in used or det["class_id"] != ref["class_id"]:
+                continue
+            value = iou(ref["box"], det["box"])
+            if value >= best_iou:
+                best, best_iou = i, value
+        if best is not None:
+            used.add(best)
+            ious.append(best_iou)
+    return len(ious), ious
+
+
+def run_backend(backend, frames, runs):
+    """返回 (每张图的检测结果, 每次推理耗时 ms 列表)"""
+    backend.predict(frames[0]) # 预热
+    outputs, latencies = [], []
+    for frame in frames:
+        for _ in range(runs):
+            start = time.perf_counter()
+            detections = backend.predict(frame)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        outputs.append(detections)
+    return outputs, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理后端精度与延迟对比")
+    parser.add_argument("--images", required=True, help="固定的测试图片目录")
+    parser.add_argument("--backend", action="append", required=True,
+                        help="后端:模型路径，例如 onnxruntime:best.onnx，可重复指定")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.5, help="匹配检测框的 IoU 阈值")
+    parser.add_argument("--runs", type=int, default=3, help="每张图片重复推理次数")
+    args = parser.parse_args()
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"目录 {args.images} 中没有图片")
+        sys.exit(1)
+    frames = [load_bgr(p) for p in paths] # 与摄像头帧相同的 BGR 顺序，所有后端得到同样的输入
+    print(f"测试图片 {len(frames)} 张，每张推理 {args.runs} 次\n")
+
+    reference = None
+    print(f"{'后端':<40} {'mean':>8} {'p50':>8} {'p95':>8} {'检测数':>6} {'精确率':>6} {'召回率':>6} {'mIoU':>6}")
+    for spec in args.backend:
+        kind, _, path = spec.partition(":")
+        backend = load_backend(kind, path, imgsz=args.imgsz, conf=args.conf)
+        outputs, latencies = run_backend(backend, frames, args.runs)
+        latencies.sort()
+        total = sum(len(o) for o in outputs)
+
+        if reference is None:
+            reference = outputs
+            precision = recall = miou = 1.0
+        else:
+            matched, ious, ref_total = 0, [], sum(len(o) for o in reference)
+            for ref, cand in zip(reference, outputs):
+                count, values = match(ref, cand, args.iou)
+                matched += count
+                ious.extend(values)
+            precision = matched / total if total else 1.0
+            recall = matched / ref_total if ref_total else 1.0
+            miou = statistics.mean(ious) if ious else 0.0
+
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{spec:<40} {statistics.mean(latencies):7.1f}ms {p50:7.1f}ms {p95:7.1f}ms "
+              f"{total:>6} {precision:6.3f} {recall:6.3f} {miou:6.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,13 @@
+import sys
 import cv2
 from picamera2 import Picamera2
-from ultralytics import YOLO
+import annotate
+from inference_backend import load_backend
 
-def main(weights_path, imgsz=320, conf=0.5, device="cpu"):
-    # 加载 YOLOv8 模型
-    model = YOLO(weights_path)
-    print(f"模型 {weights_path} 加载成功！")
+def main(weights_path, imgsz=320, conf=0.5, device="cpu", backend="ultralytics"):
+    # 加载模型 (按配置的推理后端)
+    model = load_backend(backend, weights_path, imgsz=imgsz, conf=conf, device=device)
+    print(f"模型 {weights_path} 加载成功！(后端: {backend})")
     
     # 初始化摄像头
     camera = Picamera2()
@@ -35,14 +37,12 @@ def main(weights_path, imgsz=320, conf=0.5, device="cpu"):
             # 确保图像尺寸匹配
             frame = cv2.resize(frame, (imgsz, imgsz))
             
-            # 使用 YOLOv8 进行推理（直接使用 RGB 图像）
-            results = model(frame, imgsz=imgsz, conf=conf, device=device)
+            # 进行推理（直接使用 RGB 图像）
+            detections = model.predict(frame)
             
-            # 绘制检测结果
-            annotated_frame = results[0].plot()
-            
-            # 显示结果（使用 BGR 格式显示）
-            annotated_frame_bgr = cv2.cvtColor(annotated_frame, cv2.COLOR_RGB2BGR)
+            # 绘制检测结果并显示（使用 BGR 格式显示）
+            annotated_frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            annotate.draw_detections(annotated_frame_bgr, detections)
             cv2.imshow("Detection", annotated_frame_bgr)
             
             # 按下 'q' 键退出
@@ -54,5 +54,7 @@ def main(weights_path, imgsz=320, conf=0.5, device="cpu"):
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    weights_path = "best.pt"  
-    main(weights_path)
+    # 用法: python detect.py [模型路径] [后端]
+    weights_path = sys.argv[1] if len(sys.argv) > 1 else "best.pt"
+    backend = sys.argv[2] if len(sys.argv) > 2 else "ultralytics"
+    main(weights_path, backend=backend)
@@ -0,0 +1,123 @@
+# event_hub.py
+"""
+状态推送中心 (Server-Sent Events)
+后台线程把传感器、检测、模式等状态写入共享快照，只有字段真正变化时才序列化一次 JSON，
+所有 /api/events 客户端共享同一份编码好的 SSE 帧；一次性的通知 (例如定时喂食结果) 作为独立事件推送。
+客户端数量增加时，服务器的工作量只是多几次 socket 写入，不再有每客户端的加锁和数据库查询。
+"""
+import collections
+import json
+import threading
+
+
+def _sse_frame(event_id, event, payload):
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class SnapshotHub:
+    """
+    共享状态快照 + 事件广播
+    每次变化都分配一个递增的 id，客户端断线重连时通过 Last-Event-ID 补发错过的事件
+    """
+
+    def __init__(self, initial=None, history=32, keepalive=15.0):
+        self._cond = threading.Condition()
+        self._state = dict(initial or {})
+        self._version = 0
+        self._state_id = 0
+        self._state_json = json.dumps(self._state, ensure_ascii=False)
+        self._state_frame = _sse_frame(0, "state", self._state_json)
+        self._events = collections.deque(maxlen=history) # (id, SSE 帧)
+        self._closed = False
+        self.keepalive = keepalive
+        self.subscribers = 0
+        self.serializations = 1
+
+    def update(self, **fields):
+        """合并字段到快照，有变化时返回 True 并唤醒订阅者"""
+        with self._cond:
+            changed = {k: v for k, v in fields.items() if k not in self._state or self._state[k] != v}
+            if not changed:
+                return False
+            self._state.update(changed)
+            self._version += 1
+            self._state_id = self._version
+            self._state_json = json.dumps(self._state, ensure_ascii=False)
+            self._state_frame = _sse_frame(self._version, "state", self._state_json)
+            self.serializations += 1
+            self._cond.notify_all()
+            return True
+
+    def publish_event(self, event, data):
+        """推送一次性事件 (不并入快照)"""
+        with self._cond:
+            self._version += 1
+            payload = json.dumps(data, ensure_ascii=False)
+            self._events.append((self._version, _sse_frame(self._version, event, payload)))
+            self.serializations += 1
+            self._cond.notify_all()
+
+    def get(self, key, default=None):
+        with self._cond:
+            return self._state.get(key, default)
+
+    def snapshot_json(self):
+        """当前快照的 JSON 字符串 (已缓存，供轮询接口直接返回)"""
+        with self._cond:
+            return self._state_json
+
+    def _pending(self, last_id):
+        """返回 id 大于 last_id 的帧 (调用方持有锁)；快照只发送最新一份"""
+        frames = [(event_id, frame) for event_id, frame in self._events if event_id > last_id]
+        if self._state_id > last_id:
+            frames.append((self._state_id, self._state_frame))
+            frames.sort(key=lambda item: item[0])
+        return frames
+
+    def stream(self, last_event_id=None):
+        """
+        生成 SSE 字节流（生成器）
+        首先发送当前快照 (以及重连时错过的事件)，之后只在有变化时发送；
+        空闲超过 keepalive 秒发送注释行，防止代理或浏览器断开连接
+        """
+        with self._cond:
+            self.subscribers += 1
+            if last_event_id is None or last_event_id > self._version:
+                # 新连接 (或服务器重启后的旧 id)：只补发当前快照
+                last_id = self._version
+                pending = [(self._state_id, self._state_frame)]
+            else:
+                last_id = last_event_id
+                pending = self._pending(last_id)
+                last_id = self._version
+        try:
+            yield b"retry: 3000\n\n"
+            for _, frame in pending:
+                yield frame
+            while not self._closed:
+                with self._cond:
+                    if self._version == last_id:
+                        self._cond.wait(self.keepalive)
+                    pending = self._pending(last_id)
+                    last_id = self._version
+                if not pending:
+                    yield b": keepalive\n\n"
+                    continue
+                for _, frame in pending:
+                    yield frame
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self.subscribers,
+                "version": self._version,
+                "serializations": self.serializations,
+            }
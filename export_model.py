@@ -0,0 +1,137 @@
+# export_model.py
+"""
+模型导出工具：把 best.pt 导出为 ONNX / OpenVINO / TFLite，可选 INT8 量化
+
+用法:
+    python export_model.py --weights best.pt --format onnx
+    python export_model.py --weights best.pt --format onnx --int8 --calib-dir calib_images/
+    python export_model.py --weights best.pt --format openvino --int8 --data data.yaml
+
+ONNX 的 INT8 量化使用 onnxruntime 静态量化，校准数据取自 --calib-dir 中的图片，
+预处理与 inference_backend.OnnxRuntimeBackend 完全一致。
+OpenVINO / TFLite 的 INT8 量化由 ultralytics 完成，需要通过 --data 指定数据集 yaml。
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+from inference_backend import preprocess
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(folder, limit=None):
+    """按文件名排序列出文件夹中的图片"""
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if limit:
+        files = files[:limit]
+    return [os.path.join(folder, f) for f in files]
+
+
+def load_bgr(path):
+    """读取图片为 BGR uint8 HWC (推理后端的输入格式，见 inference_backend)"""
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"无法读取图片: {path}")
+    return image
+
+
+class ImageFolderCalibrationReader:
+    """onnxruntime 静态量化的校准数据读取器"""
+
+    def __init__(self, input_name, images, imgsz):
+        self.input_name = input_name
+        self.images = images
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.images):
+            return None
+        tensor, _, _ = preprocess(load_bgr(self.images[self._index]), self.imgsz)
+        self._index += 1
+        return {self.input_name: tensor}
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize_onnx_int8(onnx_path, calib_dir, imgsz, calib_count=100, output_path=None):
+    """使用校准图片对 ONNX 模型做 INT8 静态量化，返回量化模型路径"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    images = list_images(calib_dir, calib_count)
+    if not images:
+        raise ValueError(f"校准目录 {calib_dir} 中没有图片")
+
+    base, _ = os.path.splitext(onnx_path)
+    output_path = output_path or f"{base}_int8.onnx"
+    prepared_path = f"{base}_prep.onnx"
+    quant_pre_process(onnx_path, prepared_path)
+
+    input_name = ort.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = ImageFolderCalibrationReader(input_name, images, imgsz)
+    print(f"使用 {len(images)} 张校准图片进行 INT8 量化...")
+    quantize_static(prepared_path, output_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True)
+    os.remove(prepared_path)
+
+    # 保留 ultralytics 写入的类别名等元数据
+    import onnx
+    source = onnx.load(onnx_path)
+    quantized = onnx.load(output_path)
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, output_path)
+    return output_path
+
+
+def export(weights, fmt, imgsz, int8=False, calib_dir=None, calib_count=100, data=None):
+    from ultralytics import YOLO
+    model = YOLO(weights)
+
+    if fmt == "onnx":
+        # 导出动态 batch，便于批量推理
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            if not calib_dir:
+                raise ValueError("ONNX INT8 量化需要 --calib-dir")
+            path = quantize_onnx_int8(path, calib_dir, imgsz, calib_count)
+        return path
+
+    kwargs = {"format": fmt, "imgsz": imgsz, "int8": int8}
+    if int8:
+        if not data:
+            raise ValueError(f"{fmt} INT8 量化需要 --data 指定数据集 yaml")
+        kwargs["data"] = data
+    return model.export(**kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出 best.pt 为其他推理后端的模型格式")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--format", default="onnx", choices=["onnx", "openvino", "tflite"])
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--int8", action="store_true", help="INT8 量化")
+    parser.add_argument("--calib-dir", help="ONNX INT8 校准图片目录")
+    parser.add_argument("--calib-count", type=int, default=100, help="最多使用的校准图片数量")
+    parser.add_argument("--data", help="OpenVINO / TFLite INT8 量化使用的数据集 yaml")
+    args = parser.parse_args()
+
+    try:
+        path = export(args.weights, args.format, args.imgsz, args.int8,
+                      args.calib_dir, args.calib_count, args.data)
+    except Exception as e:
+        print(f"导出失败: {e}")
+        sys.exit(1)
+    print(f"导出完成: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+# fake_gpio.py
+"""
+RPi.GPIO 替身，用于在没有树莓派的机器上运行 HX711 相关代码
+FakeGPIO 实现 hx711v0_5_1 和 hardware 用到的接口 (setmode / setup / input / output / add_event_detect / PWM ...)，
+边沿回调和 RPi.GPIO 一样在单独的回调线程中依次执行。
+FakeHX711Chip 挂在 DOUT / PD_SCK 引脚上模拟芯片时序：每个转换周期拉低 DOUT，
+PD_SCK 上升沿逐位移出 24 位补码数据，读完后 DOUT 恢复高电平。
+
+用法:
+    import fake_gpio
+    gpio = fake_gpio.install()          # 必须在 import hx711v0_5_1 / hardware 之前调用
+    chip = fake_gpio.FakeHX711Chip(gpio, dout=5, pd_sck=6, samples=grams, rate=10).start()
+"""
+import queue
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+
+class FakePWM:
+
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0.0
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+
+    def stop(self):
+        self.duty_cycle = 0.0
+
+
+class FakeGPIO(types.ModuleType):
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_UP = 22
+    PUD_DOWN = 21
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.PWM = FakePWM
+        self._levels = {}
+        self._devices = {} # 引脚 -> 处理输出变化的模拟器件
+        self._callbacks = {} # 引脚 -> (边沿, 回调)
+        self._events = queue.Queue()
+        self._thread = None
+        self.callbacks_run = 0
+
+    # --- RPi.GPIO 接口 ---
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self._levels.setdefault(pin, self.HIGH if initial is None else initial)
+
+    def input(self, pin):
+        return self._levels.get(pin, self.HIGH)
+
+    def output(self, pin, value):
+        value = self.HIGH if value else self.LOW
+        self._levels[pin] = value
+        device = self._devices.get(pin)
+        if device is not None:
+            device.on_output(pin, value)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        if pin in self._callbacks:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        self._callbacks[pin] = (edge, callback)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name="fake-gpio-callbacks", daemon=True)
+            self._thread.start()
+
+    def remove_event_detect(self, pin):
+        self._callbacks.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        self._callbacks.clear()
+
+    # --- 模拟器件使用 ---
+    def attach(self, pin, device):
+        self._devices[pin] = device
+
+    def drive(self, pin, value):
+        """器件驱动输入引脚电平，产生的边沿交给回调线程"""
+        old = self._levels.get(pin, self.HIGH)
+        self._levels[pin] = value
+        if old == value or pin not in self._callbacks:
+            return
+        edge = self._callbacks[pin][0]
+        if edge == self.BOTH or (edge == self.FALLING) == (value == self.LOW):
+            self._events.put(pin)
+
+    def _dispatch(self):
+        while True:
+            pin = self._events.get()
+            entry = self._callbacks.get(pin)
+            if entry and entry[1]:
+                try:
+                    entry[1](pin)
+                except Exception as e:
+                    print(f"GPIO 回调出错: {e}")
+                self.callbacks_run += 1
+
+
+class FakeHX711Chip:
+    """
+    参数:
+        gpio: FakeGPIO
+        dout / pd_sck: 引脚号
+        samples: 依次输出的重量 (克)，循环使用
+        rate: 输出速率 (SPS)
+        reference_unit: 每克对应的 ADC 计数 (与 HX711.setReferenceUnit 一致)
+    """
+
+    def __init__(self, gpio, dout, pd_sck, samples, rate=10.0, reference_unit=1.0):
+        self.gpio = gpio
+        self.dout = dout
+        self.pd_sck = pd_sck
+        self.samples = np.asarray(samples, dtype=np.float64)
+        self.rate = rate
+        self.reference_unit = reference_unit
+        self._lock = threading.Lock()
+        self._index = 0
+        self._data = 0
+        self._bits = None # None 表示没有待读出的数据
+        self._closed = False
+        self.conversions = 0
+        self.reads = 0
+        gpio.attach(pd_sck, self)
+        gpio.setup(dout, gpio.IN)
+        gpio.drive(dout, gpio.HIGH)
+        self._thread = threading.Thread(target=self._run, name="fake-hx711", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        while not self._closed:
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                if self._bits not in (None, 0):
+                    continue # 正在读出上一个采样，本次转换结果丢弃
+                grams = self.samples[self._index % len(self.samples)]
+                self._index += 1
+                self._data = int(round(grams * self.reference_unit)) & 0xFFFFFF
+                self._bits = 0
+                self.conversions += 1
+            self.gpio.drive(self.dout, self.gpio.LOW)
+
+    def on_output(self, pin, value):
+        """PD_SCK 上升沿移出下一位；第 25 个脉冲后 DOUT 恢复高电平"""
+        if pin != self.pd_sck or value != self.gpio.HIGH:
+            return
+        with self._lock:
+            if self._bits is None:
+                return
+            if self._bits < 24:
+                bit = (self._data >> (23 - self._bits)) & 1
+                self._bits += 1
+                level = self.gpio.HIGH if bit else self.gpio.LOW
+            else:
+                self._bits = None
+                self.reads += 1
+                level = self.gpio.HIGH
+        self.gpio.drive(self.dout, level)
+
+    def close(self):
+        self._closed = True
+
+
+def install():
+    """注册 RPi / RPi.GPIO 模块，返回 FakeGPIO 实例"""
+    gpio = FakeGPIO()
+    package = types.ModuleType("RPi")
+    package.GPIO = gpio
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = gpio
+    return gpio
@@ -0,0 +1,215 @@
+# fake_smbus.py
+"""
+smbus 替身，用于在没有 MAX30102 的机器上运行心率血氧相关代码
+FakeSMBus 实现 read_byte_data / write_byte_data / read_i2c_block_data，按地址转发给挂在总线上的器件，
+并统计事务数和字节数；latency 模拟每个 I2C 事务在总线上的耗时 (400kHz 时每字节约 22.5 微秒)。
+FakeMAX30102 模拟芯片的 32 级 FIFO:
+    按 SPO2_CONFIG 的采样率和 FIFO_CONFIG 的 SMP_AVE 计算输出速率，随时间把样本写入 FIFO、移动 FIFO_WR_PTR；
+    FIFO 满时 (FIFO_ROLLOVER_EN = 0) 新样本丢弃并累加 OVF_COUNTER，读出一个完整样本后 OVF_COUNTER 清零；
+    从 FIFO_DATA 读出 6 个字节 (红光 3 字节 + 红外 3 字节) 后 FIFO_RD_PTR 加一，该寄存器地址不自增；
+    新样本到达时置位 INTR_STATUS_1 的 PPG_RDY，读取中断状态或 FIFO_DATA 时清除。
+样本来自 ppg_sim.synthetic_ppg 或调用方提供的 (red, ir) 数组，循环使用。
+
+用法:
+    import fake_smbus
+    fake_smbus.install()                # 必须在 import hardware / max30102 之前调用
+    sensor = max30102.MAX30102()
+    chip = sensor.bus.devices[0x57]     # 默认挂一个 FakeMAX30102
+"""
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+from ppg_sim import synthetic_ppg
+
+I2C_BLOCK_MAX = 32 # smbus 的 I2C 块读取上限 (字节)
+FIFO_DEPTH = 32
+SAMPLE_RATES = (50, 100, 200, 400, 800, 1000, 1600, 3200) # SPO2_CONFIG[4:2]
+SAMPLE_AVERAGES = (1, 2, 4, 8, 16, 32, 32, 32)             # FIFO_CONFIG[7:5]
+
+REG_INTR_STATUS_1 = 0x00
+REG_FIFO_WR_PTR = 0x04
+REG_OVF_COUNTER = 0x05
+REG_FIFO_RD_PTR = 0x06
+REG_FIFO_DATA = 0x07
+REG_FIFO_CONFIG = 0x08
+REG_MODE_CONFIG = 0x09
+REG_SPO2_CONFIG = 0x0A
+REG_PART_ID = 0xFF
+
+
+class FakeMAX30102:
+    """
+    参数:
+        red / ir: 依次输出的 18 位样本，默认 60 秒 75bpm / 97% 的合成信号
+        clock: 时间函数 (秒)
+    """
+
+    def __init__(self, red=None, ir=None, clock=time.monotonic):
+        if red is None or ir is None:
+            red, ir = synthetic_ppg(75.0, 97.0, 60.0)
+        self.red = np.asarray(red, dtype=np.int64) & 0x3FFFF
+        self.ir = np.asarray(ir, dtype=np.int64) & 0x3FFFF
+        self.clock = clock
+        self._reset()
+
+    def _reset(self):
+        self.registers = bytearray(256)
+        self.registers[REG_PART_ID] = 0x15
+        self._fifo = [(0, 0)] * FIFO_DEPTH
+        self._count = 0       # FIFO 中的样本数 (指针相等时区分空和满)
+        self._byte = 0        # 当前样本已读出的字节数
+        self._anchor = None   # (时间, 已产生的样本数)：进入 SpO2 模式或修改采样率时重新计时
+        self.generated = 0    # 芯片产生的样本数 (包括溢出丢弃的)
+        self.dropped = 0
+        self.underruns = 0    # FIFO 为空时读取 FIFO_DATA 的次数
+
+    @property
+    def rate(self):
+        """FIFO 的输出速率 (样本/秒)"""
+        sr = SAMPLE_RATES[(self.registers[REG_SPO2_CONFIG] >> 2) & 0x07]
+        return sr / SAMPLE_AVERAGES[self.registers[REG_FIFO_CONFIG] >> 5]
+
+    @property
+    def pending(self):
+        """FIFO 中尚未读出的样本数"""
+        return self._count
+
+    def _advance(self):
+        """把从上次访问到现在产生的样本写入 FIFO"""
+        if self._anchor is None:
+            return
+        since, count = self._anchor
+        due = count + int((self.clock() - since) * self.rate)
+        new = due - self.generated
+        if new <= 0:
+            return
+        stored = min(new, FIFO_DEPTH - self._count)
+        for i in range(self.generated, self.generated + stored):
+            wr = self.registers[REG_FIFO_WR_PTR]
+            self._fifo[wr] = (int(self.red[i % len(self.red)]), int(self.ir[i % len(self.ir)]))
+            self.registers[REG_FIFO_WR_PTR] = (wr + 1) % FIFO_DEPTH
+        self._count += stored
+        lost = new - stored
+        if lost:
+            self.dropped += lost
+            self.registers[REG_OVF_COUNTER] = min(0x1F, self.registers[REG_OVF_COUNTER] + lost)
+        self.generated = due
+        self.registers[REG_INTR_STATUS_1] |= 0x40 # PPG_RDY
+
+    def read(self, reg):
+        self._advance()
+        if reg == REG_FIFO_DATA:
+            return self._read_fifo_byte()
+        value = self.registers[reg]
+        if reg == REG_INTR_STATUS_1:
+            self.registers[reg] = 0
+        return value
+
+    def read_block(self, reg, length):
+        """块读取：FIFO_DATA 连续读出 FIFO，其他寄存器地址自增"""
+        self._advance()
+        if reg == REG_FIFO_DATA:
+            return [self._read_fifo_byte() for _ in range(length)]
+        return [self.read(r % 256) for r in range(reg, reg + length)]
+
+    def _read_fifo_byte(self):
+        self.registers[REG_INTR_STATUS_1] &= ~0x40 & 0xFF
+        if self._count == 0:
+            self.underruns += 1
+            return 0
+        rd = self.registers[REG_FIFO_RD_PTR]
+        red, ir = self._fifo[rd]
+        value = (red if self._byte < 3 else ir) >> (8 * (2 - self._byte % 3)) & 0xFF
+        self._byte += 1
+        if self._byte == 6:
+            self._byte = 0
+            self._count -= 1
+            self.registers[REG_FIFO_RD_PTR] = (rd + 1) % FIFO_DEPTH
+            self.registers[REG_OVF_COUNTER] = 0 # 读出一个完整样本后清零
+        return value
+
+    def write(self, reg, value):
+        self._advance()
+        if reg == REG_MODE_CONFIG and value & 0x40:
+            self._reset()
+            return
+        self.registers[reg] = value & 0xFF
+        if reg in (REG_FIFO_WR_PTR, REG_FIFO_RD_PTR):
+            self.registers[reg] &= FIFO_DEPTH - 1
+            self._count = (self.registers[REG_FIFO_WR_PTR] - self.registers[REG_FIFO_RD_PTR]) % FIFO_DEPTH
+            self._byte = 0
+        elif reg == REG_MODE_CONFIG:
+            if value & 0x07 == 0x03 and self._anchor is None:
+                self._anchor = (self.clock(), self.generated)
+            elif value & 0x07 != 0x03:
+                self._anchor = None
+        elif reg in (REG_SPO2_CONFIG, REG_FIFO_CONFIG) and self._anchor is not None:
+            self._anchor = (self.clock(), self.generated)
+
+
+class FakeSMBus:
+    """
+    参数:
+        latency: 每个事务的固定耗时 + 每字节耗时 (秒)，默认近似 400kHz 总线
+    """
+
+    def __init__(self, bus=1, latency=(100e-6, 22.5e-6)):
+        self.bus = bus
+        self.latency = latency
+        self.devices = {}
+        self._lock = threading.Lock()
+        self.transactions = 0
+        self.bytes = 0
+
+    def attach(self, address, device):
+        self.devices[address] = device
+        return device
+
+    def _device(self, address):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(121, "Remote I/O error") # 与 smbus 在地址无应答时一致
+        return device
+
+    def _transfer(self, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        delay = self.latency[0] + self.latency[1] * nbytes
+        if delay > 0:
+            time.sleep(delay)
+
+    def read_byte_data(self, address, reg):
+        with self._lock:
+            self._transfer(1)
+            return self._device(address).read(reg)
+
+    def write_byte_data(self, address, reg, value):
+        with self._lock:
+            self._transfer(1)
+            self._device(address).write(reg, value)
+
+    def read_i2c_block_data(self, address, reg, length=I2C_BLOCK_MAX):
+        if length > I2C_BLOCK_MAX:
+            raise ValueError(f"I2C 块读取最多 {I2C_BLOCK_MAX} 字节: {length}")
+        with self._lock:
+            self._transfer(length)
+            return self._device(address).read_block(reg, length)
+
+    def close(self):
+        pass
+
+
+def install(device_factory=FakeMAX30102, address=0x57, **kwargs):
+    """注册 smbus 模块：之后每次 smbus.SMBus(n) 返回一条新的 FakeSMBus，并在 address 上挂 device_factory() 创建的器件"""
+    def SMBus(bus=1):
+        fake = FakeSMBus(bus, **kwargs)
+        fake.attach(address, device_factory())
+        return fake
+    module = types.ModuleType("smbus")
+    module.SMBus = SMBus
+    sys.modules["smbus"] = module
+    return module
@@ -0,0 +1,167 @@
+# feed_calibration.py
+"""
+出粮流量标定
+每次称重喂食后记录 (喂食口打开时间, 实测出粮量, 喂食前的料仓余量)，用带遗忘因子的递推最小二乘 (RLS) 在线拟合:
+    出粮量 = 打开时间 x (a + b x 余量比例) + c
+a + b x 余量比例 是当前余量下的流量 (料仓越空流量越小)，c 吸收舵机动作和落料带来的固定偏差。
+每次喂食只做一次 3x3 的增量更新，不需要保存全部历史；遗忘因子让模型跟上猫粮更换、受潮等慢变化。
+
+料仓余量没有传感器，按 "最近一次加粮后的余量 - 之后的出粮量" 估计，加粮时通过 refill() 告知。
+记录写入 feed_calibration 表，启动时按顺序重放恢复模型。
+样本不足或拟合结果不可信 (流量过小) 时使用 hardware.FEED_RATE 作为先验。
+"""
+import threading
+
+import numpy as np
+
+import models
+
+
+class FlowModel:
+    """
+    参数:
+        prior_rate: 先验流量 (克/秒)
+        forgetting: 遗忘因子 λ，越小越快忘记旧数据
+        p0: 初始协方差，越大先验越弱
+    """
+
+    def __init__(self, prior_rate=5.0, forgetting=0.98, p0=100.0, p_max=1e4):
+        self.prior_rate = prior_rate
+        self.forgetting = forgetting
+        self.p0 = p0
+        self.p_max = p_max
+        self.reset()
+
+    def reset(self):
+        self.theta = np.array([self.prior_rate, 0.0, 0.0]) # a, b, c
+        self.P = np.eye(3) * self.p0
+        self.samples = 0
+        self.residual = None # 预测误差 (克) 的 EMA，衡量模型当前的准确度
+
+    @staticmethod
+    def features(open_time, level):
+        return np.array([open_time, open_time * level, 1.0])
+
+    def predict(self, open_time, level):
+        return float(self.theta @ self.features(open_time, level))
+
+    def update(self, open_time, delta, level):
+        """用一次观测更新参数，返回更新前的预测误差 (克)"""
+        x = self.features(open_time, level)
+        error = delta - float(self.theta @ x)
+        Px = self.P @ x
+        gain = Px / (self.forgetting + x @ Px)
+        self.theta = self.theta + gain * error
+        self.P = self.P - np.outer(gain, Px)
+        # 激励不足时协方差会随遗忘因子无限增大 (估计器饱和)，超过上限后暂停遗忘
+        if np.trace(self.P) < self.p_max:
+            self.P /= self.forgetting
+        self.samples += 1
+        self.residual = abs(error) if self.residual is None else self.residual + 0.2 * (abs(error) - self.residual)
+        return error
+
+    def flow_rate(self, level):
+        a, b, _ = self.theta
+        return float(a + b * level)
+
+
+class FeedCalibration:
+    """
+    参数:
+        capacity: 料仓容量 (克)
+        prior_rate / min_time / max_time: 先验流量和打开时间的限制 (hardware 的 FEED_RATE 等常量)
+        min_samples: 至少多少次实测喂食后才使用拟合的模型
+        store: 是否把记录写入数据库
+    """
+
+    def __init__(self, capacity=1000.0, prior_rate=5.0, min_time=0.5, max_time=10.0,
+                 min_samples=3, min_rate=0.5, store=True):
+        self.capacity = capacity
+        self.min_time = min_time
+        self.max_time = max_time
+        self.min_samples = min_samples
+        self.min_rate = min_rate
+        self.store = store
+        self.model = FlowModel(prior_rate)
+        self.hopper_level = capacity
+        self._lock = threading.Lock()
+
+    def _level_fraction(self):
+        return min(max(self.hopper_level / self.capacity, 0.0), 1.0)
+
+    def load(self, records):
+        """按时间顺序重放 [(kind, open_time, delta, hopper_level), ...]"""
+        with self._lock:
+            for kind, open_time, delta, level in records:
+                if kind == "feed" and open_time and delta is not None:
+                    self.model.update(open_time, delta, min(max(level / self.capacity, 0.0), 1.0))
+                    self.hopper_level = max(0.0, level - delta)
+                elif kind == "level":
+                    self.hopper_level = level
+        return self
+
+    def flow_rate(self):
+        """当前余量下的预计流量 (克/秒)"""
+        with self._lock:
+            return self._flow_rate()
+
+    def _flow_rate(self):
+        if self.model.samples < self.min_samples:
+            return self.model.prior_rate
+        rate = self.model.flow_rate(self._level_fraction())
+        return rate if rate >= self.min_rate else self.model.prior_rate
+
+    def open_time_for(self, grams):
+        """出粮 grams 克需要的打开时间 (秒)，限制在 [min_time, max_time]"""
+        with self._lock:
+            rate = self._flow_rate()
+            offset = self.model.theta[2] if self.model.samples >= self.min_samples else 0.0
+            return min(max((grams - offset) / rate, self.min_time), self.max_time)
+
+    def record(self, open_time, delta):
+        """记录一次实测喂食：更新模型并扣减料仓余量"""
+        with self._lock:
+            level = self.hopper_level
+            self.model.update(open_time, delta, self._level_fraction())
+            self.hopper_level = max(0.0, level - delta)
+        if self.store:
+            models.log_feed_calibration("feed", level, open_time, delta)
+
+    def consume(self, grams):
+        """没有称重数据的喂食 (计时喂食) 只按目标量扣减余量，不参与拟合"""
+        with self._lock:
+            self.hopper_level = max(0.0, self.hopper_level - grams)
+            level = self.hopper_level
+        if self.store:
+            models.log_feed_calibration("level", level)
+
+    def refill(self, level=None):
+        """加粮后调用，level 为加粮后的余量 (克)，默认加满"""
+        with self._lock:
+            self.hopper_level = self.capacity if level is None else min(max(float(level), 0.0), self.capacity)
+            level = self.hopper_level
+        if self.store:
+            models.log_feed_calibration("level", level)
+        return level
+
+    def reset(self):
+        """丢弃学习到的模型 (恢复先验)，料仓余量不变"""
+        with self._lock:
+            self.model.reset()
+            level = self.hopper_level
+        if self.store:
+            models.clear_feed_calibration(level)
+
+    def stats(self):
+        with self._lock:
+            a, b, c = self.model.theta
+            return {
+                "samples": self.model.samples,
+                "active": self.model.samples >= self.min_samples,
+                "coefficients": {"a": round(float(a), 3), "b": round(float(b), 3), "c": round(float(c), 3)},
+                "flow_rate": round(self._flow_rate(), 3),
+                "prior_rate": self.model.prior_rate,
+                "residual": round(float(self.model.residual), 2) if self.model.residual is not None else None,
+                "hopper_level": round(float(self.hopper_level), 1),
+                "hopper_capacity": self.capacity,
+            }
@@ -0,0 +1,238 @@
+# feed_controller.py
+"""
+闭环称重喂食
+打开喂食口后跟随 WeightSampler 的每个新采样，碗中增加的重量达到 "目标 - 预计过冲" 时关闭喂食口，
+等落料稳定后以实测增量作为实际出粮量。
+
+过冲来自关闭指令发出后仍在空中的猫粮、舵机动作时间和滤波延迟，大致等于 "关闭时的流量 x 延迟"。
+控制器记录每次喂食关闭时的流量和关闭后多落下的重量，用 EMA 学习这个等效延迟 (秒)；
+按延迟而不是固定克数补偿，料仓变空、流量变小时补偿量会随之减小。
+
+出粮异常时提前关闭:
+    "stalled" - stall_time 秒内重量没有增加 (卡料或料仓已空)；提供 agitate 时先抖动疏通 max_agitations 次
+    "timeout" - 超过 max_time 秒仍未达到目标
+    "sensor"  - 称重数据中断
+舵机打开或关闭失败时返回 "servo"；平滑关闭失败 (close_gate 返回 False) 时调用 force_close 立即关闭。
+"""
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class FeedResult:
+    """一次喂食的结果，bool(result) 表示是否正常完成"""
+
+    def __init__(self, requested, dispensed=None, duration=0.0, stopped_by="timer",
+                 overshoot=None, flow_rate=None, ok=True):
+        self.requested = requested
+        self.dispensed = dispensed # 实测出粮量 (克)，计时喂食时为 None
+        self.duration = duration # 喂食口打开的时间 (秒)
+        self.stopped_by = stopped_by
+        self.overshoot = overshoot # 关闭后多落下的重量 (克)
+        self.flow_rate = flow_rate # 关闭时的流量 (克/秒)
+        self.ok = ok
+
+    def __bool__(self):
+        return self.ok
+
+    def fed(self):
+        """是否有猫粮落下 (需要记录)：正常完成，或提前结束但实测有出粮"""
+        return self.ok or (self.dispensed or 0.0) > 0.5
+
+    def log_fields(self):
+        """写入 feeding_logs 的测量字段 (models.log_feeding 的关键字参数)；只有正常关闭时的过冲用于学习"""
+        overshoot = self.overshoot if self.stopped_by == "target" else None
+        return {"dispensed": self.dispensed, "overshoot": overshoot, "flow_rate": self.flow_rate}
+
+    def to_dict(self):
+        def r(value, digits=1):
+            return round(value, digits) if value is not None else None
+        return {
+            "requested": self.requested,
+            "dispensed": r(self.dispensed),
+            "duration": r(self.duration, 2),
+            "stopped_by": self.stopped_by,
+            "overshoot": r(self.overshoot),
+            "flow_rate": r(self.flow_rate, 2),
+            "ok": self.ok,
+        }
+
+
+class OvershootModel:
+    """
+    关闭延迟的在线估计: 预计过冲 = 当前流量 x lag
+    参数:
+        lag: 初始延迟 (秒)
+        alpha: EMA 系数
+        max_lag: 单次观测的上限，防止一次异常 (例如猫碰碗) 把估计带偏
+    """
+
+    def __init__(self, lag=0.3, alpha=0.3, max_lag=2.0):
+        self.lag = lag
+        self.alpha = alpha
+        self.max_lag = max_lag
+        self.samples = 0
+
+    def predict(self, flow_rate):
+        return max(0.0, flow_rate) * self.lag
+
+    def update(self, overshoot, flow_rate):
+        """用一次观测更新延迟估计，返回观测到的延迟；流量太小无法估计时返回 None"""
+        if flow_rate is None or flow_rate <= 0.5:
+            return None
+        observed = min(max(overshoot / flow_rate, 0.0), self.max_lag)
+        self.lag += self.alpha * (observed - self.lag)
+        self.samples += 1
+        return observed
+
+    def seed(self, history):
+        """用历史记录 [(overshoot, flow_rate), ...] (按时间先后) 恢复估计"""
+        for overshoot, flow_rate in history:
+            if overshoot is not None:
+                self.update(overshoot, flow_rate)
+
+
+class FeedController:
+    """
+    参数:
+        sampler: WeightSampler (克)，建议 HX711 以 80 SPS 运行以降低控制延迟
+        open_gate / close_gate: 打开 / 关闭喂食口的函数，返回 False 表示舵机控制失败
+        force_close: close_gate 失败后立即关闭喂食口的函数 (可选)
+        agitate: 卡料时疏通的函数 (可选)，max_agitations 为每次喂食最多疏通几次
+        model: OvershootModel
+        filter: 控制使用的滤波结果，中位数延迟最小且能剔除尖峰
+        max_time / stall_time / settle_time: 见模块说明；settle_time 为关闭后等待落料稳定的时间
+        flow_window: 估计流量使用的时间窗口 (秒)
+    """
+
+    def __init__(self, sampler, open_gate, close_gate, model=None, filter="median", agitate=None, max_agitations=2,
+                 max_time=10.0, stall_time=3.0, settle_time=1.5, flow_window=0.5, min_progress=1.0, force_close=None):
+        self.sampler = sampler
+        self.open_gate = open_gate
+        self.close_gate = close_gate
+        self.force_close = force_close
+        self.agitate = agitate
+        self.max_agitations = max_agitations if agitate else 0
+        self.model = model or OvershootModel()
+        self.filter = filter
+        self.max_time = max_time
+        self.stall_time = stall_time
+        self.settle_time = settle_time
+        self.flow_window = flow_window
+        self.min_progress = min_progress
+        self._lock = threading.Lock() # 同一时间只有一次喂食
+        self.feeds = 0
+        self.agitations = 0
+        self.close_failures = 0
+        self.last_result = None
+
+    def _close(self):
+        """关闭喂食口，平滑关闭失败时改用 force_close，返回平滑关闭是否成功"""
+        if self.close_gate() is not False:
+            return True
+        print("关闭喂食口失败，立即强制关闭")
+        self.close_failures += 1
+        if self.force_close is not None:
+            self.force_close()
+        return False
+
+    def _weight(self):
+        return self.sampler.latest(self.filter)
+
+    def _recent_weight(self, n=8):
+        """最近 n 个采样的中位数"""
+        window = self.sampler.window(n)[self.filter]
+        window = window[~np.isnan(window)]
+        return float(np.median(window)) if len(window) else self._weight()
+
+    def _flow_rate(self, history):
+        """最近窗口内重量对时间的线性拟合斜率 (克/秒)；窗口不到一半时几个噪声采样的斜率不可信，返回 0"""
+        if len(history) < 3 or history[-1][0] - history[0][0] < self.flow_window / 2:
+            return 0.0
+        t, w = np.array(history).T
+        denom = np.dot(t - t.mean(), t - t.mean())
+        return float(np.dot(t - t.mean(), w - w.mean()) / denom) if denom > 0 else 0.0
+
+    def dispense(self, grams, max_time=None):
+        """
+        出粮 grams 克，返回 FeedResult；称重数据不可用时不打开喂食口，返回 stopped_by="sensor"
+        max_time 覆盖默认的最长打开时间 (例如按标定的流量估计)
+        """
+        max_time = self.max_time if max_time is None else min(max_time, self.max_time)
+        with self._lock:
+            if self._weight() is None:
+                return FeedResult(grams, stopped_by="sensor", ok=False)
+            baseline = self._recent_weight()
+
+            history = collections.deque()
+            stopped_by = "timeout"
+            delta = 0.0
+            flow = 0.0
+            start = time.monotonic()
+            progress_at, progress_weight = start, 0.0
+            agitations = 0
+            if self.open_gate() is False:
+                self._close()
+                return FeedResult(grams, stopped_by="servo", ok=False)
+            try:
+                while True:
+                    if time.monotonic() - start >= max_time:
+                        break
+                    if not self.sampler.wait_samples(1, timeout=self.sampler.max_age):
+                        stopped_by = "sensor"
+                        break
+                    weight = self._weight()
+                    if weight is None:
+                        stopped_by = "sensor"
+                        break
+                    now = time.monotonic()
+                    delta = weight - baseline
+                    history.append((now, delta))
+                    while history and now - history[0][0] > self.flow_window:
+                        history.popleft()
+                    flow = self._flow_rate(history)
+                    if delta >= grams - self.model.predict(flow):
+                        stopped_by = "target"
+                        break
+                    if delta - progress_weight >= self.min_progress:
+                        progress_at, progress_weight = now, delta
+                    elif now - progress_at >= self.stall_time:
+                        if agitations >= self.max_agitations:
+                            stopped_by = "stalled"
+                            break
+                        print("出粮停滞，抖动喂食口疏通卡料")
+                        agitations += 1
+                        self.agitate()
+                        history.clear()
+                        progress_at = time.monotonic()
+            finally:
+                if not self._close():
+                    stopped_by = "servo"
+            duration = time.monotonic() - start
+
+            time.sleep(self.settle_time) # 等待空中的猫粮落下、秤稳定
+            final = self._recent_weight()
+            dispensed = final - baseline if final is not None else None
+            overshoot = dispensed - delta if dispensed is not None else None
+            if stopped_by == "target" and overshoot is not None:
+                self.model.update(overshoot, flow)
+            result = FeedResult(grams, dispensed=dispensed, duration=duration, stopped_by=stopped_by,
+                                overshoot=overshoot, flow_rate=flow, ok=stopped_by == "target")
+            self.feeds += 1
+            self.agitations += agitations
+            self.last_result = result
+            if stopped_by != "target":
+                print(f"喂食提前结束 ({stopped_by})，目标 {grams}g，实际 {dispensed if dispensed is None else round(dispensed, 1)}g")
+            return result
+
+    def stats(self):
+        return {
+            "feeds": self.feeds,
+            "agitations": self.agitations,
+            "close_failures": self.close_failures,
+            "lag": round(self.model.lag, 3),
+            "lag_samples": self.model.samples,
+            "last_result": self.last_result.to_dict() if self.last_result else None,
+        }
@@ -0,0 +1,205 @@
+# feed_scheduler.py
+"""
+定时喂食调度器
+根据 feeding_schedules 计算每个计划的下一次到期时间，放入按时间排序的小顶堆，
+调度线程睡眠到最早的到期时间 (或计划变化) 再醒来，不再依赖浏览器轮询。
+
+每个时间槽只触发一次：调度器记录已处理到的时间水位，重新加载计划时只会安排水位之后的时间槽。
+调度线程被阻塞或系统挂起导致错过时间槽 (超过 grace 秒) 时按补发策略处理:
+    "skip"   - 错过的时间槽全部跳过
+    "latest" - 只补发最近一次错过的时间槽 (默认，避免恢复后连续喂多次)
+    "all"    - 每个错过的时间槽都补发
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+CATCH_UP_POLICIES = ("skip", "latest", "all")
+
+
+class FeedSlot:
+    """一次具体的喂食时间槽"""
+
+    def __init__(self, schedule_id, time_str, amount, due, user_id=None):
+        self.schedule_id = schedule_id
+        self.time = time_str
+        self.amount = amount
+        self.due = due # 时间戳 (秒)
+        self.user_id = user_id # 计划的创建者，喂食记录归到该用户名下
+        self.late = 0.0 # 实际触发时相对到期时间的延迟
+
+    def to_dict(self):
+        return {
+            "schedule_id": self.schedule_id,
+            "time": self.time,
+            "amount": self.amount,
+            "due": self.due,
+            "user_id": self.user_id,
+            "late": round(self.late, 1),
+        }
+
+
+def parse_time(time_str):
+    """'HH:MM' -> (时, 分)"""
+    try:
+        hour, minute = (int(part) for part in time_str.split(":")[:2])
+    except (AttributeError, ValueError):
+        raise ValueError(f"无效的喂食时间: {time_str}") from None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"无效的喂食时间: {time_str}")
+    return hour, minute
+
+
+def next_occurrence(time_str, after):
+    """返回严格晚于时间戳 after 的下一个 HH:MM 本地时间的时间戳"""
+    hour, minute = parse_time(time_str)
+    base = datetime.fromtimestamp(after)
+    candidate = base.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate.timestamp() <= after:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+class FeedScheduler:
+    """
+    参数:
+        on_due: 回调 on_due(slot)，在调度线程中调用，应尽快返回 (硬件动作交给执行器)
+        catch_up: 补发策略，见模块说明
+        grace: 到期后多少秒内触发仍视为准时
+        clock: 返回当前时间戳的函数，便于测试
+    """
+
+    def __init__(self, on_due, catch_up="latest", grace=60.0, clock=time.time):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"未知的补发策略: {catch_up}，可选: {', '.join(CATCH_UP_POLICIES)}")
+        self.on_due = on_due
+        self.catch_up = catch_up
+        self.grace = grace
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._heap = [] # (到期时间, 计划 id, FeedSlot)
+        self._schedules = []
+        self._watermark = clock() # 此时间之前 (含) 的时间槽都已处理
+        self._closed = False
+        self._thread = None
+        self.fired = 0
+        self.caught_up = 0
+        self.skipped = 0
+        self.last_fired = None
+
+    # --- 计划管理 ---
+    def reload(self, schedules):
+        """用最新的计划列表 [{"id", "time", "amount"}, ...] 重建时间堆"""
+        with self._cond:
+            self._schedules = list(schedules)
+            self._rebuild()
+            self._cond.notify_all()
+
+    def _rebuild(self):
+        # 已处理过的时间槽不会重新安排；宽限期之前的旧时间槽也不再补发
+        after = max(self._watermark, self.clock() - self.grace)
+        heap = []
+        for schedule in self._schedules:
+            try:
+                due = next_occurrence(schedule["time"], after)
+            except (ValueError, KeyError) as e:
+                print(f"忽略无效的喂食计划 {schedule}: {e}")
+                continue
+            slot = FeedSlot(schedule["id"], schedule["time"], schedule["amount"], due, schedule.get("user_id"))
+            heap.append((due, schedule["id"], slot))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def next_due(self):
+        """返回最早的待触发时间槽 (FeedSlot)，没有计划时返回 None"""
+        with self._cond:
+            return self._heap[0][2] if self._heap else None
+
+    # --- 调度线程 ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="feed-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _collect_due(self, now):
+        """弹出所有到期的时间槽并安排它们的下一次，返回 (准时的, 错过的)"""
+        on_time, missed = [], []
+        while self._heap and self._heap[0][0] <= now:
+            due, schedule_id, slot = heapq.heappop(self._heap)
+            slot.late = now - due
+            (on_time if slot.late <= self.grace else missed).append(slot)
+            following = next_occurrence(slot.time, due)
+            if following <= now:
+                # 错过不止一天 (例如长时间断电)，中间的时间槽也算错过
+                while following <= now:
+                    missed.append(FeedSlot(schedule_id, slot.time, slot.amount, following, slot.user_id))
+                    missed[-1].late = now - following
+                    following = next_occurrence(slot.time, following)
+            heapq.heappush(self._heap, (following, schedule_id, FeedSlot(schedule_id, slot.time, slot.amount, following, slot.user_id)))
+        self._watermark = max(self._watermark, now)
+        return on_time, missed
+
+    def _apply_policy(self, missed):
+        if not missed or self.catch_up == "skip":
+            return []
+        if self.catch_up == "latest":
+            return [max(missed, key=lambda slot: slot.due)]
+        return sorted(missed, key=lambda slot: slot.due)
+
+    def poll(self, now=None):
+        """处理所有已到期的时间槽，返回本次触发的 FeedSlot 列表 (调度线程每次醒来调用)"""
+        now = self.clock() if now is None else now
+        with self._cond:
+            on_time, missed = self._collect_due(now)
+            catch_up = self._apply_policy(missed)
+            self.skipped += len(missed) - len(catch_up)
+            self.caught_up += len(catch_up)
+        for slot in missed:
+            if slot not in catch_up:
+                print(f"跳过错过的喂食时间槽 {slot.time} (延迟 {slot.late:.0f} 秒)")
+        fired = sorted(on_time + catch_up, key=lambda slot: slot.due)
+        for slot in fired:
+            try:
+                self.on_due(slot)
+            except Exception as e:
+                print(f"定时喂食回调出错: {e}")
+        if fired:
+            with self._cond:
+                self.fired += len(fired)
+                self.last_fired = fired[-1].to_dict()
+        return fired
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                wait = self._heap[0][0] - self.clock() if self._heap else None
+                if wait is None or wait > 0:
+                    # 最多睡 60 秒，系统时间被校准后也能及时重新计算
+                    self._cond.wait(60.0 if wait is None else min(wait, 60.0))
+                if self._closed:
+                    return
+            # 每次醒来都推进水位，没有到期的时间槽时 poll 只是空操作
+            self.poll()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2)
+
+    def stats(self):
+        with self._cond:
+            upcoming = self._heap[0][2].to_dict() if self._heap else None
+            return {
+                "catch_up": self.catch_up,
+                "schedules": len(self._schedules),
+                "next_due": upcoming,
+                "fired": self.fired,
+                "caught_up": self.caught_up,
+                "skipped": self.skipped,
+                "last_fired": self.last_fired,
+            }
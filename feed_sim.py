@@ -0,0 +1,110 @@
+# feed_sim.py
+"""
+喂食仿真: 虚拟料仓 + 虚拟秤
+VirtualFeeder 模拟喂食口、料仓和碗:
+    - 喂食口动作有 servo_delay 秒延迟
+    - 打开时的流量随料仓余量下降，并带有颗粒结块造成的随机波动
+    - 流出的猫粮经过 fall_time 秒才落到碗里 (关闭后仍在空中的部分形成过冲)
+    - 料仓空了以后不再出粮
+getWeight() 按 rate SPS 的节奏返回碗的重量 + 高斯噪声，可以直接作为 WeightSampler 的数据源；
+open_gate / close_gate 交给 FeedController。
+"""
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class VirtualFeeder:
+    """
+    参数:
+        hopper: 料仓初始余量 (克)
+        capacity: 料仓容量 (克)，满仓时流量为 max_flow
+        max_flow: 满仓时的流量 (克/秒)，空仓附近降到 40%
+        clump: 每个仿真步流量的对数正态波动
+        fall_time / servo_delay: 落料时间和舵机动作延迟 (秒)
+        noise: 秤的读数噪声标准差 (克)
+        rate: 秤的输出速率 (SPS)
+    """
+
+    def __init__(self, hopper=800.0, capacity=1000.0, max_flow=8.0, clump=0.3, fall_time=0.25,
+                 servo_delay=0.1, noise=0.8, rate=80.0, seed=0):
+        self.hopper = hopper
+        self.capacity = capacity
+        self.max_flow = max_flow
+        self.clump = clump
+        self.fall_time = fall_time
+        self.servo_delay = servo_delay
+        self.noise = noise
+        self.rate = rate
+        self.bowl = 0.0
+        self.dispensed_total = 0.0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._gate = [] # (生效时间, 是否打开)
+        self._open = False
+        self._in_flight = collections.deque() # (落地时间, 克)
+        self._last = time.monotonic()
+        self._next_read = self._last
+
+    # --- 喂食口 ---
+    def open_gate(self):
+        with self._lock:
+            self._gate.append((time.monotonic() + self.servo_delay, True))
+        return True
+
+    def close_gate(self):
+        with self._lock:
+            self._gate.append((time.monotonic() + self.servo_delay, False))
+        return True
+
+    def flow_rate(self):
+        """当前余量下的平均流量 (克/秒)"""
+        if self.hopper <= 0:
+            return 0.0
+        return self.max_flow * (0.4 + 0.6 * min(self.hopper / self.capacity, 1.0))
+
+    def refill(self, grams=None):
+        with self._lock:
+            self.hopper = self.capacity if grams is None else min(self.capacity, self.hopper + grams)
+
+    def empty_bowl(self):
+        with self._lock:
+            self.bowl = 0.0
+
+    # --- 仿真 ---
+    def _advance(self, now):
+        """把仿真推进到 now (调用方持有锁)"""
+        t = self._last
+        while t < now:
+            step = min(now - t, 0.005)
+            while self._gate and self._gate[0][0] <= t:
+                self._open = self._gate.pop(0)[1]
+            if self._open and self.hopper > 0:
+                grams = min(self.hopper, self.flow_rate() * step * self._rng.lognormal(0.0, self.clump))
+                self.hopper -= grams
+                self._in_flight.append((t + self.fall_time, grams))
+            t += step
+        while self._in_flight and self._in_flight[0][0] <= now:
+            grams = self._in_flight.popleft()[1]
+            self.bowl += grams
+            self.dispensed_total += grams
+        self._last = now
+
+    def true_weight(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.bowl
+
+    def getWeight(self):
+        """按 rate SPS 的节奏返回带噪声的碗重量 (克)"""
+        self._next_read += 1.0 / self.rate
+        delay = self._next_read - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next_read = time.monotonic()
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.bowl + float(self._rng.normal(0.0, self.noise))
@@ -0,0 +1,243 @@
+# frame_ring.py
+"""
+共享内存帧环形缓冲区
+预先分配固定数量的帧槽位 (multiprocessing.shared_memory)，采集线程直接把画面写入槽位，
+推理进程和视频流读取方通过序号访问最新帧，整个过程没有逐帧的内存分配和拷贝。
+
+共享内存布局:
+    header (int64): [最新序号, 最新槽位, 各槽位序号 x N, 各槽位引用计数 x N]
+    data   (uint8): N 个帧槽位
+槽位被读取方 pin 住时，写入方会跳过该槽位，保证读取期间数据不会被覆盖。
+"""
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_HEADER_FIXED = 2 # 最新序号, 最新槽位
+_ALIGN = 64
+
+
+def _header_len(slots):
+    return _HEADER_FIXED + 2 * slots
+
+
+def _data_offset(slots):
+    nbytes = _header_len(slots) * 8
+    return (nbytes + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class PinnedFrame:
+    """被 pin 住的一帧：在 release() 之前槽位不会被覆盖"""
+
+    def __init__(self, ring, slot, seq):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.array = ring.slot_view(slot)
+
+    def release(self):
+        if self.ring is not None:
+            self.ring._unpin(self.slot)
+            self.ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameRing:
+    """
+    固定大小的共享内存帧环
+    写入方: capture(source) 或 write(frame)
+    读取方: pin_latest() / wait_newer()，子进程可通过 attach() 以只读方式按槽位访问
+    """
+
+    def __init__(self, shape, slots=6, dtype=np.uint8, name=None, create=True):
+        if slots < 2:
+            raise ValueError("slots 至少为 2")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.frame_nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = _data_offset(slots) + slots * self.frame_nbytes
+        self.owner = create
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self._header = np.ndarray((_header_len(slots),), dtype=np.int64, buffer=self.shm.buf)
+        self._data = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf,
+                                offset=_data_offset(slots))
+        self._slot_seq = self._header[_HEADER_FIXED:_HEADER_FIXED + slots]
+        self._slot_pins = self._header[_HEADER_FIXED + slots:]
+        # pin / 写入的互斥与新帧通知只在创建方进程内进行
+        self._cond = threading.Condition()
+        if create:
+            self._header[:] = 0
+            self._header[0] = -1 # 还没有任何帧
+            self._header[1] = -1
+            self._slot_seq[:] = -1
+
+    @classmethod
+    def attach(cls, name, shape, slots, dtype=np.uint8):
+        """在其他进程中连接到已存在的帧环（只读访问）"""
+        return cls(shape, slots=slots, dtype=dtype, name=name, create=False)
+
+    def attach_args(self):
+        """返回可传给子进程的参数 (name, shape, slots, dtype)"""
+        return (self.name, self.shape, self.slots, self.dtype.str)
+
+    # --- 写入方 ---
+    def _acquire_slot(self):
+        with self._cond:
+            latest_slot = int(self._header[1])
+            for step in range(1, self.slots + 1):
+                slot = (latest_slot + step) % self.slots
+                if slot != latest_slot and self._slot_pins[slot] == 0:
+                    self._slot_seq[slot] = -1 # 标记为写入中
+                    return slot
+        raise RuntimeError("帧环所有槽位都被占用，请增加 slots 数量")
+
+    def _commit(self, slot):
+        with self._cond:
+            seq = int(self._header[0]) + 1
+            self._slot_seq[slot] = seq
+            self._header[1] = slot
+            self._header[0] = seq
+            self._cond.notify_all()
+        return seq
+
+    def capture(self, source):
+        """让帧源直接写入下一个空闲槽位，返回新帧的序号"""
+        slot = self._acquire_slot()
+        source.read_into(self._data[slot])
+        return self._commit(slot)
+
+    def write(self, frame):
+        """把已有数组拷贝进下一个空闲槽位（用于无法直接写入的帧源）"""
+        slot = self._acquire_slot()
+        np.copyto(self._data[slot], frame)
+        return self._commit(slot)
+
+    # --- 读取方 ---
+    def latest_seq(self):
+        return int(self._header[0])
+
+    def slot_view(self, slot):
+        view = self._data[slot]
+        view.flags.writeable = False
+        return view
+
+    def get(self, slot, seq):
+        """按槽位和序号获取帧视图，槽位已被覆盖时返回 None"""
+        if int(self._slot_seq[slot]) != seq:
+            return None
+        return self.slot_view(slot)
+
+    def is_current(self, slot, seq):
+        """检查读取完成后槽位是否仍然是该序号（用于未 pin 的读取方校验）"""
+        return int(self._slot_seq[slot]) == seq
+
+    def pin_latest(self):
+        """pin 住最新一帧，返回 PinnedFrame；还没有帧时返回 None"""
+        with self._cond:
+            slot = int(self._header[1])
+            if slot < 0:
+                return None
+            self._slot_pins[slot] += 1
+            return PinnedFrame(self, slot, int(self._header[0]))
+
+    def _unpin(self, slot):
+        with self._cond:
+            self._slot_pins[slot] -= 1
+
+    def wait_newer(self, after_seq, timeout=None):
+        """等待序号大于 after_seq 的新帧，返回最新序号（超时返回当前序号）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while int(self._header[0]) <= after_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                if self.owner:
+                    self._cond.wait(remaining)
+                else:
+                    # 跨进程无法使用条件变量，退化为短间隔轮询
+                    self._cond.wait(min(0.002, remaining) if remaining is not None else 0.002)
+            return int(self._header[0])
+
+    def close(self):
+        del self._slot_seq, self._slot_pins, self._header, self._data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# --- 帧源 ---
+class FrameSource:
+    """帧源接口：read_into(out) 把一帧画面直接写入给定数组"""
+    shape = None
+
+    def read_into(self, out):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PicameraFrameSource(FrameSource):
+    """Picamera2 帧源：映射摄像头缓冲区后直接拷贝进槽位，不再为每帧分配数组"""
+
+    def __init__(self, camera, stream="main"):
+        from picamera2 import MappedArray
+        self._mapped_array = MappedArray
+        self.camera = camera
+        self.stream = stream
+        width, height = camera.camera_configuration()[stream]["size"]
+        self.shape = (height, width, 3)
+
+    def read_into(self, out):
+        request = self.camera.capture_request()
+        try:
+            with self._mapped_array(request, self.stream) as mapped:
+                height, width = self.shape[:2]
+                np.copyto(out, mapped.array[:height, :width, :3])
+        finally:
+            request.release()
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    合成帧源：静态背景 + 移动的方块，用于没有 Picamera2 时的测试和基准
+    fps 不为 None 时按该帧率节流，模拟真实摄像头
+    """
+
+    def __init__(self, shape=(320, 320, 3), fps=None, seed=0, object_size=48):
+        self.shape = tuple(shape)
+        self.fps = fps
+        self.object_size = object_size
+        self.object_visible = True
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(60, 120, self.shape, dtype=np.uint8)
+        self.frame_index = 0
+        self._next_time = None
+
+    def read_into(self, out):
+        if self.fps:
+            now = time.monotonic()
+            if self._next_time is None:
+                self._next_time = now
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time += 1.0 / self.fps
+
+        np.copyto(out, self.background)
+        if self.object_visible:
+            height, width = self.shape[:2]
+            size = self.object_size
+            x = (self.frame_index * 4) % max(1, width - size)
+            y = (height - size) // 2
+            out[y:y + size, x:x + size] = (220, 180, 40)
+        self.frame_index += 1
@@ -3,12 +3,18 @@
 import time
 import sys
 import signal
-import math
 import smbus
 import board
 import adafruit_dht
 import RPi.GPIO as GPIO
 from hx711v0_5_1 import HX711  # 确保 hx711v0_5_1.py 在同一目录或 Python 路径中
+from hx711_reader import HX711Reader
+from weight_sampler import WeightSampler
+from feed_controller import FeedController, FeedResult
+from feed_calibration import FeedCalibration
+from servo_motion import ServoController
+from max30102_reader import MAX30102Reader, read_fifo_burst
+import ppg
 
 # --- 全局变量和配置 ---
 # DHT11
@@ -19,23 +25,48 @@ dht_sensor = None
 WEIGHT_DATA_PIN = 5   # HX711 DOUT 引脚 (BCM 5)
 WEIGHT_CLOCK_PIN = 6  # HX711 SCK 引脚 (BCM 6)
 WEIGHT_REFERENCE_UNIT = 400 # 重量传感器校准值 (需要根据实际情况调整)
+WEIGHT_FILTER = "kalman"    # read_weight_kg 返回的滤波结果: raw / median / ema / kalman
+WEIGHT_READ_MODE = "interrupt" # DOUT 等待方式: interrupt (下降沿回调) / poll (定时检查) / spin (忙等)
+WEIGHT_READ_TIMEOUT = 0.5   # 单次读取最长等待时间（秒）
 hx711 = None
+weight_reader = None        # HX711Reader，决定采样线程如何等待 DOUT
+weight_sampler = None       # 连续采样线程，初始化重量传感器后启动
+feed_controller = None      # 闭环称重喂食，采样线程启动后可用
 
 # MAX30102 (Heart Rate & SpO2)
 max30102 = None
 # 默认 I2C 总线为 1
 I2C_BUS = 1
+PPG_SAMPLE_RATE = 25   # SPO2_SR = 100Hz 且 SMP_AVE = 4，FIFO 每秒 25 个样本
+PPG_WINDOW = 4 * PPG_SAMPLE_RATE # 心率血氧分析窗口 (样本数)
+PPG_HOP = PPG_SAMPLE_RATE // 4   # 每读到多少个新样本更新一次心率血氧
+PPG_MAX_GAP = 1.0      # 两次读取间隔超过此值 (秒) 时样本不再连续，重新读满一个窗口
+heart_rate_monitor = ppg.PPGMonitor(fs=PPG_SAMPLE_RATE, window=PPG_WINDOW, hop=PPG_HOP)
+heart_rate_reader = None # MAX30102Reader，后台批量读取 FIFO 并推给 heart_rate_monitor
+last_ppg_read = 0.0
 
 # Servo Motor
 SERVO_PIN = 18 # 舵机信号引脚 (BCM 18)
 servo_pwm = None
+servo = None   # ServoController，由执行器线程独占
 
 # 添加喂食相关配置
 FEED_OPEN_ANGLE = 90   # 喂食器打开角度
 FEED_CLOSE_ANGLE = 0   # 喂食器关闭角度
-FEED_RATE = 5.0        # 每秒流出的猫粮克数（需要根据实际情况调整）
+FEED_RAMP_TIME = 0.3   # 喂食口平滑打开 / 关闭的用时（秒）
+AGITATE_AMPLITUDE = 15 # 疏通卡料时在打开角度附近抖动的幅度（度）
+AGITATE_PULSES = 3     # 每次疏通抖动的次数
+FEED_MAX_AGITATIONS = 2 # 闭环喂食卡料时最多尝试疏通几次
+FEED_RATE = 5.0        # 先验流量：每秒流出的猫粮克数，标定样本足够后由 feed_calibration 的模型代替
 MIN_FEED_TIME = 0.5    # 最小喂食时间（秒）
 MAX_FEED_TIME = 10.0   # 最大喂食时间（秒）
+HOPPER_CAPACITY = 1000.0 # 料仓容量（克），加粮时按加满计算余量
+FEED_TIMEOUT_FACTOR = 2.0 # 闭环喂食最长打开时间 = 标定模型预计时间 x 该系数 (不超过 MAX_FEED_TIME)
+FEED_SETTLE_TIME = 1.5 # 闭环喂食关闭后等待落料稳定的时间（秒）
+FEED_STALL_TIME = 3.0  # 闭环喂食时重量持续不增加多久视为卡料 / 料仓空（秒）
+# 出粮流量标定 (记录在数据库中，由 app 启动时调用 load 恢复)
+feed_calibration = FeedCalibration(capacity=HOPPER_CAPACITY, prior_rate=FEED_RATE,
+                                   min_time=MIN_FEED_TIME, max_time=MAX_FEED_TIME)
 
 # --- GPIO 初始化与清理 ---
 def initialize_gpio():
@@ -50,8 +81,11 @@ def initialize_gpio():
 
 def cleanup_gpio():
     """清理 GPIO 资源"""
-    global servo_pwm
+    global servo_pwm, servo
     print("正在清理 GPIO 资源...")
+    stop_weight_sampler()
+    stop_heart_rate_reader()
+    servo = None
     if servo_pwm:
         servo_pwm.stop()
     GPIO.cleanup()
@@ -143,6 +177,7 @@ class MAX30102_Sensor:
     I2C_ADDR = 0x57
 
     def __init__(self, i2c_bus=I2C_BUS):
+        self._surplus = ([], []) # 上次读出但超过 sample_size 的 (red, ir) 样本
         try:
             self.bus = smbus.SMBus(i2c_bus)
             print(f"I2C 总线 {i2c_bus} 打开成功")
@@ -187,13 +222,12 @@ class MAX30102_Sensor:
         self.write_register(self.REG_PILOT_PA, 0x7F) # Pilot LED ~25mA (Not used in SpO2 mode typically)
 
     def read_fifo(self):
+        """读出 FIFO 中的全部样本 (max30102_reader.read_fifo_burst)，返回 (red, ir) 数组，失败时返回 (None, None)"""
         if not self.bus: return None, None
         try:
-            # Read 6 bytes (3 bytes Red, 3 bytes IR)
-            data = self.bus.read_i2c_block_data(self.I2C_ADDR, self.REG_FIFO_DATA, 6)
-            # Combine bytes & mask to 18 bits
-            red = ((data[0] << 16) | (data[1] << 8) | data[2]) & 0x3FFFF
-            ir = ((data[3] << 16) | (data[4] << 8) | data[5]) & 0x3FFFF
+            red, ir, overflow, _ = read_fifo_burst(self.bus, self.I2C_ADDR)
+            if overflow:
+                print(f"MAX30102 FIFO 溢出，丢失 {overflow} 个样本")
             return red, ir
         except IOError as e:
             print(f"MAX30102 读取 FIFO 时发生 I/O 错误: {e}")
@@ -204,97 +238,43 @@ class MAX30102_Sensor:
 
 
     def get_sensor_data(self, sample_size=100):
-        """获取指定数量的样本数据"""
+        """
+        获取指定数量的样本数据 (FIFO 中有多少读多少，不足时等待 FIFO 再积累一些)
+        多读出的样本留到下一次调用最先返回，相邻两次调用返回的样本是连续的
+        """
         if not self.bus: return [], []
-        red_buffer = []
-        ir_buffer = []
-        samples_collected = 0
+        red_buffer, ir_buffer = self._surplus
+        self._surplus = ([], [])
         start_time = time.time()
         max_wait_time = 5 # seconds
 
-        while samples_collected < sample_size:
-            # 检查中断状态寄存器是否有新数据 (PPG_RDY bit)
-            intr_status = self.read_register(self.REG_INTR_STATUS_1)
-            if intr_status is None: # I2C error
-                 print("MAX30102 读取中断状态失败")
-                 return [], []
-
-            if (intr_status & 0x40): # PPG_RDY is set
-                red, ir = self.read_fifo()
-                if red is not None and ir is not None:
-                    red_buffer.append(red)
-                    ir_buffer.append(ir)
-                    samples_collected += 1
-                else:
-                    # FIFO read error, maybe retry or break
-                    print("MAX30102 FIFO 读取失败")
-                    time.sleep(0.01) # Small delay before retry
-            else:
-                # No new data yet, wait briefly
-                time.sleep(0.005)
+        while len(red_buffer) < sample_size:
+            red, ir = self.read_fifo()
+            if red is None:
+                print("MAX30102 FIFO 读取失败")
+                return [], []
+            red_buffer.extend(red.tolist())
+            ir_buffer.extend(ir.tolist())
+            if len(red_buffer) >= sample_size:
+                break
 
             # Timeout check
             if time.time() - start_time > max_wait_time:
                 print(f"MAX30102 获取 {sample_size} 个样本超时 ({max_wait_time}秒)")
                 break
+            # 等待 FIFO 积累剩余的样本 (最多半个 FIFO)
+            time.sleep(min(sample_size - len(red_buffer), 16) / PPG_SAMPLE_RATE)
+
+        self._surplus = (red_buffer[sample_size:], ir_buffer[sample_size:])
+        return red_buffer[:sample_size], ir_buffer[:sample_size]
 
-        return red_buffer, ir_buffer
+    def discard_surplus(self):
+        """丢弃留到下一次的样本 (读取中断后窗口重新开始时调用)"""
+        self._surplus = ([], [])
 
     def calculate_hr_and_spo2(self, ir_data, red_data):
-        """ (基本的心率血氧计算逻辑，可能需要根据实际信号调整) """
-        BUFFER_SIZE = len(ir_data)
-        if BUFFER_SIZE < 50: # 需要足够的数据点
-            print("数据点不足，无法计算心率血氧")
-            return -1, -1, False
-
-        # 简单的直流滤波
-        ir_mean = sum(ir_data) / BUFFER_SIZE
-        red_mean = sum(red_data) / BUFFER_SIZE
-        ir_ac = [(val - ir_mean) for val in ir_data]
-        red_ac = [(val - red_mean) for val in red_data]
-
-        # 寻找 IR 信号的峰值 (简易方法)
-        peaks = self.find_peaks(ir_ac, threshold=max(ir_ac)*0.6 if max(ir_ac) > 0 else 1, min_distance=int(100/ (220/60))) # 100Hz sample rate, min HR ~40bpm, max HR ~220bpm
-
-        if len(peaks) < 2:
-            # print("未能检测到足够的峰值")
-            return -1, -1, False
-
-        # 计算心率
-        peak_intervals_ms = [(peaks[i+1] - peaks[i]) * 10 for i in range(len(peaks)-1)] # interval in ms (100Hz -> 10ms per sample)
-        avg_interval_ms = sum(peak_intervals_ms) / len(peak_intervals_ms)
-        if avg_interval_ms == 0: return -1,-1, False
-        heart_rate = 60000 / avg_interval_ms
-
-        # 计算血氧 (使用 R 值)
-        # R = (AC_red / DC_red) / (AC_ir / DC_ir)
-        # SpO2 = a - b * R (a, b 为校准系数, 典型值 a=110, b=25)
-        ac_sq_red = sum([x*x for x in red_ac]) / BUFFER_SIZE
-        ac_sq_ir = sum([x*x for x in ir_ac]) / BUFFER_SIZE
-        if red_mean == 0 or ir_mean == 0 or ac_sq_ir == 0: return heart_rate, -1, True # Return HR if valid, but SpO2 failed
-
-        R = (math.sqrt(ac_sq_red) / red_mean) / (math.sqrt(ac_sq_ir) / ir_mean)
-
-        # 经验公式 (可能需要根据具体情况调整)
-        spo2 = 110 - 25 * R
-        # spo2 = 104 - 17 * R # 另一种常见公式
-
-        # 约束范围
-        spo2 = max(80.0, min(99.9, spo2))
-        heart_rate = max(40, min(220, heart_rate))
-
-        return int(round(heart_rate)), round(spo2, 2), True
-
-    @staticmethod
-    def find_peaks(signal, threshold, min_distance):
-        peaks = []
-        last_peak_index = -min_distance
-        for i in range(1, len(signal) - 1):
-            if signal[i] > threshold and signal[i] > signal[i-1] and signal[i] > signal[i+1]:
-                if i - last_peak_index >= min_distance:
-                    peaks.append(i)
-                    last_peak_index = i
-        return peaks
+        """计算心率和血氧值 (ppg.analyze)，返回 (心率, 血氧, 是否有效)"""
+        return ppg.analyze(ir_data, red_data, fs=PPG_SAMPLE_RATE)
 
 def initialize_max30102_sensor():
     """初始化 MAX30102 传感器模块"""
@@ -304,20 +284,64 @@ def initialize_max30102_sensor():
     except Exception as e:
         print(f"创建 MAX30102_Sensor 实例失败: {e}")
         max30102 = None
+        return
+    start_heart_rate_reader()
+
+def start_heart_rate_reader():
+    """启动后台 FIFO 读取线程，样本推给 heart_rate_monitor"""
+    global heart_rate_reader
+    if not max30102 or heart_rate_reader:
+        return heart_rate_reader
+    try:
+        heart_rate_monitor.reset()
+        heart_rate_reader = MAX30102Reader(max30102, fs=PPG_SAMPLE_RATE, monitor=heart_rate_monitor).start()
+        print("MAX30102 后台读取线程已启动")
+    except Exception as e:
+        print(f"启动 MAX30102 读取线程失败，改为调用时读取: {e}")
+        heart_rate_reader = None
+    return heart_rate_reader
+
+def stop_heart_rate_reader():
+    global heart_rate_reader
+    if heart_rate_reader:
+        heart_rate_reader.close()
+        heart_rate_reader = None
+
+def heart_rate_reader_stats():
+    """FIFO 读取线程和心率血氧计算的统计，未启动时返回 None"""
+    if not heart_rate_reader:
+        return None
+    stats = heart_rate_reader.stats()
+    stats["monitor"] = heart_rate_monitor.stats()
+    return stats
 
-def read_heart_rate_spo2(samples=100):
-    """读取心率和血氧值"""
+def read_heart_rate_spo2(samples=PPG_HOP):
+    """
+    返回最近的 (心率, 血氧, 是否有效)
+    后台读取线程运行时直接返回 heart_rate_monitor 的最新结果 (不阻塞)；
+    否则读取 samples 个新样本加入滑动窗口，距离上次读取超过 PPG_MAX_GAP 秒时先清空窗口，并读满一个窗口
+    """
+    global last_ppg_read
     if not max30102:
         print("错误: MAX30102 传感器未初始化")
         return None, None, False
+    if heart_rate_reader and heart_rate_reader.running:
+        hr, spo2 = heart_rate_monitor.latest()
+        return (hr, spo2, True) if hr is not None else (None, None, False)
     try:
+        if time.monotonic() - last_ppg_read > PPG_MAX_GAP:
+            heart_rate_monitor.reset()
+            max30102.discard_surplus()
+            samples = max(samples, heart_rate_monitor.window)
         red, ir = max30102.get_sensor_data(sample_size=samples)
+        last_ppg_read = time.monotonic()
         if not red or not ir:
             # print("未能从 MAX30102 获取有效数据")
             return None, None, False
 
-        hr, spo2, valid = max30102.calculate_hr_and_spo2(ir, red)
-        if valid:
+        heart_rate_monitor.push(red, ir)
+        hr, spo2 = heart_rate_monitor.latest()
+        if hr is not None:
             return hr, spo2, True
         else:
             # print("计算出的心率/血氧值无效")
@@ -329,7 +353,7 @@ def read_heart_rate_spo2(samples=100):
 
 # --- HX711 重量传感器 ---
 def initialize_weight_sensor(data_pin=WEIGHT_DATA_PIN, clock_pin=WEIGHT_CLOCK_PIN, ref_unit=WEIGHT_REFERENCE_UNIT):
-    """初始化 HX711 重量传感器模块"""
+    """初始化 HX711 重量传感器模块，去皮后启动连续采样线程"""
     global hx711
     try:
         hx711 = HX711(data_pin, clock_pin)
@@ -351,18 +375,68 @@ def initialize_weight_sensor(data_pin=WEIGHT_DATA_PIN, clock_pin=WEIGHT_CLOCK_PI
         hx711.autosetOffset() # autosetOffset 通常足够快
         offset = hx711.getOffset()
         print(f"HX711 初始去皮完成，偏移量: {offset}")
+        start_weight_sampler(hx711)
 
     except Exception as e:
         print(f"初始化 HX711 失败: {e}")
         hx711 = None
         raise
 
+def start_weight_sampler(source, mode=WEIGHT_READ_MODE, **kwargs):
+    """
+    启动连续采样线程
+    source 为 HX711 时按 mode 包装成 HX711Reader (中断 / 轮询 / 忙等)；
+    也可以直接传入提供 getWeight() 的数据源 (例如 SimulatedHX711)
+    """
+    global weight_sampler, weight_reader, feed_controller
+    stop_weight_sampler()
+    if isinstance(source, HX711):
+        weight_reader = HX711Reader(source, mode=mode, timeout=WEIGHT_READ_TIMEOUT).start()
+        source = weight_reader
+    weight_sampler = WeightSampler(source, **kwargs).start()
+    feed_controller = FeedController(
+        weight_sampler,
+        open_gate=open_gate,
+        close_gate=close_gate,
+        force_close=close_gate_safely,
+        agitate=agitate_gate, max_agitations=FEED_MAX_AGITATIONS,
+        max_time=MAX_FEED_TIME, stall_time=FEED_STALL_TIME, settle_time=FEED_SETTLE_TIME,
+    )
+    print(f"重量连续采样线程已启动 (读取方式: {weight_reader.mode if weight_reader else '外部数据源'})")
+    return weight_sampler
+
+def stop_weight_sampler():
+    global weight_sampler, weight_reader, feed_controller
+    feed_controller = None
+    if weight_reader:
+        weight_reader.close()
+        weight_reader = None
+    if weight_sampler:
+        weight_sampler.close()
+        weight_sampler = None
+
+def weight_sampler_stats():
+    """采样线程和 HX711 读取方式的统计，未启动时返回 None"""
+    if not weight_sampler:
+        return None
+    stats = weight_sampler.stats()
+    stats["reader"] = weight_reader.stats() if weight_reader else None
+    return stats
+
 def tare_weight_sensor():
     """执行去皮操作"""
+    if weight_sampler:
+        print("执行去皮操作...")
+        # 采样线程独占 HX711，用接下来 10 个采样的中位数作为零点
+        if weight_sampler.tare(samples=10):
+            print("去皮完成")
+            return True
+        print("去皮操作失败: 等待采样超时")
+        return False
     if hx711:
         try:
             print("执行去皮操作...")
-            hx711.tare(times=10) # 读取10次取平均以增加稳定性
+            hx711.autosetOffset()
             print("去皮完成")
             return True
         except Exception as e:
@@ -373,7 +447,13 @@ def tare_weight_sensor():
         return False
 
 def read_weight_kg(reads=5):
-    """读取重量并返回千克值 (通过多次读数取平均)"""
+    """
+    读取重量并返回千克值
+    采样线程运行时直接返回最新的滤波估计 (不阻塞)；否则退化为多次读数取平均
+    """
+    if weight_sampler:
+        weight_g = weight_sampler.latest(WEIGHT_FILTER)
+        return round(weight_g / 1000.0, 3) if weight_g is not None else None
     if hx711:
         try:
             # 手动进行多次读数并取平均
@@ -402,77 +482,119 @@ def read_weight_kg(reads=5):
 # --- Servo Motor 舵机控制 ---
 def setup_servo(pin=SERVO_PIN, frequency=50):
     """设置舵机 PWM"""
-    global servo_pwm
+    global servo_pwm, servo
     try:
         GPIO.setup(pin, GPIO.OUT)
         servo_pwm = GPIO.PWM(pin, frequency) # 50Hz (20ms cycle) is standard for servos
         servo_pwm.start(0) # Start PWM with 0% duty cycle (off)
+        servo = ServoController(servo_pwm)
         print(f"舵机 PWM 初始化成功 (引脚: {pin}, 频率: {frequency}Hz)")
         return True
     except Exception as e:
         print(f"设置舵机 PWM 失败: {e}")
         servo_pwm = None
+        servo = None
         return False
 
-def set_servo_angle(angle):
+def set_servo_angle(angle, duration=0.0):
     """
-    设置舵机角度
+    设置舵机角度 (舵机绑定执行器后只能在执行器线程中调用)
     参数:
         angle: 舵机角度 (0-180度)
+        duration: 大于 0 时按平滑曲线在约 duration 秒内转到目标角度
     返回:
         成功返回True，失败返回False
     """
     try:
-        if not 0 <= angle <= 180:
-            print(f"舵机角度超出范围: {angle}")
+        if servo is None:
+            print("错误: 舵机未初始化")
             return False
-        
-        duty = angle / 18 + 2.5  # 将角度转换为占空比 (2.5% - 12.5%)
-        GPIO.output(SERVO_PIN, True)
-        servo_pwm.ChangeDutyCycle(duty)
-        time.sleep(0.1)  # 给舵机一点时间移动
-        GPIO.output(SERVO_PIN, False)  # 关闭PWM输出，减少抖动
+        servo.move(angle, duration)
+        servo.release()  # 停止输出脉冲，减少抖动
         return True
     except Exception as e:
         print(f"设置舵机角度时出错: {e}")
         return False
 
+def open_gate():
+    """平滑打开喂食口"""
+    return set_servo_angle(FEED_OPEN_ANGLE, FEED_RAMP_TIME)
+
+def close_gate():
+    """平滑关闭喂食口"""
+    return set_servo_angle(FEED_CLOSE_ANGLE, FEED_RAMP_TIME)
+
+def agitate_gate():
+    """在打开角度附近抖动几次，疏通卡住的猫粮 (喂食口保持打开)"""
+    try:
+        servo.agitate(FEED_OPEN_ANGLE, amplitude=AGITATE_AMPLITUDE, pulses=AGITATE_PULSES)
+        return True
+    except Exception as e:
+        print(f"疏通抖动失败: {e}")
+        return False
+
+def close_gate_safely():
+    """执行器任务失败后的安全动作：立即关闭喂食口 (不走平滑曲线)"""
+    if servo is None:
+        return False
+    servo.move(FEED_CLOSE_ANGLE)
+    servo.release()
+    return True
+
 def feed(amount_grams):
     """
     根据指定的克数进行喂食
+    称重采样可用时按实测重量闭环控制 (见 feed_controller)，否则按 FEED_RATE 计时
     参数:
         amount_grams: 喂食量（克）
     返回:
-        成功返回True，失败返回False
+        FeedResult，bool(result) 表示是否成功；闭环喂食时包含实测出粮量
     """
+    if feed_controller is not None:
+        expected = feed_calibration.open_time_for(amount_grams)
+        result = feed_controller.dispense(amount_grams, max_time=expected * FEED_TIMEOUT_FACTOR + 1.0)
+        # 只有在打开喂食口之前就没有称重数据时才退回计时喂食，避免重复出粮
+        if result.stopped_by != "sensor" or result.duration > 0:
+            print(f"喂食完成，目标 {amount_grams}g，实测 {result.to_dict()['dispensed']}g ({result.stopped_by})")
+            if result.stopped_by == "target":
+                feed_calibration.record(result.duration, result.dispensed)
+            elif result.dispensed is not None:
+                feed_calibration.consume(max(result.dispensed, 0.0))
+            return result
+        print("称重数据不可用，改为按时间喂食")
+
+    feed_time = 0.0
     try:
-        # 计算喂食时间
-        feed_time = amount_grams / FEED_RATE
-        
-        # 限制喂食时间在安全范围内
-        feed_time = max(MIN_FEED_TIME, min(feed_time, MAX_FEED_TIME))
+        # 按标定的流量模型计算喂食时间 (已限制在 MIN_FEED_TIME ~ MAX_FEED_TIME)
+        feed_time = feed_calibration.open_time_for(amount_grams)
         
         print(f"开始喂食 {amount_grams}g 猫粮，预计时间 {feed_time:.1f}秒")
         
         # 打开喂食口
-        set_servo_angle(FEED_OPEN_ANGLE)
+        if not open_gate():
+            raise RuntimeError("舵机控制失败")
         
         # 等待指定时间
         time.sleep(feed_time)
         
-        # 关闭喂食口
-        set_servo_angle(FEED_CLOSE_ANGLE)
+        # 关闭喂食口，平滑关闭失败时立即强制关闭并报告失败
+        closed = close_gate()
+        feed_calibration.consume(amount_grams)
+        if not closed:
+            print("关闭喂食口失败，立即强制关闭")
+            close_gate_safely()
+            return FeedResult(amount_grams, duration=feed_time, stopped_by="servo", ok=False)
         
         print(f"喂食完成，实际时间 {feed_time:.1f}秒")
-        return True
+        return FeedResult(amount_grams, duration=feed_time)
     except Exception as e:
         print(f"喂食操作失败: {e}")
         try:
             # 确保关闭喂食口，防止猫粮持续流出
-            set_servo_angle(FEED_CLOSE_ANGLE)
+            close_gate_safely()
         except:
             pass
-        return False
+        return FeedResult(amount_grams, duration=feed_time, ok=False)
 
 # --- 主初始化函数 ---
 def initialize_hardware():
@@ -512,7 +634,7 @@ if __name__ == '__main__':
                 print("温湿度: 读取失败")
 
             # 读取心率血氧
-            hr, spo2, valid = read_heart_rate_spo2(samples=100) # 减少样本量以加快读取速度
+            hr, spo2, valid = read_heart_rate_spo2()
             if valid:
                 print(f"心率血氧: {hr} bpm, {spo2}%")
             else:
@@ -0,0 +1,127 @@
+# hx711_reader.py
+"""
+HX711 读取方式
+HX711 在一次转换完成后把 DOUT 拉低，库自带的 readRawBytes 用 `while not isReady(): pass` 等待，
+在 10 SPS 下每个采样要空转约 100ms，采样线程会占满一个 CPU 核心。HX711Reader 提供三种等待方式:
+    "interrupt" - 在 DOUT 下降沿的 GPIO 回调里读取 (enableReadyCallback)，采样线程在 Event 上睡眠等待；
+                  超时后主动检查一次 DOUT，防止错过边沿后 DOUT 一直保持低电平导致读数停止
+    "poll"      - 每 poll_interval 秒检查一次 DOUT，就绪后再读取 (边沿检测不可用时的退路)
+    "spin"      - 库的原始忙等 (仅用于对比)
+所有方式的等待都有超时，超时返回 None，由 WeightSampler 记为一次失败。
+HX711Reader 提供 getWeight()，可以直接作为 WeightSampler 的数据源。
+"""
+import threading
+import time
+
+READ_MODES = ("interrupt", "poll", "spin")
+
+
+class HX711Reader:
+    """
+    参数:
+        hx: 已完成初始化和去皮的 HX711 对象
+        mode: 等待方式，见模块说明
+        timeout: 单次读取最长等待时间 (秒)，应大于一个转换周期 (10 SPS 时为 0.1 秒)
+        poll_interval: poll 模式下检查 DOUT 的间隔 (秒)
+    """
+
+    def __init__(self, hx, mode="interrupt", timeout=0.5, poll_interval=0.005):
+        if mode not in READ_MODES:
+            raise ValueError(f"未知的 HX711 读取方式: {mode}，可选: {', '.join(READ_MODES)}")
+        self.hx = hx
+        self.requested_mode = mode
+        self.mode = mode
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._value = None
+        self.edges = 0 # 回调中成功读到的采样数
+        self.timeouts = 0
+        self.recovered = 0 # 中断模式下超时后主动读取成功的次数
+        self.started = False
+
+    def start(self):
+        """启用下降沿回调；GPIO 边沿检测不可用时退化为 poll 模式"""
+        if self.mode == "interrupt":
+            try:
+                self.hx.enableReadyCallback(self._on_ready)
+            except Exception as e:
+                print(f"HX711 边沿检测不可用，改为定时轮询: {e}")
+                self.mode = "poll"
+        self.started = True
+        return self
+
+    def close(self):
+        if self.mode == "interrupt" and self.hx.readyCallbackEnabled:
+            try:
+                self.hx.disableReadyCallback()
+            except Exception as e:
+                print(f"关闭 HX711 边沿检测失败: {e}")
+        self._ready.set() # 唤醒正在等待的采样线程
+        self.started = False
+
+    # --- 中断模式 ---
+    def _on_ready(self, raw_bytes):
+        """GPIO 回调线程：DOUT 下降沿时库已读出原始字节，换算成克后交给采样线程"""
+        if raw_bytes is None:
+            return # 采样线程正在读取 (持有读锁)，这次边沿由它处理
+        value = self.hx.rawBytesToWeight(raw_bytes)
+        with self._lock:
+            self._value = value
+            self.edges += 1
+        self._ready.set()
+
+    def _read_ready(self):
+        """DOUT 已为低电平时立即读取 (不等待)"""
+        raw_bytes = self.hx.readRawBytes(blockUntilReady=True, timeout=0)
+        return self.hx.rawBytesToWeight(raw_bytes) if raw_bytes is not None else None
+
+    def _wait_interrupt(self):
+        if self._ready.wait(self.timeout):
+            with self._lock:
+                self._ready.clear()
+                value, self._value = self._value, None
+            if value is not None:
+                return value
+        # 超时：可能错过了下降沿 (DOUT 会保持低电平直到数据被读出)，主动检查一次
+        if self.hx.isReady():
+            value = self._read_ready()
+            if value is not None:
+                with self._lock:
+                    self.recovered += 1
+                return value
+        return None
+
+    # --- 轮询模式 ---
+    def _wait_poll(self):
+        deadline = time.monotonic() + self.timeout
+        while not self.hx.isReady():
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(self.poll_interval)
+        return self._read_ready()
+
+    def getWeight(self):
+        """等待下一个采样并返回克数，超时返回 None"""
+        if self.mode == "interrupt":
+            value = self._wait_interrupt()
+        elif self.mode == "poll":
+            value = self._wait_poll()
+        else:
+            raw_bytes = self.hx.readRawBytes(timeout=self.timeout)
+            value = self.hx.rawBytesToWeight(raw_bytes) if raw_bytes is not None else None
+        if value is None:
+            with self._lock:
+                self.timeouts += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "requested_mode": self.requested_mode,
+                "edges": self.edges,
+                "recovered": self.recovered,
+                "timeouts": self.timeouts,
+            }
@@ -181,7 +181,7 @@ class HX711:
        return byteValue 
 
 
-    def readRawBytes(self, blockUntilReady=True):
+    def readRawBytes(self, blockUntilReady=True, timeout=None):
         
         if self.GAIN is None:
             raise ValueError("HX711::readRawBytes() called without setting gain first!")
@@ -194,9 +194,13 @@ class HX711:
             # return None.
             return None
 
-        # Wait until HX711 is ready for us to read a sample.
+        # Wait until HX711 is ready for us to read a sample.  With a timeout
+        # the wait is bounded, and None is returned if DOUT never goes low.
+        deadline = None if timeout is None else time.monotonic() + timeout
         while self.isReady() is not True:
-           pass
+           if deadline is not None and time.monotonic() > deadline:
+               self.readLock.release()
+               return None
 
         # Read three bytes of data from the HX711.
         firstByte  = self.readNextByte()
@@ -251,6 +255,12 @@ class HX711:
         # Check if the callback is for the DOUT pin.
         if(pin != self.DOUT):
             return
+
+        # Clocking the data out toggles DOUT, which queues extra falling edges.
+        # Only read when a conversion is really waiting, otherwise readRawBytes
+        # would spin in the callback thread until the next conversion.
+        if not self.isReady():
+            return
         
         self.lastRawBytes = self.readRawBytes(blockUntilReady=False)
         if self.paramCallback is not None:
@@ -0,0 +1,188 @@
+# inference_backend.py
+"""
+推理后端抽象
+所有后端都实现 predict(frame) -> 检测列表，以及批量接口 predict_batch(frames) -> 检测列表的列表，
+检测项格式与 detection_thread 使用的一致:
+    {"class_id": int, "name": str, "conf": float, "box": [x1, y1, x2, y2]}
+
+可用后端:
+    ultralytics  - 通过 ultralytics.YOLO 加载，支持 best.pt 以及导出的 ONNX / OpenVINO / TFLite 模型
+    onnxruntime  - 直接使用 onnxruntime 运行导出的 ONNX 模型（含 INT8 量化模型），不依赖 PyTorch
+
+输入帧统一为 BGR 通道顺序的 uint8 HWC 数组 (与 cv2.imread 相同；Picamera2 的 "RGB888" 在内存中也是 BGR)。
+ultralytics 对 numpy 输入按 BGR 处理并自行转为 RGB，onnxruntime 后端在 preprocess 中做同样的转换，
+两个后端得到的网络输入一致。
+"""
+import ast
+
+import cv2
+import numpy as np
+
+
+def extract_detections(results, names):
+    """把 ultralytics 的推理结果转换为可跨进程传输的检测列表"""
+    return result_detections(results[0], names)
+
+
+def result_detections(result, names):
+    """转换单张图片的 ultralytics 推理结果"""
+    detections = []
+    for box in result.boxes:
+        class_id = int(box.cls[0])
+        detections.append({
+            "class_id": class_id,
+            "name": names[class_id],
+            "conf": float(box.conf[0]),
+            "box": [float(v) for v in box.xyxy[0]],
+        })
+    return detections
+
+
+def letterbox(frame, imgsz):
+    """等比缩放并填充到 imgsz x imgsz，返回 (图像, 缩放比例, (左填充, 上填充))"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+    if new_w == imgsz and new_h == imgsz:
+        return frame, scale, (0, 0)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = frame
+    return canvas, scale, (pad_x, pad_y)
+
+
+def preprocess(frame, imgsz):
+    """BGR uint8 HWC -> RGB float32 NCHW (0~1)，与 ultralytics 的预处理一致，返回 (张量, 缩放比例, 填充)"""
+    image, scale, pad = letterbox(frame, imgsz)
+    tensor = np.ascontiguousarray(image[..., ::-1].transpose(2, 0, 1)[np.newaxis], dtype=np.float32)
+    tensor /= 255.0
+    return tensor, scale, pad
+
+
+class InferenceBackend:
+    """推理后端基类"""
+    names = {}
+
+    def predict(self, frame):
+        raise NotImplementedError
+
+    def predict_batch(self, frames):
+        """批量推理，默认逐帧调用 predict()，支持批量的后端应覆盖此方法"""
+        return [self.predict(frame) for frame in frames]
+
+
+class UltralyticsBackend(InferenceBackend):
+    """ultralytics YOLO 后端（PyTorch 或 ultralytics 支持的导出格式）"""
+
+    def __init__(self, model_path, imgsz=320, conf=0.5, device="cpu"):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path, task="detect")
+        self.imgsz = imgsz
+        self.conf = conf
+        self.device = device
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, frame):
+        results = self.model(frame, imgsz=self.imgsz, conf=self.conf, device=self.device, verbose=False)
+        return extract_detections(results, self.model.names)
+
+    def predict_batch(self, frames):
+        results = self.model(list(frames), imgsz=self.imgsz, conf=self.conf, device=self.device, verbose=False)
+        return [result_detections(result, self.model.names) for result in results]
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """onnxruntime 后端：自行完成预处理、输出解码和 NMS"""
+
+    def __init__(self, model_path, imgsz=320, conf=0.5, iou=0.45, threads=None, names=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 导出时使用 dynamic=True 的模型 batch 维度不是固定整数，可以一次送入多帧
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        if names is None:
+            # ultralytics 导出的 ONNX 会把类别名写入元数据
+            meta = self.session.get_modelmeta().custom_metadata_map
+            names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.names = names
+
+    def predict(self, frame):
+        tensor, scale, pad = preprocess(frame, self.imgsz)
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        return self.decode(output[0], scale, pad, frame.shape[:2])
+
+    def predict_batch(self, frames):
+        if not self.dynamic_batch or len(frames) == 1:
+            return [self.predict(frame) for frame in frames]
+        prepared = [preprocess(frame, self.imgsz) for frame in frames]
+        batch = np.concatenate([tensor for tensor, _, _ in prepared])
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [self.decode(output, scale, pad, frame.shape[:2])
+                for output, (_, scale, pad), frame in zip(outputs, prepared, frames)]
+
+    def decode(self, output, scale, pad, frame_hw):
+        """解码 YOLOv8 输出 (4 + 类别数, 候选框数) 并做按类别的 NMS"""
+        predictions = output.T
+        scores_all = predictions[:, 4:]
+        class_ids = scores_all.argmax(axis=1)
+        scores = scores_all[np.arange(len(class_ids)), class_ids]
+        keep = scores >= self.conf
+        if not np.any(keep):
+            return []
+        boxes_cxcywh, scores, class_ids = predictions[keep, :4], scores[keep], class_ids[keep]
+
+        boxes = np.empty_like(boxes_cxcywh)
+        boxes[:, 0] = boxes_cxcywh[:, 0] - boxes_cxcywh[:, 2] / 2
+        boxes[:, 1] = boxes_cxcywh[:, 1] - boxes_cxcywh[:, 3] / 2
+        boxes[:, 2] = boxes_cxcywh[:, 0] + boxes_cxcywh[:, 2] / 2
+        boxes[:, 3] = boxes_cxcywh[:, 1] + boxes_cxcywh[:, 3] / 2
+        # 还原到原图坐标
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / scale
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / scale
+        height, width = frame_hw
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+        # 按类别偏移后做一次 NMS，相当于逐类别 NMS
+        offset = class_ids[:, None].astype(np.float32) * 4096.0
+        nms_boxes = boxes + offset
+        xywh = np.column_stack([nms_boxes[:, :2], nms_boxes[:, 2:] - nms_boxes[:, :2]])
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.conf, self.iou)
+
+        detections = []
+        for i in np.array(indices).reshape(-1):
+            class_id = int(class_ids[i])
+            detections.append({
+                "class_id": class_id,
+                "name": self.names.get(class_id, str(class_id)),
+                "conf": float(scores[i]),
+                "box": [float(v) for v in boxes[i]],
+            })
+        return detections
+
+
+BACKENDS = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+}
+
+
+def load_backend(kind, model_path, imgsz=320, conf=0.5, device="cpu"):
+    """按名称加载推理后端（模块级函数，可作为推理子进程的模型工厂）"""
+    if kind not in BACKENDS:
+        raise ValueError(f"未知的推理后端: {kind}，可选: {', '.join(BACKENDS)}")
+    if kind == "ultralytics":
+        return UltralyticsBackend(model_path, imgsz=imgsz, conf=conf, device=device)
+    return BACKENDS[kind](model_path, imgsz=imgsz, conf=conf)
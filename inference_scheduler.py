@@ -0,0 +1,118 @@
+# inference_scheduler.py
+"""
+推理调度器：决定推理阶段分析哪些帧
+- 空闲时按较低的目标推理帧率运行，最近检测到猫咪后提高到较快的帧率
+- 采用丢弃旧帧策略：每次只分析帧环中的最新帧，中间来不及分析的帧直接跳过
+"""
+import threading
+import time
+
+
+class InferenceScheduler:
+
+    def __init__(self, idle_fps=2.0, active_fps=8.0, active_hold=10.0):
+        """
+        参数:
+            idle_fps: 空闲时的目标推理帧率
+            active_fps: 最近有检测结果时的目标推理帧率
+            active_hold: 检测到目标后保持高帧率的时间（秒）
+        """
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.active_hold = active_hold
+        self._lock = threading.Lock()
+        self._last_run = None
+        self._last_detection = None
+        self._last_seq = None
+        self.inferred_frames = 0
+        self.dropped_frames = 0
+
+    def is_active(self, now=None):
+        """最近是否有检测结果（处于高帧率模式）"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._last_detection is not None and now - self._last_detection < self.active_hold
+
+    def interval(self, now=None):
+        """当前模式下两次推理之间的目标间隔（秒）"""
+        fps = self.active_fps if self.is_active(now) else self.idle_fps
+        return 1.0 / fps if fps > 0 else 1.0
+
+    def wait_time(self, now=None):
+        """距离下一次允许推理还需等待的时间（秒）"""
+        now = time.monotonic() if now is None else now
+        interval = self.interval(now)
+        with self._lock:
+            if self._last_run is None:
+                return 0.0
+            return max(0.0, self._last_run + interval - now)
+
+    def take(self, seq, now=None, infer=True):
+        """
+        记录本次要分析的帧序号，并统计因丢弃旧帧策略而跳过的帧数
+        infer=False 表示该帧被运动门控跳过，只占用调度节拍，不计入推理次数
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_seq is not None and seq > self._last_seq + 1:
+                self.dropped_frames += seq - self._last_seq - 1
+            self._last_seq = seq
+            self._last_run = now
+            if infer:
+                self.inferred_frames += 1
+
+    def record(self, detected, now=None):
+        """记录推理结果，检测到目标时切换到高帧率模式"""
+        now = time.monotonic() if now is None else now
+        if detected:
+            with self._lock:
+                self._last_detection = now
+
+    def stats(self):
+        now = time.monotonic()
+        active = self.is_active(now)
+        with self._lock:
+            return {
+                "inferred_frames": self.inferred_frames,
+                "dropped_frames": self.dropped_frames,
+                "mode": "active" if active else "idle",
+                "target_fps": self.active_fps if active else self.idle_fps,
+            }
+
+
+class BurstConfirmer:
+    """
+    连拍确认：出现运动或首次检测到目标时，收集 N 帧作为一个批次推理，
+    至少 k 帧检测到目标才确认，减少单帧误检导致的自动喂食
+    """
+
+    def __init__(self, size=4, votes=3):
+        if not 1 <= votes <= size:
+            raise ValueError("votes 必须在 1 和 size 之间")
+        self.size = size
+        self.votes = votes
+        self._lock = threading.Lock()
+        self.bursts = 0
+        self.confirmed = 0
+        self.rejected = 0
+
+    def vote(self, hits):
+        """hits 为每帧是否检测到目标的列表，返回是否确认"""
+        confirmed = sum(1 for hit in hits if hit) >= self.votes
+        with self._lock:
+            self.bursts += 1
+            if confirmed:
+                self.confirmed += 1
+            else:
+                self.rejected += 1
+        return confirmed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "votes": self.votes,
+                "bursts": self.bursts,
+                "confirmed": self.confirmed,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,194 @@
+# inference_worker.py
+"""
+独立推理进程池：把模型推理放到子进程中执行，避免与 Flask 争抢同一个 GIL。
+模型由 model_factory 在子进程中创建，需返回 inference_backend.InferenceBackend。
+子进程连接到共享内存帧环 (frame_ring.FrameRing)，按槽位直接读取画面，只回传检测结果列表。
+视频流的绘制和编码由采集阶段完成，不再占用推理进程。
+"""
+import itertools
+import queue
+import multiprocessing as mp
+
+from frame_ring import FrameRing
+
+
+class LocalInference:
+    """在当前进程内推理，接口与 InferenceWorkerPool 一致（workers=0 时使用）"""
+
+    def __init__(self, model_factory, model_args=()):
+        self.model = model_factory(*model_args)
+
+    def infer(self, frame, timeout=None):
+        """frame 为 frame_ring.PinnedFrame"""
+        return self.model.predict(frame.array)
+
+    def infer_batch(self, frames, timeout=None):
+        """frames 为 PinnedFrame 列表，返回每帧的检测列表"""
+        return self.model.predict_batch([frame.array for frame in frames])
+
+    def close(self):
+        self.model = None
+
+
+def _worker_main(model_factory, model_args, ring_args, conn):
+    """子进程入口：从共享内存帧环读取帧，推理后只回传检测结果"""
+    ring = FrameRing.attach(*ring_args)
+    try:
+        model = model_factory(*model_args)
+        conn.send(("ready", None))
+        while True:
+            job = conn.recv()
+            if job is None: # 退出信号
+                break
+            job_id, refs = job
+            frames = [ring.get(slot, seq) for slot, seq in refs]
+            if any(frame is None for frame in frames):
+                conn.send((job_id, "帧已被覆盖"))
+                continue
+            try:
+                if len(frames) == 1:
+                    conn.send((job_id, [model.predict(frames[0])]))
+                else:
+                    conn.send((job_id, model.predict_batch(frames)))
+            except Exception as e:
+                conn.send((job_id, str(e)))
+            finally:
+                del frames
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+class InferenceWorkerPool:
+    """
+    推理子进程池
+    主进程 pin 住帧环中的一帧后只发送 (任务编号, 槽位, 序号)，
+    子进程直接读取共享内存中的画面，避免对整帧做拷贝和 pickle 序列化。
+    """
+
+    def __init__(self, model_factory, model_args=(), ring=None, workers=1,
+                 start_method="spawn", start_timeout=120):
+        if workers < 1:
+            raise ValueError("workers 必须大于等于 1")
+        self.model_factory = model_factory
+        self.model_args = tuple(model_args)
+        self.ring_args = ring.attach_args()
+        self.start_timeout = start_timeout
+        self._ctx = mp.get_context(start_method)
+        self._job_ids = itertools.count(1)
+        self._workers = [None] * workers
+        self._idle = queue.Queue()
+        for idx in range(workers):
+            self._start_worker(idx)
+            self._idle.put(idx)
+
+    def _start_worker(self, idx):
+        """启动（或重启）第 idx 个子进程并等待模型加载完成"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_factory, self.model_args, self.ring_args, child_conn),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        exited = False
+        try:
+            ready = parent_conn.poll(self.start_timeout) and parent_conn.recv()
+        except (EOFError, OSError): # 加载模型时子进程退出
+            ready, exited = None, True
+        if not ready:
+            if not exited:
+                process.terminate()
+            process.join(timeout=2)
+            parent_conn.close()
+            if exited:
+                raise RuntimeError(f"推理进程 {idx} 启动失败 (退出码 {process.exitcode})")
+            raise RuntimeError(f"推理进程 {idx} 启动超时")
+        self._workers[idx] = {"process": process, "conn": parent_conn}
+        print(f"推理进程 {idx} 已就绪 (PID: {process.pid})")
+
+    def _restart_worker(self, idx):
+        """强制结束并重启第 idx 个子进程；启动失败时该位置保持为空，下次取用时再重试，返回是否成功"""
+        self._stop_worker(idx, graceful=False)
+        try:
+            self._start_worker(idx)
+            return True
+        except RuntimeError as e:
+            print(f"{e}，下次推理时重试")
+            return False
+
+    def _checkout(self):
+        """取一个空闲子进程；该位置的进程已退出或上次重启失败时先重启"""
+        idx = self._idle.get()
+        worker = self._workers[idx]
+        if worker is None or not worker["process"].is_alive():
+            print(f"推理进程 {idx} 不可用，正在重启...")
+            if not self._restart_worker(idx):
+                self._idle.put(idx)
+                raise RuntimeError(f"推理进程 {idx} 不可用")
+        return idx
+
+    def _stop_worker(self, idx, graceful=True):
+        worker = self._workers[idx]
+        if worker is None:
+            return
+        self._workers[idx] = None
+        try:
+            if graceful:
+                worker["conn"].send(None)
+                worker["process"].join(timeout=2)
+        except (OSError, BrokenPipeError):
+            pass
+        if worker["process"].is_alive():
+            worker["process"].terminate()
+            worker["process"].join(timeout=2)
+        worker["conn"].close()
+
+    def infer(self, frame, timeout=None):
+        """
+        提交一帧进行推理
+        参数:
+            frame: frame_ring.PinnedFrame，推理完成前调用方需保持 pin 住
+        返回:
+            检测列表
+        超时会重启对应子进程并抛出 TimeoutError；子进程意外退出时重启并抛出 RuntimeError
+        """
+        return self.infer_batch([frame], timeout)[0]
+
+    def infer_batch(self, frames, timeout=None):
+        """把多帧作为一个批次交给同一个子进程推理，返回每帧的检测列表"""
+        idx = self._checkout()
+        try:
+            conn = self._workers[idx]["conn"]
+            job_id = next(self._job_ids)
+            try:
+                conn.send((job_id, [(frame.slot, frame.seq) for frame in frames]))
+                reply = conn.recv() if conn.poll(timeout) else None
+            except (EOFError, OSError) as e: # 子进程被杀死或崩溃 (例如 OOM)，管道已断开
+                print(f"推理进程 {idx} 意外退出，正在重启...")
+                self._restart_worker(idx)
+                raise RuntimeError(f"推理进程 {idx} 意外退出") from e
+            if reply is None:
+                print(f"推理进程 {idx} 超时，正在重启...")
+                self._restart_worker(idx)
+                raise TimeoutError("推理超时")
+            _, payload = reply
+        finally:
+            self._idle.put(idx)
+
+        if isinstance(payload, str):
+            raise RuntimeError(f"推理进程出错: {payload}")
+        return payload
+
+    def close(self):
+        for idx in range(len(self._workers)):
+            self._stop_worker(idx)
+
+
+def create_inference(model_factory, model_args=(), ring=None, workers=1, **kwargs):
+    """根据 workers 数量创建推理器：0 表示在当前进程内推理"""
+    if workers <= 0:
+        return LocalInference(model_factory, model_args)
+    return InferenceWorkerPool(model_factory, model_args, ring=ring, workers=workers, **kwargs)
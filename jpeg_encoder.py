@@ -0,0 +1,165 @@
+# jpeg_encoder.py
+"""
+JPEG 编码层
+所有编码器都实现 encode(frame_bgr) -> bytes，可配置质量和色度抽样:
+    "420" - 色度 2x2 抽样，体积最小，适合弱 Wi-Fi
+    "422" - 色度水平抽样
+    "444" - 不抽样，颜色边缘 (检测框、文字) 最清晰
+
+可用编码器:
+    turbojpeg - 通过 PyTurboJPEG 直接调用 libjpeg-turbo，可启用快速 DCT
+    opencv    - cv2.imencode，始终可用
+create_encoder("auto", ...) 优先使用 turbojpeg，不可用时回退到 opencv。
+"""
+import bisect
+import threading
+import time
+
+import cv2
+
+SUBSAMPLING_CHOICES = ("420", "422", "444")
+
+_CV2_SAMPLING = {
+    "420": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_420", None),
+    "422": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_422", None),
+    "444": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_444", None),
+}
+
+
+class JpegEncoder:
+    """JPEG 编码器基类"""
+    name = "base"
+
+    def __init__(self, quality=80, subsampling="420"):
+        if subsampling not in SUBSAMPLING_CHOICES:
+            raise ValueError(f"未知的色度抽样: {subsampling}，可选: {', '.join(SUBSAMPLING_CHOICES)}")
+        self.quality = int(quality)
+        self.subsampling = subsampling
+
+    def encode(self, frame_bgr):
+        raise NotImplementedError
+
+
+class OpenCVJpegEncoder(JpegEncoder):
+    """cv2.imencode 编码器；旧版 OpenCV 不支持设置色度抽样时使用库默认值 (4:2:0)"""
+    name = "opencv"
+
+    def __init__(self, quality=80, subsampling="420", optimize=False):
+        super().__init__(quality, subsampling)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        sampling = _CV2_SAMPLING[subsampling]
+        if sampling is not None:
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, sampling]
+        if optimize:
+            # 优化霍夫曼表：体积减小几个百分点，编码稍慢
+            params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        self._params = params
+
+    def encode(self, frame_bgr):
+        ret, buffer = cv2.imencode('.jpg', frame_bgr, self._params)
+        if not ret:
+            raise RuntimeError("JPEG 编码失败")
+        return buffer.tobytes()
+
+
+class TurboJpegEncoder(JpegEncoder):
+    """libjpeg-turbo 编码器 (需要 pip install PyTurboJPEG 和系统的 libturbojpeg)"""
+    name = "turbojpeg"
+
+    def __init__(self, quality=80, subsampling="420", fast_dct=True, lib_path=None):
+        super().__init__(quality, subsampling)
+        import turbojpeg
+        self._jpeg = turbojpeg.TurboJPEG(lib_path)
+        self._subsample = {
+            "420": turbojpeg.TJSAMP_420,
+            "422": turbojpeg.TJSAMP_422,
+            "444": turbojpeg.TJSAMP_444,
+        }[subsampling]
+        self._flags = turbojpeg.TJFLAG_FASTDCT if fast_dct else 0
+
+    def encode(self, frame_bgr):
+        return self._jpeg.encode(frame_bgr, quality=self.quality, jpeg_subsample=self._subsample,
+                                 flags=self._flags)
+
+
+ENCODERS = {
+    "turbojpeg": TurboJpegEncoder,
+    "opencv": OpenCVJpegEncoder,
+}
+
+
+def create_encoder(kind="auto", quality=80, subsampling="420"):
+    """按名称创建编码器；"auto" 时依次尝试 turbojpeg、opencv"""
+    if kind == "auto":
+        try:
+            return TurboJpegEncoder(quality, subsampling)
+        except (ImportError, OSError, RuntimeError):
+            return OpenCVJpegEncoder(quality, subsampling)
+    if kind not in ENCODERS:
+        raise ValueError(f"未知的 JPEG 编码器: {kind}，可选: auto, {', '.join(ENCODERS)}")
+    return ENCODERS[kind](quality, subsampling)
+
+
+class EncodeHistogram:
+    """
+    编码耗时直方图 (固定桶边界，单位 ms) 以及每帧字节数统计
+    线程安全，开销是每帧一次 bisect，适合常驻在视频流路径上
+    """
+    BUCKETS_MS = (1, 2, 4, 6, 8, 12, 16, 24, 33, 50, 100)
+
+    def __init__(self, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets_ms) + 1)
+            self.frames = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+            self.total_bytes = 0
+
+    def record(self, elapsed_ms, size):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+            self.frames += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.total_bytes += size
+
+    def percentile(self, fraction):
+        """按桶上界估计分位数，落在最后一个桶时返回观测到的最大值"""
+        with self._lock:
+            if not self.frames:
+                return 0.0
+            target = fraction * self.frames
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+            return self.max_ms
+
+    def stats(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+            return {
+                "frames": self.frames,
+                "avg_ms": round(self.total_ms / self.frames, 2) if self.frames else 0.0,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "max_ms": round(self.max_ms, 2),
+                "avg_bytes": round(self.total_bytes / self.frames) if self.frames else 0,
+                "histogram": dict(zip(labels, self.counts)),
+            }
+
+
+def timed_encode(encoder, frame_bgr, histogram=None):
+    """编码一帧并把耗时和字节数记入直方图，返回 JPEG 字节"""
+    start = time.perf_counter()
+    jpeg = encoder.encode(frame_bgr)
+    if histogram is not None:
+        histogram.record((time.perf_counter() - start) * 1000.0, len(jpeg))
+    return jpeg
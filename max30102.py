@@ -1,6 +1,8 @@
 import smbus
 import time
-import math
+
+import ppg
+from max30102_reader import MAX30102Reader, read_fifo_burst
 
 class MAX30102:
     # 寄存器地址定义
@@ -23,6 +25,7 @@ class MAX30102:
     I2C_ADDR = 0x57
 
     def __init__(self, i2c_bus=1):
+        self._surplus = ([], []) # 上次读出但超过 sample_size 的 (red, ir) 样本
         self.bus = smbus.SMBus(i2c_bus)
         self.reset()
         self.initialize()
@@ -64,126 +67,70 @@ class MAX30102:
         self.write_register(self.REG_PILOT_PA, 0x7F)
 
     def read_fifo(self):
-        """读取FIFO数据（返回红光和红外值）"""
-        # 读取6字节数据
-        data = self.bus.read_i2c_block_data(self.I2C_ADDR, self.REG_FIFO_DATA, 6)
-
-        # 解析红光数据（24位转18位）
-        red = (data[0] << 16) | (data[1] << 8) | data[2]
-        red &= 0x3FFFF  # 保留18位
-
-        # 解析红外数据
-        ir = (data[3] << 16) | (data[4] << 8) | data[5]
-        ir &= 0x3FFFF
-
+        """读取FIFO中的全部样本（返回红光和红外数组）"""
+        red, ir, overflow, _ = read_fifo_burst(self.bus, self.I2C_ADDR)
+        if overflow:
+            print(f"FIFO溢出，丢失 {overflow} 个样本")
         return red, ir
 
     def get_sensor_data(self, sample_size=500):
-        """获取指定数量的样本数据"""
-        red_buffer = []
-        ir_buffer = []
-
-        for _ in range(sample_size):
-            # 等待数据就绪（简单轮询）
-            while (self.read_register(self.REG_INTR_STATUS_1) & 0x40) == 0:
-                time.sleep(0.001)
+        """获取指定数量的样本数据（多读出的样本留到下一次调用最先返回，保证相邻两次的样本连续）"""
+        red_buffer, ir_buffer = self._surplus
 
+        while len(red_buffer) < sample_size:
             red, ir = self.read_fifo()
-            red_buffer.append(red)
-            ir_buffer.append(ir)
+            red_buffer.extend(red.tolist())
+            ir_buffer.extend(ir.tolist())
+            if len(red_buffer) < sample_size:
+                # 等待FIFO积累剩余的样本（最多半个FIFO）
+                time.sleep(min(sample_size - len(red_buffer), 16) / ppg.SAMPLE_RATE)
 
-        return red_buffer, ir_buffer
+        self._surplus = (red_buffer[sample_size:], ir_buffer[sample_size:])
+        return red_buffer[:sample_size], ir_buffer[:sample_size]
 
     def calculate_hr_and_spo2(self, ir_data, red_data):
         """
-        计算心率和血氧值
+        计算心率和血氧值 (ppg.analyze)
         :param ir_data: 红外信号数据
         :param red_data: 红光信号数据
         :return: 心率, 血氧值, 是否有效
         """
-        BUFFER_SIZE = len(ir_data)
-        # 去除直流分量
-        ir_mean = sum(ir_data) // BUFFER_SIZE
-        red_mean = sum(red_data) // BUFFER_SIZE
-        ir_ac = [val - ir_mean for val in ir_data]
-        red_ac = [val - red_mean for val in red_data]
-
-        # 差分信号
-        dx = [ir_ac[i + 1] - ir_ac[i] for i in range(BUFFER_SIZE - 1)]
-
-        # 找到峰值位置
-        peaks = self.find_peaks(dx, threshold=max(dx) // 2, min_distance=5)
-
-        if len(peaks) < 2:
-            return -1, -1, False
-
-        # 计算心跳间隔
-        peak_intervals = [peaks[i + 1] - peaks[i] for i in range(len(peaks) - 1)]
-        avg_interval = sum(peak_intervals) // len(peak_intervals)
-        heart_rate = 60 * 100 // avg_interval  # 采样率为100Hz
-
-        # 计算R值
-        ac_red = max(red_ac) - min(red_ac)
-        dc_red = red_mean
-        ac_ir = max(ir_ac) - min(ir_ac)
-        dc_ir = ir_mean
-
-        R = (ac_red / dc_red) / (ac_ir / dc_ir)
-
-        # 使用经验公式计算血氧值
-        spo2 = 110 - 25 * R
-
-        # 判断有效性
-        hr_valid = 40 <= heart_rate <= 220
-        spo2_valid = 80 <= spo2 <= 100
-
-        return heart_rate, spo2, hr_valid and spo2_valid
-
-    @staticmethod
-    def find_peaks(signal, threshold, min_distance):
-        """
-        查找信号中的峰值位置
-        :param signal: 输入信号
-        :param threshold: 峰值最小高度
-        :param min_distance: 峰值之间的最小距离
-        :return: 峰值位置列表
-        """
-        peaks = []
-        for i in range(1, len(signal) - 1):
-            if signal[i] > threshold and signal[i] > signal[i - 1] and signal[i] > signal[i + 1]:
-                if not peaks or i - peaks[-1] >= min_distance:
-                    peaks.append(i)
-        return peaks
+        return ppg.analyze(ir_data, red_data)
 
 class MAX30102App:
     """
     封装 MAX30102 应用逻辑的类，
-    内部创建 MAX30102 对象，并通过 run() 方法启动数据采集和计算心率、血氧值。
+    内部创建 MAX30102 对象，由 MAX30102Reader 在后台批量读取 FIFO，run() 每 hop 个样本的时间输出一次按最近 window 个样本计算的心率、血氧值。
     """
-    def __init__(self, i2c_bus=1, sample_size=500):
+    def __init__(self, i2c_bus=1, window=4 * ppg.SAMPLE_RATE, hop=ppg.SAMPLE_RATE // 4):
         self.sensor = MAX30102(i2c_bus)
-        self.sample_size = sample_size
+        self.monitor = ppg.PPGMonitor(window=window, hop=hop)
+        self.reader = MAX30102Reader(self.sensor, monitor=self.monitor)
+        self.hop = hop
         self.last_heart_rate = 0
 
     def run(self):
+        self.reader.start()
         try:
             while True:
-                # 获取指定数量的样本数据
-                red_data, ir_data = self.sensor.get_sensor_data(self.sample_size)
+                # 等待 hop 个新样本
+                if not self.reader.wait_samples(self.hop):
+                    print("读取超时，请检查传感器连接")
+                    continue
 
-                # 计算心率和血氧值
-                heart_rate, spo2, valid = self.sensor.calculate_hr_and_spo2(ir_data, red_data)
+                # 最近一次有效的心率和血氧值
+                heart_rate, spo2 = self.monitor.latest()
 
-                if valid:
+                if heart_rate is not None:
                     self.last_heart_rate = heart_rate  # 更新最新心率
                     print(f"心率: {heart_rate} bpm, 血氧: {spo2:.2f}%")
                 else:
                     print("数据无效，请重试")
                     self.last_heart_rate = 0
-
-                time.sleep(1)
         except KeyboardInterrupt:
             print("程序终止")
+        finally:
+            self.reader.close()
 
 if __name__ == "__main__":
     app = MAX30102App()
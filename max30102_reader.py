@@ -0,0 +1,181 @@
+# max30102_reader.py
+"""
+MAX30102 FIFO 批量读取
+原先每个样本都要先读一次 INTR_STATUS_1 等 PPG_RDY，再读 6 字节 FIFO，没数据时睡眠 1-5ms：
+总线事务数翻倍，睡眠粒度还限制了能跟上的采样率。芯片自带 32 级 FIFO，这里改为:
+    1. 一次块读取 FIFO_WR_PTR / OVF_COUNTER / FIFO_RD_PTR (寄存器地址自增，三个寄存器相邻)
+    2. 可读样本数 = (WR_PTR - RD_PTR) mod 32 (指针相等且 OVF_COUNTER 非零时为满的 32 个)
+    3. 从 FIFO_DATA 连续块读取全部样本 (该地址不自增，连续读出即依次出队)；smbus 单次块读取最多 32 字节，
+       超过 5 个样本时按 30 字节分块
+    4. 用 numpy 一次解码为红光 / 红外数组
+MAX30102Reader 在后台线程中每隔 poll_interval (默认为 FIFO 填满一半的时间) 执行一次，
+样本写入固定大小的 numpy 环形缓冲区并推给 ppg.PPGMonitor；发生溢出 (样本丢失) 时重置 PPGMonitor 的窗口。
+"""
+import threading
+import time
+
+import numpy as np
+
+from ppg import SAMPLE_RATE
+
+REG_FIFO_WR_PTR = 0x04
+REG_FIFO_DATA = 0x07
+FIFO_DEPTH = 32
+SAMPLE_BYTES = 6 # 红光 3 字节 + 红外 3 字节
+I2C_BLOCK_MAX = 32
+_COLUMNS = ("ts", "red", "ir")
+
+
+def decode_fifo(data):
+    """把 FIFO 原始字节 (6 字节一个样本) 解码为 (red, ir) 两个 int64 数组，每个值取低 18 位"""
+    raw = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, SAMPLE_BYTES).astype(np.int64)
+    values = ((raw[:, 0::3] << 16) | (raw[:, 1::3] << 8) | raw[:, 2::3]) & 0x3FFFF
+    return values[:, 0], values[:, 1]
+
+
+def read_fifo_burst(bus, address, max_block=I2C_BLOCK_MAX):
+    """
+    读出 FIFO 中全部样本，返回 (red, ir, overflow, transactions)
+    overflow 为上次读取后因 FIFO 满而丢失的样本数 (OVF_COUNTER)
+    """
+    wr, overflow, rd = bus.read_i2c_block_data(address, REG_FIFO_WR_PTR, 3)
+    count = (wr - rd) % FIFO_DEPTH
+    if count == 0 and overflow:
+        count = FIFO_DEPTH
+    transactions = 1
+    data = []
+    chunk = max_block // SAMPLE_BYTES * SAMPLE_BYTES
+    remaining = count * SAMPLE_BYTES
+    while remaining:
+        length = min(chunk, remaining)
+        data += bus.read_i2c_block_data(address, REG_FIFO_DATA, length)
+        remaining -= length
+        transactions += 1
+    red, ir = decode_fifo(data)
+    return red, ir, overflow, transactions
+
+
+class MAX30102Reader:
+    """
+    参数:
+        sensor: hardware.MAX30102_Sensor 或 max30102.MAX30102 (提供 bus 和 I2C_ADDR，且已完成初始化)
+        fs: FIFO 的输出速率 (样本/秒)，需与芯片配置一致
+        monitor: ppg.PPGMonitor，每批样本读出后推入 (可选)
+        capacity: 环形缓冲区容量 (样本数)
+        poll_interval: 两次读取 FIFO 的间隔 (秒)，默认为 FIFO 填满一半的时间
+        max_block: 单次块读取的最大字节数
+    """
+
+    def __init__(self, sensor, fs=SAMPLE_RATE, monitor=None, capacity=4096, poll_interval=None,
+                 max_block=I2C_BLOCK_MAX):
+        if max_block < SAMPLE_BYTES:
+            raise ValueError(f"块读取至少要能容纳一个样本 ({SAMPLE_BYTES} 字节): {max_block}")
+        self.sensor = sensor
+        self.fs = fs
+        self.monitor = monitor
+        self.capacity = capacity
+        self.poll_interval = poll_interval if poll_interval is not None else FIFO_DEPTH / 2 / fs
+        self.max_block = max_block
+        self._buffer = np.zeros((capacity, len(_COLUMNS)))
+        self._lock = threading.Lock()
+        self._new_sample = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._count = 0
+        self._started = None
+        self.bursts = 0
+        self.transactions = 0
+        self.overflows = 0 # 因 FIFO 满而丢失的样本数
+        self.errors = 0
+
+    def start(self):
+        """清空 FIFO 指针后启动采集线程"""
+        bus, address = self.sensor.bus, self.sensor.I2C_ADDR
+        for reg in (REG_FIFO_WR_PTR, REG_FIFO_WR_PTR + 1, REG_FIFO_WR_PTR + 2): # WR_PTR / OVF_COUNTER / RD_PTR
+            bus.write_byte_data(address, reg, 0x00)
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="max30102-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll()
+            self._stop.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def poll(self):
+        """读取一次 FIFO，返回读到的样本数 (采集线程调用，也可以在不启动线程时手动调用)"""
+        try:
+            red, ir, overflow, transactions = read_fifo_burst(self.sensor.bus, self.sensor.I2C_ADDR, self.max_block)
+        except (OSError, IOError) as e:
+            with self._lock:
+                self.errors += 1
+            print(f"MAX30102 读取 FIFO 失败: {e}")
+            return 0
+        now = time.monotonic()
+        n = len(red)
+        with self._lock:
+            self.bursts += 1
+            self.transactions += transactions
+            self.overflows += overflow
+            if n:
+                # 最后一个样本按读取时刻，之前的按采样间隔倒推
+                idx = (self._count + np.arange(n)) % self.capacity
+                self._buffer[idx, 0] = now - (n - 1 - np.arange(n)) / self.fs
+                self._buffer[idx, 1] = red
+                self._buffer[idx, 2] = ir
+                self._count += n
+                self._new_sample.notify_all()
+        if self.monitor is not None:
+            if overflow:
+                self.monitor.reset() # 丢失了样本，窗口不再连续
+            if n:
+                self.monitor.push(red, ir)
+        return n
+
+    def window(self, n=None):
+        """按时间顺序返回最近 n 个样本 (默认整个缓冲区)，结构化为 {列名: 数组}"""
+        with self._lock:
+            size = min(self._count, self.capacity)
+            n = size if n is None else min(n, size)
+            end = self._count % self.capacity
+            idx = np.arange(end - n, end) % self.capacity
+            rows = self._buffer[idx].copy()
+        return {name: rows[:, i] for i, name in enumerate(_COLUMNS)}
+
+    def wait_samples(self, n, timeout=5.0):
+        """等待 n 个新样本到达，超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._new_sample:
+            target = self._count + n
+            while self._count < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._new_sample.wait(remaining)
+            return True
+
+    def close(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            return {
+                "samples": self._count,
+                "rate": round(self._count / elapsed, 1) if elapsed > 0 else 0.0,
+                "bursts": self.bursts,
+                "samples_per_burst": round(self._count / self.bursts, 1) if self.bursts else None,
+                "transactions_per_sample": round(self.transactions / self._count, 3) if self._count else None,
+                "overflows": self.overflows,
+                "errors": self.errors,
+            }
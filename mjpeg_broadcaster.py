@@ -0,0 +1,160 @@
+# mjpeg_broadcaster.py
+"""
+MJPEG 广播器：每帧按码流配置 (分辨率 / 质量 / 帧率) 只编码一次，所有订阅该配置的客户端共享结果。
+新帧到达时通过条件变量唤醒订阅者，客户端不再各自轮询，也不会重复收到同一帧。
+没有订阅者的配置不做任何编码，CPU 开销只与活跃的配置数量有关，与客户端数量无关。
+"""
+import threading
+import time
+
+import cv2
+
+from jpeg_encoder import EncodeHistogram, create_encoder, timed_encode
+
+
+class StreamProfile:
+    """
+    码流配置：width/height 为 None 表示保持原始分辨率，fps 为 None 表示不限制编码帧率
+    subsampling / encoder 见 jpeg_encoder
+    """
+
+    def __init__(self, name, width=None, height=None, quality=80, fps=None, subsampling="420", encoder="auto"):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.fps = fps
+        self.subsampling = subsampling
+        self.encoder = encoder
+
+
+class _ProfileChannel:
+    """单个码流配置的共享状态：最新 JPEG、帧编号和订阅者计数"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.cond = threading.Condition()
+        self.frame_id = 0
+        self.jpeg = None
+        self.subscribers = 0
+        self.last_encode = 0.0
+        self.encoder = create_encoder(profile.encoder, profile.quality, profile.subsampling)
+        self.histogram = EncodeHistogram()
+        self._resized = None
+
+    def due(self, now):
+        if self.subscribers == 0:
+            return False
+        fps = self.profile.fps
+        return not fps or now - self.last_encode >= 1.0 / fps
+
+    def encode(self, frame_bgr, now):
+        # 缩放和编码都在锁外进行，订阅者只在替换 jpeg 引用时短暂持锁
+        profile = self.profile
+        image = frame_bgr
+        if profile.width and profile.height:
+            self._resized = cv2.resize(frame_bgr, (profile.width, profile.height), dst=self._resized,
+                                       interpolation=cv2.INTER_AREA)
+            image = self._resized
+        jpeg = timed_encode(self.encoder, image, self.histogram)
+        with self.cond:
+            self.jpeg = jpeg
+            self.frame_id += 1
+            self.last_encode = now
+            self.cond.notify_all()
+
+
+class MJPEGBroadcaster:
+
+    def __init__(self, profiles, default_profile=None):
+        self._channels = {p.name: _ProfileChannel(p) for p in profiles}
+        self.default_profile = default_profile or profiles[0].name
+        self._lock = threading.Lock()
+        self._closed = False
+        self.skipped_frames = 0
+
+    def profile_names(self):
+        return list(self._channels)
+
+    # --- 生产方 (采集线程) ---
+    def due_profiles(self, now=None):
+        """返回本帧需要编码的配置；为空时调用方可以跳过颜色转换和绘制"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [ch for ch in self._channels.values() if ch.due(now)]
+            if not due:
+                self.skipped_frames += 1
+            return due
+
+    def publish(self, frame_bgr, channels, now=None):
+        """把一帧 BGR 画面编码到各个到期的配置并唤醒对应订阅者"""
+        now = time.monotonic() if now is None else now
+        for channel in channels:
+            try:
+                channel.encode(frame_bgr, now)
+            except RuntimeError as e:
+                print(f"视频流 {channel.profile.name} 编码失败: {e}")
+
+    # --- 订阅方 (/video_feed 请求) ---
+    def stream(self, profile_name=None, fps=None, timeout=5.0):
+        """
+        生成某个码流配置的 JPEG 帧序列（生成器）
+        fps 为客户端自己的限速，低于配置帧率时在服务端丢帧
+        """
+        channel = self._channels[profile_name or self.default_profile]
+        with self._lock:
+            channel.subscribers += 1
+        try:
+            with channel.cond:
+                # 已有其他订阅者时立即发送当前帧，否则等待下一次编码
+                last_id = channel.frame_id - 1 if channel.jpeg is not None else channel.frame_id
+            min_interval = 1.0 / fps if fps else 0.0
+            next_time = 0.0
+            while not self._closed:
+                with channel.cond:
+                    if channel.frame_id == last_id:
+                        channel.cond.wait(timeout)
+                    if channel.frame_id == last_id or self._closed:
+                        continue
+                    last_id = channel.frame_id
+                    jpeg = channel.jpeg
+                yield jpeg
+                if min_interval:
+                    now = time.monotonic()
+                    next_time = max(next_time + min_interval, now)
+                    if next_time > now:
+                        time.sleep(next_time - now)
+        finally:
+            with self._lock:
+                channel.subscribers -= 1
+                if channel.subscribers == 0:
+                    with channel.cond:
+                        channel.jpeg = None # 避免下一个客户端先看到过期画面
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(ch.subscribers for ch in self._channels.values())
+
+    def close(self):
+        self._closed = True
+        for channel in self._channels.values():
+            with channel.cond:
+                channel.cond.notify_all()
+
+    def stats(self):
+        with self._lock:
+            profiles = {}
+            for name, ch in self._channels.items():
+                profiles[name] = {
+                    "subscribers": ch.subscribers,
+                    "encoder": ch.encoder.name,
+                    "quality": ch.encoder.quality,
+                    "subsampling": ch.encoder.subsampling,
+                    "encoded": ch.histogram.frames,
+                    "encode": ch.histogram.stats(),
+                }
+            return {
+                "clients": sum(ch.subscribers for ch in self._channels.values()),
+                "skipped_frames": self.skipped_frames,
+                "profiles": profiles,
+            }
@@ -1,11 +1,129 @@
 import sqlite3
 import hashlib
 import os
-from datetime import datetime, time
+import bisect
+import collections
+import queue
+import threading
+from datetime import datetime, time, timedelta, timezone
+
+from write_queue import WriteQueue
+
+# --- 数据库连接池 ---
+DB_PATH = os.environ.get("CATFEEDER_DB", "catfeeder.db") # 数据库文件路径，可通过环境变量指定
+POOL_SIZE = int(os.environ.get("CATFEEDER_DB_POOL", "8")) # 最多同时打开的连接数
+
+class ConnectionPool:
+    """
+    SQLite 连接池：连接在线程之间复用 (同一时刻只被一个线程使用)，
+    每个连接打开时设置 WAL 日志和相关 pragma，并保留 sqlite3 的预编译语句缓存。
+    WAL 模式下读写互不阻塞，Flask 多线程并发时不再频繁出现 "database is locked"。
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=10.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue() # 后进先出，优先复用热连接
+        self._lock = threading.Lock()
+        self._created = 0
+        self.waits = 0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL") # 写入追加到 -wal 文件，读者不被阻塞
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL 下只在检查点时 fsync，断电最多丢失最近的事务
+        conn.execute("PRAGMA cache_size=-8000") # 每个连接约 8MB 页缓存
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+            self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("数据库连接池已耗尽")
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback() # 调用方忘记提交的事务不能泄漏给下一个使用者
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "size": self.size, "open": self._created,
+                    "idle": self._idle.qsize(), "waits": self.waits}
+
+
+class _PooledConnection:
+    """连接池中的连接：close() 把连接还给连接池，之后的调用不会再触碰该连接"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = pool.acquire()
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def execute(self, *args):
+        return self._conn.execute(*args)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+_pool = ConnectionPool(DB_PATH)
+
+def configure(db_path=None, pool_size=None):
+    """切换数据库文件或连接池大小 (测试和基准使用)，会关闭现有的空闲连接"""
+    global DB_PATH, _pool
+    _pool.close_all()
+    DB_PATH = db_path or DB_PATH
+    _pool = ConnectionPool(DB_PATH, size=pool_size or POOL_SIZE)
+    schedule_cache.invalidate()
+    settings_cache.invalidate()
+
+def _connect():
+    """从连接池取出一个连接，用法与 sqlite3.connect() 相同，close() 时归还"""
+    return _PooledConnection(_pool)
+
+def pool_stats():
+    return _pool.stats()
 
 # 数据库初始化
-def init_db():
-    conn = sqlite3.connect('catfeeder.db')
+def init_db(migrate_schema=True):
+    """建表并执行迁移；migrate_schema=False 时只建表 (得到未迁移的旧表结构，供基准测试使用)"""
+    conn = _connect()
     cursor = conn.cursor()
     
     # 创建用户表
@@ -53,7 +171,120 @@ def init_db():
     ''')
     
     conn.commit()
-    conn.close()
+    try:
+        if migrate_schema:
+            migrate(conn)
+    finally:
+        conn.close()
+
+# 数据库迁移
+# 每项为 (版本号, 说明, SQL 语句列表)，按版本号顺序执行，当前版本记录在 PRAGMA user_version 中。
+# 已发布的迁移不要修改，需要调整时追加新版本。
+MIGRATIONS = [
+    (1, "喂食记录、喂食计划索引", [
+        # get_feeding_logs: WHERE user_id = ? ORDER BY timestamp DESC
+        "CREATE INDEX IF NOT EXISTS idx_feeding_logs_user_time ON feeding_logs (user_id, timestamp)",
+        # should_feed_now / 按时间排序读取计划
+        "CREATE INDEX IF NOT EXISTS idx_feeding_schedules_time ON feeding_schedules (time)",
+    ]),
+    (2, "用户设置 (user_id, setting_key) 唯一约束", [
+        # 旧版本可能留下重复的设置行，保留最新写入的一行
+        """DELETE FROM system_settings WHERE id NOT IN (
+            SELECT MAX(id) FROM system_settings GROUP BY user_id, setting_key
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_system_settings_user_key ON system_settings (user_id, setting_key)",
+    ]),
+    (3, "传感器历史数据与汇总表", [
+        # 原始采样 (秒级时间戳)，只保留最近几天，见 sensor_history.SensorHistory
+        """CREATE TABLE IF NOT EXISTS sensor_samples (
+            ts REAL PRIMARY KEY,
+            temperature REAL,
+            humidity REAL,
+            weight REAL
+        )""",
+        # 按 resolution 秒对齐的 min/max/sum/count 汇总，平均值 = sum / count
+        """CREATE TABLE IF NOT EXISTS sensor_rollups (
+            resolution INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            sum REAL NOT NULL,
+            PRIMARY KEY (resolution, field, bucket)
+        ) WITHOUT ROWID""",
+    ]),
+    (4, "每日喂食汇总表", [
+        # day 为本地日期 YYYY-MM-DD，由 log_feeding 增量更新
+        """CREATE TABLE IF NOT EXISTS feeding_daily_stats (
+            day TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            feeds INTEGER NOT NULL,
+            grams REAL NOT NULL,
+            PRIMARY KEY (day, mode)
+        ) WITHOUT ROWID""",
+        # 用已有的喂食记录填充
+        """INSERT OR REPLACE INTO feeding_daily_stats (day, mode, feeds, grams)
+           SELECT date(timestamp, 'localtime'), mode, COUNT(*), SUM(amount) FROM feeding_logs GROUP BY 1, 2""",
+    ]),
+    (5, "喂食记录增加实测出粮量", [
+        # 闭环称重喂食的测量结果 (feed_controller.FeedResult)，计时喂食时为 NULL
+        "ALTER TABLE feeding_logs ADD COLUMN dispensed REAL",  # 实测出粮量 (克)，amount 为目标量
+        "ALTER TABLE feeding_logs ADD COLUMN overshoot REAL",  # 喂食口关闭后多落下的重量 (克)
+        "ALTER TABLE feeding_logs ADD COLUMN flow_rate REAL",  # 关闭时的流量 (克/秒)
+    ]),
+    (6, "出粮流量标定记录", [
+        # kind = 'feed': 一次实测喂食 (打开时间, 出粮量, 喂食前的料仓余量)
+        # kind = 'level': 加粮或重置时记录的料仓余量；见 feed_calibration.FeedCalibration
+        """CREATE TABLE IF NOT EXISTS feed_calibration (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            kind TEXT NOT NULL,
+            open_time REAL,
+            delta REAL,
+            hopper_level REAL NOT NULL
+        )""",
+    ]),
+    (7, "喂食计划记录创建者", [
+        # 定时喂食按计划的创建者记录；旧计划为 NULL，对应的喂食记录所有用户都能看到
+        "ALTER TABLE feeding_schedules ADD COLUMN user_id INTEGER",
+    ]),
+    (8, "传感器日汇总按本地日期重建", [
+        # 日汇总原先按 UTC 零点划分；用永久保留的小时汇总按本地日期重新合并，bucket 为本地零点的时间戳
+        # (小时汇总按 UTC 整点对齐，UTC 偏移不是整小时的时区里跨零点的那一小时会整体归到一天)
+        "DELETE FROM sensor_rollups WHERE resolution = 86400",
+        """INSERT INTO sensor_rollups (resolution, field, bucket, count, min, max, sum)
+           SELECT 86400, field, CAST(strftime('%s', date(bucket, 'unixepoch', 'localtime'), 'utc') AS INTEGER),
+                  SUM(count), MIN(min), MAX(max), SUM(sum)
+           FROM sensor_rollups WHERE resolution = 3600 GROUP BY 2, 3""",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn):
+    """把数据库升级到最新版本，每个版本在单独的事务中执行，返回升级后的版本号"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        # BEGIN IMMEDIATE 先拿到写锁再确认版本，多个进程同时启动时只有一个会执行迁移
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if target <= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+        print(f"数据库已迁移到版本 {target}: {description}")
+    return version
 
 # 用户相关功能
 def generate_salt():
@@ -66,7 +297,7 @@ def hash_password(password, salt):
 
 def register_user(username, password):
     """注册新用户"""
-    conn = sqlite3.connect('catfeeder.db')
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
@@ -113,7 +344,7 @@ def register_user(username, password):
 
 def authenticate_user(username, password):
     """验证用户登录"""
-    conn = sqlite3.connect('catfeeder.db')
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
@@ -140,20 +371,126 @@ def authenticate_user(username, password):
         conn.close()
         return False, f"登录失败: {str(e)}"
 
+# 喂食计划缓存
+def _schedule_dict(entry):
+    feed_time, schedule_id, amount, user_id = entry
+    return {"id": schedule_id, "time": feed_time, "amount": amount, "user_id": user_id}
+
+class ScheduleCache:
+    """
+    喂食计划的内存索引：首次使用时从数据库加载一次，按时间排序保存
+    增删改计划后就地更新并通知监听者，查询“当前/下一个到期计划”为 O(log n) 的二分查找，不再访问数据库
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries = [] # (time, id, amount, user_id)，按时间排序
+        self._by_id = {}
+        self._listeners = []
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            rows = _query_feeding_schedules()
+            if rows is None:
+                return # 数据库暂时不可用，下次再试
+            self._entries = sorted((r["time"], r["id"], r["amount"], r["user_id"]) for r in rows)
+            self._by_id = {entry[1]: entry for entry in self._entries}
+            self._loaded = True
+
+    def invalidate(self):
+        """丢弃缓存，下次查询时重新从数据库加载 (例如外部修改了数据库文件)"""
+        with self._lock:
+            self._loaded = False
+        self._notify()
+
+    def add_listener(self, callback):
+        """注册计划变化回调 callback(schedules)"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        if not self._listeners:
+            return
+        schedules = self.all()
+        for callback in self._listeners:
+            try:
+                callback(schedules)
+            except Exception as e:
+                print(f"喂食计划监听者出错: {e}")
+
+    def all(self):
+        """所有计划 (按时间排序的字典列表副本)"""
+        with self._lock:
+            self._ensure_loaded()
+            return [_schedule_dict(entry) for entry in self._entries]
+
+    def due_at(self, hhmm):
+        """返回时间恰好为 hhmm 的第一个计划，没有则返回 None"""
+        with self._lock:
+            self._ensure_loaded()
+            index = bisect.bisect_left(self._entries, (hhmm,))
+            if index < len(self._entries) and self._entries[index][0] == hhmm:
+                return _schedule_dict(self._entries[index])
+            return None
+
+    def next_due(self, hhmm):
+        """返回时间不早于 hhmm 的下一个计划 (当天没有则回绕到第二天最早的计划)，没有计划时返回 None"""
+        with self._lock:
+            self._ensure_loaded()
+            if not self._entries:
+                return None
+            index = bisect.bisect_left(self._entries, (hhmm,))
+            return _schedule_dict(self._entries[index % len(self._entries)])
+
+    # --- 写入数据库成功后就地更新 ---
+    def _put(self, schedule_id, feed_time, amount, user_id=None):
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._by_id.pop(schedule_id, None)
+            if old is not None:
+                self._entries.remove(old)
+                feed_time = old[0] if feed_time is None else feed_time
+                amount = old[2] if amount is None else amount
+                user_id = old[3]
+            elif feed_time is None or amount is None:
+                self._loaded = False # 缓存与数据库不一致，下次查询重新加载
+                return
+            entry = (feed_time, schedule_id, amount, user_id)
+            bisect.insort(self._entries, entry)
+            self._by_id[schedule_id] = entry
+
+    def _remove(self, schedule_id):
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._by_id.pop(schedule_id, None)
+            if old is not None:
+                self._entries.remove(old)
+
+
+schedule_cache = ScheduleCache()
+
+def add_schedule_listener(callback):
+    """喂食计划增删改后回调 callback(schedules)"""
+    schedule_cache.add_listener(callback)
+
 # 喂食计划相关功能
-def add_feeding_schedule(feed_time, amount):
-    """添加喂食计划"""
-    conn = sqlite3.connect('catfeeder.db')
+def add_feeding_schedule(feed_time, amount, user_id=None):
+    """添加喂食计划，user_id 为创建者 (定时喂食的记录归到该用户名下)"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
         cursor.execute(
-            "INSERT INTO feeding_schedules (time, amount) VALUES (?, ?)",
-            (feed_time, amount)
+            "INSERT INTO feeding_schedules (time, amount, user_id) VALUES (?, ?, ?)",
+            (feed_time, amount, user_id)
         )
         conn.commit()
         schedule_id = cursor.lastrowid
         conn.close()
+        schedule_cache._put(schedule_id, feed_time, amount, user_id)
+        schedule_cache._notify()
         return True, schedule_id
     
     except Exception as e:
@@ -162,21 +499,26 @@ def add_feeding_schedule(feed_time, amount):
         return False, f"添加喂食计划失败: {str(e)}"
 
 def get_feeding_schedules():
-    """获取所有喂食计划"""
-    conn = sqlite3.connect('catfeeder.db')
+    """获取所有喂食计划 (来自内存缓存)"""
+    return schedule_cache.all()
+
+def _query_feeding_schedules():
+    """从数据库读取所有喂食计划，失败时返回 None"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
         cursor.execute(
-            "SELECT id, time, amount FROM feeding_schedules ORDER BY time"
+            "SELECT id, time, amount, user_id FROM feeding_schedules ORDER BY time"
         )
         schedules = []
         for row in cursor.fetchall():
-            schedule_id, feed_time, amount = row
+            schedule_id, feed_time, amount, user_id = row
             schedules.append({
                 "id": schedule_id,
                 "time": feed_time,
-                "amount": amount
+                "amount": amount,
+                "user_id": user_id
             })
         
         conn.close()
@@ -184,11 +526,11 @@ def get_feeding_schedules():
     
     except Exception as e:
         conn.close()
-        return []
+        return None
 
 def update_feeding_schedule(schedule_id, feed_time=None, amount=None):
     """更新喂食计划"""
-    conn = sqlite3.connect('catfeeder.db')
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
@@ -213,6 +555,9 @@ def update_feeding_schedule(schedule_id, feed_time=None, amount=None):
         cursor.execute(query, params)
         conn.commit()
         conn.close()
+        if cursor.rowcount:
+            schedule_cache._put(schedule_id, feed_time, amount)
+            schedule_cache._notify()
         return True
     
     except Exception as e:
@@ -222,13 +567,15 @@ def update_feeding_schedule(schedule_id, feed_time=None, amount=None):
 
 def delete_feeding_schedule(schedule_id):
     """删除喂食计划"""
-    conn = sqlite3.connect('catfeeder.db')
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
         cursor.execute("DELETE FROM feeding_schedules WHERE id = ?", (schedule_id,))
         conn.commit()
         conn.close()
+        schedule_cache._remove(schedule_id)
+        schedule_cache._notify()
         return True
     
     except Exception as e:
@@ -236,54 +583,124 @@ def delete_feeding_schedule(schedule_id):
         conn.close()
         return False
 
+# 系统设置缓存
+class SettingsCache:
+    """
+    按用户缓存设置的 LRU：未命中时一次查询加载该用户的全部设置，写入时同步更新 (write-through)
+    最多缓存 max_users 个用户，超出时淘汰最久未使用的用户
+    """
+
+    def __init__(self, max_users=64):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users = collections.OrderedDict() # user_id -> {key: value}
+        self._writes = 0 # 写入计数，加载期间发生写入时不缓存可能过期的结果
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, user_id):
+        """返回该用户的设置字典 (只读)，数据库出错时返回 None"""
+        with self._lock:
+            settings = self._users.get(user_id)
+            if settings is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return settings
+            self.misses += 1
+            writes = self._writes
+        settings = _query_user_settings(user_id)
+        if settings is None:
+            return None
+        with self._lock:
+            if writes != self._writes:
+                return settings
+            self._users[user_id] = settings
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return settings
+
+    def store(self, user_id, updates):
+        """写入数据库成功后更新缓存；未缓存的用户不加载，下次读取时再整体加载"""
+        with self._lock:
+            self._writes += 1
+            settings = self._users.get(user_id)
+            if settings is not None:
+                # 替换而不是原地修改，正在读取旧字典的线程不受影响
+                self._users[user_id] = dict(settings, **updates)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._writes += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+settings_cache = SettingsCache()
+
+def settings_cache_stats():
+    return settings_cache.stats()
+
 # 系统设置相关功能
-def get_user_setting(user_id, key, default=None):
-    """获取用户设置"""
-    conn = sqlite3.connect('catfeeder.db')
+_USER_SETTINGS_QUERY = "SELECT setting_key, setting_value FROM system_settings WHERE user_id = ? ORDER BY id"
+
+def _query_user_settings(user_id):
+    """一次读取用户的全部设置，失败时返回 None"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
-        cursor.execute(
-            "SELECT setting_value FROM system_settings WHERE user_id = ? AND setting_key = ?",
-            (user_id, key)
-        )
-        result = cursor.fetchone()
+        cursor.execute(_USER_SETTINGS_QUERY, (user_id,))
+        settings = dict(cursor.fetchall())
         conn.close()
-        
-        if result:
-            return result[0]
-        return default
+        return settings
     
     except Exception:
         conn.close()
+        return None
+
+def get_user_setting(user_id, key, default=None):
+    """获取用户设置 (经过缓存)"""
+    settings = settings_cache.lookup(user_id)
+    if settings is None:
         return default
+    return settings.get(key, default)
 
 def set_user_setting(user_id, key, value):
     """设置或更新用户设置"""
-    conn = sqlite3.connect('catfeeder.db')
+    return set_user_settings(user_id, {key: value})
+
+def set_user_settings(user_id, updates):
+    """在一个事务中设置或更新多个用户设置，成功后同步更新缓存"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
-        # 检查设置是否已存在
-        cursor.execute(
-            "SELECT id FROM system_settings WHERE user_id = ? AND setting_key = ?",
-            (user_id, key)
+        cursor.executemany(
+            """INSERT INTO system_settings (user_id, setting_key, setting_value) VALUES (?, ?, ?)
+               ON CONFLICT (user_id, setting_key)
+               DO UPDATE SET setting_value = excluded.setting_value, updated_at = CURRENT_TIMESTAMP""",
+            [(user_id, key, value) for key, value in updates.items()]
         )
-        if cursor.fetchone():
-            # 更新现有设置
-            cursor.execute(
-                "UPDATE system_settings SET setting_value = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND setting_key = ?",
-                (value, user_id, key)
-            )
-        else:
-            # 创建新设置
-            cursor.execute(
-                "INSERT INTO system_settings (user_id, setting_key, setting_value) VALUES (?, ?, ?)",
-                (user_id, key, value)
-            )
         
         conn.commit()
         conn.close()
+        settings_cache.store(user_id, updates)
         return True
     
     except Exception as e:
@@ -292,16 +709,54 @@ def set_user_setting(user_id, key, value):
         return False
 
 # 喂食记录相关功能
-def log_feeding(user_id, amount, mode='manual'):
-    """记录喂食事件"""
-    conn = sqlite3.connect('catfeeder.db')
+# 后台批量写入队列，start_write_queue() 之后 log_feeding 不再等待提交
+_write_queue = None
+
+def start_write_queue(**kwargs):
+    """启动后台批量写入线程，参数见 write_queue.WriteQueue"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue(_connect, **kwargs).start()
+    return _write_queue
+
+def stop_write_queue():
+    """写完队列中剩余的记录并停止后台线程 (程序退出前调用)"""
+    global _write_queue
+    if _write_queue is not None:
+        queue, _write_queue = _write_queue, None
+        queue.close()
+
+def write_queue_stats():
+    return _write_queue.stats() if _write_queue is not None else None
+
+_UPSERT_DAILY_STATS = """
+INSERT INTO feeding_daily_stats (day, mode, feeds, grams) VALUES (?, ?, 1, ?)
+ON CONFLICT (day, mode) DO UPDATE SET feeds = feeds + 1, grams = grams + excluded.grams
+"""
+
+def log_feeding(user_id, amount, mode='manual', dispensed=None, overshoot=None, flow_rate=None):
+    """
+    记录喂食事件并更新每日汇总 (启动写入队列后为异步写入，返回 True 表示已接受)
+    amount 为目标量；闭环称重喂食时 dispensed / overshoot / flow_rate 为实测值，每日汇总按实测出粮量累计
+    """
+    now = datetime.now(timezone.utc)
+    # 时间戳在调用时生成 (与 CURRENT_TIMESTAMP 一样为 UTC)，不受排队延迟影响；汇总按本地日期
+    statements = [
+        ("INSERT INTO feeding_logs (user_id, amount, mode, timestamp, dispensed, overshoot, flow_rate) "
+         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+         (user_id, amount, mode, now.strftime("%Y-%m-%d %H:%M:%S"), dispensed, overshoot, flow_rate)),
+        (_UPSERT_DAILY_STATS, (now.astimezone().strftime("%Y-%m-%d"), mode,
+                               amount if dispensed is None else dispensed)),
+    ]
+    if _write_queue is not None:
+        return _write_queue.put_many(statements)
+
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
-        cursor.execute(
-            "INSERT INTO feeding_logs (user_id, amount, mode) VALUES (?, ?, ?)",
-            (user_id, amount, mode)
-        )
+        for statement, params in statements:
+            cursor.execute(statement, params)
         conn.commit()
         conn.close()
         return True
@@ -311,24 +766,34 @@ def log_feeding(user_id, amount, mode='manual'):
         conn.close()
         return False
 
+# 用户自己的记录加上没有归属用户的记录 (没有创建者的定时喂食)；
+# 两部分分别由 idx_feeding_logs_user_time (user_id, timestamp) 倒序扫描取前 limit 条，只对最多 2 * limit 条排序
+_FEEDING_LOGS_QUERY = """
+SELECT id, amount, mode, timestamp, dispensed FROM (
+    SELECT * FROM (SELECT id, amount, mode, timestamp, dispensed FROM feeding_logs
+                   WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?)
+    UNION ALL
+    SELECT * FROM (SELECT id, amount, mode, timestamp, dispensed FROM feeding_logs
+                   WHERE user_id IS NULL ORDER BY timestamp DESC LIMIT ?)
+) ORDER BY timestamp DESC LIMIT ?
+"""
+
 def get_feeding_logs(user_id, limit=10):
-    """获取用户的喂食记录"""
-    conn = sqlite3.connect('catfeeder.db')
+    """获取用户的喂食记录 (包括没有归属用户的定时喂食记录)"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
-        cursor.execute(
-            "SELECT id, amount, mode, timestamp FROM feeding_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-            (user_id, limit)
-        )
+        cursor.execute(_FEEDING_LOGS_QUERY, (user_id, limit, limit, limit))
         logs = []
         for row in cursor.fetchall():
-            log_id, amount, mode, timestamp = row
+            log_id, amount, mode, timestamp, dispensed = row
             logs.append({
                 "id": log_id,
                 "amount": amount,
                 "mode": mode,
-                "timestamp": timestamp
+                "timestamp": timestamp,
+                "dispensed": dispensed
             })
         
         conn.close()
@@ -338,34 +803,181 @@ def get_feeding_logs(user_id, limit=10):
         conn.close()
         return []
 
-# 检查是否应该进行喂食
-def should_feed_now():
-    """根据当前时间检查是否应该进行喂食"""
-    conn = sqlite3.connect('catfeeder.db')
+def get_feed_overshoots(limit=20):
+    """最近 limit 次闭环喂食的 (过冲克数, 关闭时流量)，按时间先后排列，用于恢复过冲补偿"""
+    conn = _connect()
     cursor = conn.cursor()
     
     try:
-        # 获取当前时间
-        current_time = datetime.now().time()
-        current_time_str = current_time.strftime("%H:%M")
-        
-        # 查找当前时间匹配的喂食计划
         cursor.execute(
-            "SELECT id, amount FROM feeding_schedules WHERE time = ?",
-            (current_time_str,)
+            "SELECT overshoot, flow_rate FROM feeding_logs WHERE overshoot IS NOT NULL "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (limit,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return rows[::-1]
+    
+    except Exception:
+        conn.close()
+        return []
+
+# 出粮流量标定
+def log_feed_calibration(kind, hopper_level, open_time=None, delta=None):
+    """记录一次实测喂食 ('feed') 或料仓余量 ('level') (启动写入队列后为异步写入)"""
+    statement = ("INSERT INTO feed_calibration (ts, kind, open_time, delta, hopper_level) VALUES (?, ?, ?, ?, ?)",
+                 (datetime.now(timezone.utc).timestamp(), kind, open_time, delta, hopper_level))
+    if _write_queue is not None:
+        return _write_queue.put_many([statement])
+
+    conn = _connect()
+    try:
+        conn.execute(*statement)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def get_feed_calibration(limit=500):
+    """最近 limit 条标定记录 [(kind, open_time, delta, hopper_level), ...]，按时间先后排列"""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT kind, open_time, delta, hopper_level FROM feed_calibration ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return rows[::-1]
+    except Exception:
+        return []
+    finally:
+        conn.close()
+
+def clear_feed_calibration(hopper_level):
+    """删除全部标定记录，只保留当前料仓余量，返回删除的行数"""
+    if _write_queue is not None:
+        _write_queue.flush(timeout=5)
+    conn = _connect()
+    try:
+        count = conn.execute("DELETE FROM feed_calibration").rowcount
+        conn.execute(
+            "INSERT INTO feed_calibration (ts, kind, hopper_level) VALUES (?, 'level', ?)",
+            (datetime.now(timezone.utc).timestamp(), hopper_level)
         )
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# 检查是否应该进行喂食
+def should_feed_now():
+    """根据当前时间检查是否应该进行喂食 (查询内存缓存)"""
+    current_time_str = datetime.now().strftime("%H:%M")
+    schedule = schedule_cache.due_at(current_time_str)
+    if schedule:
+        return True, schedule["amount"]  # 返回应该喂食和喂食量
+    return False, 0
+
+def next_due_schedule(now=None):
+    """返回当前时间之后 (含当前分钟) 的下一个喂食计划，没有计划时返回 None"""
+    now = now or datetime.now()
+    return schedule_cache.next_due(now.strftime("%H:%M"))
+
+_SCHEDULE_AT_QUERY = "SELECT id, amount FROM feeding_schedules WHERE time = ?"
+
+def _should_feed_now_uncached():
+    """旧的逐次查询数据库实现，仅供基准测试对比"""
+    conn = _connect()
+    cursor = conn.cursor()
+    
+    try:
+        current_time_str = datetime.now().strftime("%H:%M")
+        cursor.execute(_SCHEDULE_AT_QUERY, (current_time_str,))
         schedule = cursor.fetchone()
         
         conn.close()
         
         if schedule:
-            return True, schedule[1]  # 返回应该喂食和喂食量
+            return True, schedule[1]
         return False, 0
     
     except Exception:
         conn.close()
         return False, 0
 
+# 喂食统计
+def get_feeding_stats(days=90, group='day'):
+    """
+    最近 days 天的喂食量统计 (读取每日汇总表，耗时只与天数有关，与喂食记录总数无关)
+    group: 'day' 按天, 'week' 按 ISO 周 (以周一日期表示)
+    返回:
+        {"days", "group", "series": [{"period", "modes": {mode: {"feeds", "grams"}}, "feeds", "grams"}], "totals"}
+    """
+    since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+    conn = _connect()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "SELECT day, mode, feeds, grams FROM feeding_daily_stats WHERE day >= ? ORDER BY day",
+            (since,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+    
+    except Exception:
+        conn.close()
+        return None
+    
+    periods = {}
+    totals = {}
+    for day, mode, feeds, grams in rows:
+        if group == 'week':
+            date = datetime.strptime(day, "%Y-%m-%d").date()
+            day = (date - timedelta(days=date.weekday())).isoformat()
+        period = periods.setdefault(day, {"period": day, "modes": {}, "feeds": 0, "grams": 0.0})
+        by_mode = period["modes"].setdefault(mode, {"feeds": 0, "grams": 0.0})
+        by_mode["feeds"] += feeds
+        by_mode["grams"] += grams
+        period["feeds"] += feeds
+        period["grams"] += grams
+        total = totals.setdefault(mode, {"feeds": 0, "grams": 0.0})
+        total["feeds"] += feeds
+        total["grams"] += grams
+    return {"days": days, "group": group, "series": list(periods.values()), "totals": totals}
+
+def backfill_feeding_stats():
+    """根据 feeding_logs 重新生成每日汇总表，返回汇总行数"""
+    conn = _connect()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("DELETE FROM feeding_daily_stats")
+        cursor.execute(
+            """INSERT INTO feeding_daily_stats (day, mode, feeds, grams)
+               SELECT date(timestamp, 'localtime'), mode, COUNT(*), SUM(COALESCE(dispensed, amount))
+               FROM feeding_logs GROUP BY 1, 2"""
+        )
+        conn.commit()
+        count = cursor.execute("SELECT COUNT(*) FROM feeding_daily_stats").fetchone()[0]
+        conn.close()
+        return count
+    
+    except Exception:
+        conn.rollback()
+        conn.close()
+        raise
+
 # 初始化
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    # python models.py                      初始化 / 迁移数据库
+    # python models.py backfill-feeding-stats  根据喂食记录重建每日汇总
+    import sys
+    init_db()
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill-feeding-stats":
+        print(f"每日喂食汇总已重建，共 {backfill_feeding_stats()} 行")
@@ -0,0 +1,111 @@
+# motion_gate.py
+"""
+运动门控：在调用 YOLO 之前做一次廉价的预过滤
+把画面（或食盆所在的感兴趣区域）缩小并转为灰度，与滑动平均背景做差分，
+变化像素比例超过阈值时才交给模型推理，画面静止时沿用上一次的检测结果。
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+
+    def __init__(self, roi=None, size=(80, 60), pixel_delta=25, motion_threshold=0.01,
+                 learning_rate=0.05, max_skip_seconds=30.0):
+        """
+        参数:
+            roi: 感兴趣区域 (x1, y1, x2, y2)，None 表示整幅画面
+            size: 差分前缩放到的尺寸 (宽, 高)
+            pixel_delta: 灰度差超过该值的像素视为变化
+            motion_threshold: 变化像素比例超过该值时认为有运动
+            learning_rate: 背景滑动平均的更新速率
+            max_skip_seconds: 连续跳过的最长时间，超过后强制推理一次
+        """
+        self.roi = roi
+        self.size = tuple(size)
+        self.pixel_delta = pixel_delta
+        self.motion_threshold = motion_threshold
+        self.learning_rate = learning_rate
+        self.max_skip_seconds = max_skip_seconds
+
+        width, height = self.size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._gray_f = np.empty((height, width), dtype=np.float32)
+        self._diff = np.empty((height, width), dtype=np.float32)
+        self._background = None
+        self._last_pass = 0.0
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重置统计计数（例如每天零点重置一次）"""
+        with self._lock:
+            self.since = time.time()
+            self.skipped = 0
+            self.inferred = 0
+            self.last_motion_ratio = 0.0
+            self._infer_seconds = 0.0
+            self._infer_frames = 0
+
+    def _crop(self, frame):
+        if self.roi is None:
+            return frame
+        x1, y1, x2, y2 = self.roi
+        return frame[y1:y2, x1:x2]
+
+    def motion_ratio(self, frame_rgb):
+        """计算当前帧相对背景的变化像素比例，并更新背景"""
+        cv2.resize(self._crop(frame_rgb), self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        self._gray_f[...] = self._gray
+        if self._background is None:
+            self._background = self._gray_f.copy()
+            return 1.0
+        cv2.absdiff(self._gray_f, self._background, dst=self._diff)
+        changed = np.count_nonzero(self._diff > self.pixel_delta)
+        cv2.accumulateWeighted(self._gray_f, self._background, self.learning_rate)
+        return float(changed) / self._diff.size
+
+    def check(self, frame_rgb, now=None):
+        """返回 True 表示需要推理，False 表示画面无变化可以跳过"""
+        now = time.monotonic() if now is None else now
+        ratio = self.motion_ratio(frame_rgb)
+        should_infer = ratio >= self.motion_threshold or now - self._last_pass >= self.max_skip_seconds
+        with self._lock:
+            self.last_motion_ratio = ratio
+            if should_infer:
+                self.inferred += 1
+            else:
+                self.skipped += 1
+        if should_infer:
+            self._last_pass = now
+        return should_infer
+
+    def record_inference_time(self, seconds, frames=1):
+        """
+        记录推理耗时，用于估算跳过推理节省的 CPU 时间
+        连拍确认一次会推理多帧，frames 为这段耗时内推理的帧数，平均耗时按帧计算
+        """
+        with self._lock:
+            self._infer_seconds += seconds
+            self._infer_frames += frames
+
+    def stats(self):
+        with self._lock:
+            checked = self.skipped + self.inferred
+            avg_infer = self._infer_seconds / self._infer_frames if self._infer_frames else 0.0
+            return {
+                "since": self.since,
+                "checked": checked,
+                "skipped": self.skipped,
+                "inferred": self.inferred,
+                "skip_ratio": round(self.skipped / checked, 4) if checked else 0.0,
+                "last_motion_ratio": round(self.last_motion_ratio, 4),
+                "avg_inference_ms": round(avg_infer * 1000, 2),
+                "est_cpu_seconds_saved": round(self.skipped * avg_infer, 1),
+            }
@@ -0,0 +1,254 @@
+# ppg.py
+"""
+MAX30102 心率血氧计算 (hardware.MAX30102_Sensor 和 max30102.MAX30102 共用)
+对每个分析窗口:
+    1. 带通滤波 - 短滑动平均 (低通，去掉高频噪声) 减去长滑动平均 (去掉直流和呼吸、手指移动造成的基线漂移)
+    2. 找峰     - 在滤波后的红外信号上取一阶差分由正变负、且是前后 min_interval 内最大值的点，
+                  低于窗口幅度 peak_ratio 倍的峰 (重搏波、噪声) 不计
+    3. 心率     - 峰位置按抛物线插值到小数样本，60 x 采样率 / 峰间隔 (去掉偏离中位数的间隔后取平均)；
+                  偏离的间隔太多 (没放稳、噪声) 时视为无效
+    4. 血氧     - R = (红光交流 RMS / 红光直流) / (红外交流 RMS / 红外直流)，SpO2 = 110 - 25 x R
+计算全部按 (窗口数, 窗口长度) 的二维数组向量化完成：analyze_windows 一次算出一段数据中每隔 hop 个样本的所有窗口，
+PPGMonitor 接收连续的样本，每凑够 hop 个新样本就更新一次，而不是每批 100-500 个样本才算一次。
+"""
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SAMPLE_RATE = 100          # MAX30102 配置的采样率 (Hz)
+HR_RANGE = (40, 220)       # 有效心率范围 (bpm)
+SPO2_RANGE = (80.0, 100.0) # 有效血氧范围 (%)
+MIN_IR_DC = 20000          # 红外直流低于此值视为没有放手指
+
+
+def _moving_average(x, half):
+    """沿最后一维的居中滑动平均 (宽 2 x half + 1)，边缘只平均窗口内存在的样本"""
+    n = x.shape[-1]
+    width = 2 * half + 1
+    c = np.zeros(x.shape[:-1] + (n + 2 * half + 1,))
+    np.cumsum(x, axis=-1, out=c[..., half + 1:half + 1 + n])
+    c[..., half + 1 + n:] = c[..., half + n:half + n + 1] # 右侧补零后的累加和保持不变
+    idx = np.arange(n)
+    counts = np.minimum(idx + half + 1, n) - np.maximum(idx - half, 0)
+    return (c[..., width:] - c[..., :-width]) / counts
+
+
+def bandpass(x, fs=SAMPLE_RATE, low=0.5, high=4.0):
+    """沿最后一维带通滤波，通带约 low-high Hz (默认对应 30-240 bpm)"""
+    x = np.asarray(x, dtype=float)
+    x = x - x.mean(axis=-1, keepdims=True)
+    short = max(0, int(round(0.443 * fs / high)) // 2) # 滑动平均的 -3dB 频率约为 0.443 x fs / 宽度
+    long = max(short + 1, int(round(fs / low)) // 2)
+    return _moving_average(x, short) - _moving_average(x, long)
+
+
+def _running_max(y, radius):
+    """沿最后一维 [i - radius, i + radius] 内的最大值 (边缘截断)；按 2 的幂倍增，只需 log2(窗口) 次向量运算"""
+    n = y.shape[-1]
+    width = 2 * radius + 1
+    pad = np.full(y.shape[:-1] + (radius,), -np.inf)
+    z = np.concatenate([pad, y, pad], axis=-1)
+    span = 1
+    while span * 2 <= width:
+        z = np.maximum(z[..., :-span], z[..., span:]) # z[i] = max(原数组[i, i + 2 x span))
+        span *= 2
+    rest = width - span
+    return np.maximum(z[..., :n], z[..., rest:rest + n])
+
+
+def find_peaks(y, min_interval, peak_ratio=0.5, rms=None):
+    """沿最后一维找峰，返回与 y 同形状的布尔数组；低于 peak_ratio x 正弦幅度 (sqrt(2) x RMS) 的峰不计"""
+    if rms is None:
+        rms = np.sqrt((y ** 2).mean(axis=-1))
+    d = np.diff(y, axis=-1)
+    mask = np.zeros(y.shape, dtype=bool)
+    mask[..., 1:-1] = (d[..., :-1] > 0) & (d[..., 1:] <= 0)
+    mask &= y > (peak_ratio * np.sqrt(2.0) * rms)[..., None]
+    # 必须是前后 min_interval 个样本内的最大值，去掉同一次心跳上的多个峰
+    return mask & (y >= _running_max(y, min_interval - 1))
+
+
+def _peak_positions(y, mask):
+    """每行的峰位置 (抛物线插值到小数样本)，不足的位置填 nan，形状 (行数, 最多峰数)"""
+    rows, cols = np.nonzero(mask)
+    counts = mask.sum(axis=-1)
+    left, center, right = y[rows, cols - 1], y[rows, cols], y[rows, cols + 1]
+    curvature = left - 2 * center + right
+    offset = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0, curvature, -1.0), 0.0)
+    positions = np.full((mask.shape[0], max(int(counts.max(initial=0)), 2)), np.nan)
+    positions[rows, np.cumsum(mask, axis=-1)[rows, cols] - 1] = cols + offset
+    return positions, counts
+
+
+def _analyze(ir, red, fs, peak_ratio=0.5, min_regular=0.7, min_dc=MIN_IR_DC):
+    """ir / red: (窗口数, 窗口长度)，返回每个窗口的心率、血氧、R 值和是否有效"""
+    ir_ac = bandpass(ir, fs)
+    red_ac = bandpass(red, fs)
+    ir_dc = ir.mean(axis=-1)
+    red_dc = red.mean(axis=-1)
+    ir_rms = np.sqrt((ir_ac ** 2).mean(axis=-1))
+    red_rms = np.sqrt((red_ac ** 2).mean(axis=-1))
+
+    peaks = find_peaks(ir_ac, int(fs * 60 / HR_RANGE[1]), peak_ratio, ir_rms)
+    positions, counts = _peak_positions(ir_ac, peaks)
+    intervals = np.diff(positions, axis=-1)
+    enough = counts >= 2
+    interval = np.full(len(ir), np.nan)
+    regular = np.zeros(len(ir))
+    if enough.any():
+        # 漏掉或多出一个峰只影响个别间隔：取中位数 ±20% 内的间隔求平均，这类间隔的比例太低时视为无效
+        iv = intervals[enough]
+        median = np.nanmedian(iv, axis=-1, keepdims=True)
+        inlier = np.abs(iv - median) <= 0.2 * median
+        with np.errstate(divide="ignore", invalid="ignore"):
+            interval[enough] = np.where(inlier, iv, 0.0).sum(axis=-1) / inlier.sum(axis=-1)
+        regular[enough] = inlier.sum(axis=-1) / (counts[enough] - 1)
+    heart_rate = 60.0 * fs / interval
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (red_rms / red_dc) / (ir_rms / ir_dc)
+    spo2 = 110.0 - 25.0 * ratio
+
+    valid = (enough & (regular >= min_regular) & (ir_dc >= min_dc) & (red_dc > 0)
+             & (heart_rate >= HR_RANGE[0]) & (heart_rate <= HR_RANGE[1])
+             & (spo2 >= SPO2_RANGE[0]) & (spo2 <= SPO2_RANGE[1]))
+    return heart_rate, spo2, ratio, valid
+
+
+def analyze_windows(ir, red, window, hop, fs=SAMPLE_RATE, **params):
+    """
+    对 ir / red 中每隔 hop 个样本、长 window 的窗口计算心率血氧
+    返回 {"end": 窗口结束位置 (不含), "heart_rate", "spo2", "ratio", "valid"}，每项是长度为窗口数的数组
+    """
+    ir = np.asarray(ir, dtype=float)
+    red = np.asarray(red, dtype=float)
+    if len(ir) != len(red):
+        raise ValueError(f"红外和红光样本数不一致: {len(ir)} != {len(red)}")
+    if len(ir) < window:
+        empty = np.empty(0)
+        return {"end": np.empty(0, dtype=int), "heart_rate": empty, "spo2": empty, "ratio": empty,
+                "valid": np.empty(0, dtype=bool)}
+    ir_windows = sliding_window_view(ir, window)[::hop]
+    red_windows = sliding_window_view(red, window)[::hop]
+    heart_rate, spo2, ratio, valid = _analyze(ir_windows, red_windows, fs, **params)
+    return {
+        "end": np.arange(len(ir_windows)) * hop + window,
+        "heart_rate": heart_rate,
+        "spo2": spo2,
+        "ratio": ratio,
+        "valid": valid,
+    }
+
+
+def analyze(ir, red, fs=SAMPLE_RATE, **params):
+    """把整段数据作为一个窗口计算，返回 (心率, 血氧, 是否有效)，无效时为 (-1, -1, False)"""
+    if len(ir) < fs // 2 or len(ir) != len(red):
+        return -1, -1, False
+    result = analyze_windows(ir, red, len(ir), 1, fs, **params)
+    if not result["valid"][0]:
+        return -1, -1, False
+    return int(round(result["heart_rate"][0])), round(float(result["spo2"][0]), 2), True
+
+
+class PPGMonitor:
+    """
+    连续心率血氧估计
+    参数:
+        window: 分析窗口长度 (样本数)，默认 4 秒
+        hop: 每收到多少个新样本更新一次，默认 0.25 秒
+        max_age: 最近一次有效结果超过多少秒后不再返回
+        其余参数传给 analyze_windows (peak_ratio, min_regular, min_dc)
+    """
+
+    def __init__(self, fs=SAMPLE_RATE, window=4 * SAMPLE_RATE, hop=SAMPLE_RATE // 4, max_age=5.0, **params):
+        if not 1 <= hop <= window or window < fs // 2:
+            raise ValueError(f"窗口或步长无效: window={window}, hop={hop}")
+        self.fs = fs
+        self.window = window
+        self.hop = hop
+        self.max_age = max_age
+        self.params = params
+        self._lock = threading.Lock()
+        self._ir = np.empty(0)
+        self._red = np.empty(0)
+        self._start = 0           # _ir[0] 对应的样本序号
+        self.samples = 0
+        self._next_end = window   # 下一个窗口结束时的样本序号
+        self.windows = 0
+        self.valid_windows = 0
+        self.compute_time = 0.0
+        self._latest = None
+        self._last_valid = None
+        self._last_valid_time = None
+
+    def push(self, red, ir):
+        """加入新样本 (数组或列表)，返回这次更新的窗口数"""
+        red = np.asarray(red, dtype=float).ravel()
+        ir = np.asarray(ir, dtype=float).ravel()
+        with self._lock:
+            self._ir = np.concatenate([self._ir, ir])
+            self._red = np.concatenate([self._red, red])
+            self.samples += len(ir)
+            if self.samples < self._next_end:
+                return 0
+            last_end = self._next_end + (self.samples - self._next_end) // self.hop * self.hop
+            lo, hi = self._next_end - self.window - self._start, last_end - self._start
+            t0 = time.perf_counter()
+            result = analyze_windows(self._ir[lo:hi], self._red[lo:hi], self.window, self.hop, self.fs, **self.params)
+            self.compute_time += time.perf_counter() - t0
+            count = len(result["end"])
+            self.windows += count
+            self._latest = self._entry(result, count - 1)
+            valid = np.flatnonzero(result["valid"])
+            if len(valid):
+                self.valid_windows += len(valid)
+                self._last_valid = self._entry(result, valid[-1])
+                self._last_valid_time = time.monotonic()
+            self._next_end = last_end + self.hop
+            # 只保留下一个窗口需要的样本
+            keep = self._next_end - self.window - self._start
+            if keep > 0:
+                self._ir = self._ir[keep:]
+                self._red = self._red[keep:]
+                self._start += keep
+            return count
+
+    @staticmethod
+    def _entry(result, i):
+        return {
+            "heart_rate": int(round(result["heart_rate"][i])) if result["valid"][i] else None,
+            "spo2": round(float(result["spo2"][i]), 2) if result["valid"][i] else None,
+            "valid": bool(result["valid"][i]),
+        }
+
+    def latest(self, max_age=None):
+        """最近一次有效的 (心率, 血氧)；没有或已过期时返回 (None, None)"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if self._last_valid is None or time.monotonic() - self._last_valid_time > max_age:
+                return None, None
+            return self._last_valid["heart_rate"], self._last_valid["spo2"]
+
+    def reset(self):
+        """丢弃缓冲的样本和上次的结果 (例如样本不再连续、手指离开后重新放上)"""
+        with self._lock:
+            self._ir = np.empty(0)
+            self._red = np.empty(0)
+            self._start = self.samples
+            self._next_end = self.samples + self.window
+            self._last_valid = None
+            self._last_valid_time = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "samples": self.samples,
+                "windows": self.windows,
+                "valid_windows": self.valid_windows,
+                "window": self.window,
+                "hop": self.hop,
+                "latest": self._latest,
+                "compute_ms": round(self.compute_time / self.windows * 1e3, 3) if self.windows else None,
+            }
@@ -0,0 +1,43 @@
+# ppg_sim.py
+"""
+合成 MAX30102 PPG 波形，用于在没有传感器的机器上测试心率血氧计算
+每次心跳是一个收缩峰加一个较小、较晚的重搏波 (两个高斯脉冲)，心跳间隔带少量随机变化；
+红光和红外的交流 / 直流比按目标血氧反推 (R = (110 - SpO2) / 25，与 ppg.py 的公式一致)，
+再叠加呼吸引起的基线漂移和白噪声，输出 18 位 ADC 整数。
+"""
+import numpy as np
+
+from ppg import SAMPLE_RATE
+
+
+def synthetic_ppg(heart_rate=75.0, spo2=97.0, seconds=10.0, fs=SAMPLE_RATE, ir_dc=110000.0, red_dc=90000.0,
+                  perfusion=0.02, hrv=0.02, wander=0.5, noise=0.05, seed=0):
+    """
+    返回 (red, ir) 两个 int64 数组
+    参数:
+        perfusion: 红外交流幅度 / 直流
+        hrv: 心跳间隔的相对标准差
+        wander: 基线漂移幅度 (相对交流幅度)
+        noise: 白噪声标准差 (相对交流幅度)
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fs)
+    t = np.arange(n) / fs
+    period = 60.0 / heart_rate
+    beats = np.cumsum(period * (1.0 + hrv * rng.standard_normal(int(seconds / period) + 3))) - period
+    pulse = np.zeros(n)
+    width = 0.12 * min(period, 0.8) # 收缩峰宽度随心率变窄
+    for beat in beats:
+        pulse += np.exp(-0.5 * ((t - beat) / width) ** 2)
+        pulse += 0.35 * np.exp(-0.5 * ((t - beat - 0.35 * period) / (1.3 * width)) ** 2)
+    pulse -= pulse.mean()
+    pulse /= pulse.std()
+
+    ratio = (110.0 - spo2) / 25.0
+    baseline = wander * np.sin(2 * np.pi * 0.25 * t + rng.uniform(0, 2 * np.pi))
+    channels = []
+    for dc, relative in ((red_dc, ratio * perfusion), (ir_dc, perfusion)):
+        ac = dc * relative / np.sqrt(2.0) # pulse 已归一化为单位 RMS
+        signal = dc + ac * (pulse + baseline + noise * rng.standard_normal(n))
+        channels.append(np.clip(np.round(signal), 0, 0x3FFFF).astype(np.int64))
+    return channels[0], channels[1]
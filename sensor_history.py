@@ -0,0 +1,234 @@
+# sensor_history.py
+"""
+传感器历史数据
+采样先追加到预分配的 numpy 缓冲区，每 flush_interval 秒 (或缓冲区满) 在一个事务里批量写入 SQLite:
+    sensor_samples  - 原始采样，保留 raw_retention 秒
+    sensor_rollups  - 1 分钟 / 1 小时 / 1 天的 min/max/sum/count，写入时用 UPSERT 增量合并，永久保留
+                      (日汇总按本地日期划分，桶的时间戳为本地零点，与页面显示的本地时间对齐)
+区间查询按时间跨度自动选择分辨率，查询一年的数据只读取几百行日汇总，不扫描原始采样；
+尚未写入数据库的缓冲区数据也会合并进查询结果。
+"""
+import threading
+import time
+
+import numpy as np
+
+import models
+
+FIELDS = ("temperature", "humidity", "weight")
+RESOLUTIONS = (60, 3600, 86400) # 汇总粒度 (秒)
+DAY = 86400
+
+_UPSERT_ROLLUP = """
+INSERT INTO sensor_rollups (resolution, field, bucket, count, min, max, sum) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, field, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    sum = sum + excluded.sum
+"""
+
+
+def _local_midnight(day):
+    """本地日期 (自 1970-01-01 起的天数) 零点的时间戳"""
+    year, month, mday = time.gmtime(day * DAY)[:3]
+    return int(time.mktime((year, month, mday, 0, 0, 0, 0, 0, -1)))
+
+
+def bucket_starts(ts, resolution):
+    """
+    时间戳所在桶的起点
+    日汇总按本地日期划分 (本地零点，夏令时切换的日子为 23 / 25 小时)，其他分辨率按 UTC 对齐
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    if resolution < DAY:
+        return (ts // resolution).astype(np.int64) * resolution
+    # UTC 偏移只在整点变化，每个小时查一次本地时区
+    hours, inverse = np.unique((ts // 3600).astype(np.int64), return_inverse=True)
+    offsets = np.array([time.localtime(int(h) * 3600).tm_gmtoff for h in hours])[inverse.reshape(-1)]
+    days, inverse = np.unique(((ts + offsets) // DAY).astype(np.int64), return_inverse=True)
+    return np.array([_local_midnight(int(d)) for d in days], dtype=np.int64)[inverse.reshape(-1)]
+
+
+def aggregate(ts, values, resolution):
+    """
+    把按时间升序排列的采样聚合到 resolution 秒的时间桶
+    参数:
+        ts: 时间戳数组 (n,)
+        values: 采样值 (n,)，NaN 表示缺失
+    返回:
+        (bucket, count, min, max, sum) 五个数组，只包含有有效采样的桶
+    """
+    buckets = bucket_starts(ts, resolution)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    # fmin / fmax 忽略 NaN，全部缺失的桶结果为 NaN，随后被过滤掉
+    mins = np.fmin.reduceat(values, starts)
+    maxs = np.fmax.reduceat(values, starts)
+    keep = counts > 0
+    return buckets[starts][keep], counts[keep], mins[keep], maxs[keep], sums[keep]
+
+
+class SensorHistory:
+    """
+    参数:
+        flush_interval: 缓冲区写入数据库的间隔 (秒)
+        capacity: 缓冲区行数，写满时立即写入
+        raw_retention: 原始采样保留时长 (秒)
+        max_points: 自动选择分辨率时每条曲线的最多点数
+    """
+
+    def __init__(self, flush_interval=60.0, capacity=1024, raw_retention=7 * 86400, max_points=600):
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.raw_retention = raw_retention
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = np.full((capacity, 1 + len(FIELDS)), np.nan)
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+        self.flushed_samples = 0
+        self.flush_seconds = 0.0
+
+    # --- 写入 ---
+    def append(self, ts, **values):
+        """追加一次采样 (缺失的字段记为 NaN)，到达写入间隔或缓冲区满时批量写入数据库"""
+        with self._lock:
+            if self._size and ts <= self._buffer[self._size - 1, 0]:
+                return # 时间戳必须递增 (系统时间回拨时丢弃)
+            row = self._buffer[self._size]
+            row[0] = ts
+            for i, field in enumerate(FIELDS, start=1):
+                value = values.get(field)
+                row[i] = np.nan if value is None else value
+            self._size += 1
+            due = self._size >= self.capacity or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _take(self):
+        with self._lock:
+            rows = self._buffer[:self._size].copy()
+            self._size = 0
+            self._last_flush = time.monotonic()
+            return rows
+
+    def flush(self):
+        """把缓冲区写入数据库：原始采样 + 各分辨率汇总的增量 UPSERT，在一个事务中完成"""
+        with self._flush_lock:
+            rows = self._take()
+            if not len(rows):
+                return 0
+            start = time.perf_counter()
+            ts = rows[:, 0]
+            rollups = []
+            for i, field in enumerate(FIELDS, start=1):
+                for resolution in RESOLUTIONS:
+                    for bucket, count, vmin, vmax, vsum in zip(*aggregate(ts, rows[:, i], resolution)):
+                        rollups.append((resolution, field, int(bucket), int(count),
+                                        float(vmin), float(vmax), float(vsum)))
+            samples = [(float(r[0]), *(None if np.isnan(v) else float(v) for v in r[1:])) for r in rows]
+
+            conn = models._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO sensor_samples (ts, temperature, humidity, weight) VALUES (?, ?, ?, ?)",
+                    samples)
+                cursor.executemany(_UPSERT_ROLLUP, rollups)
+                cursor.execute("DELETE FROM sensor_samples WHERE ts < ?", (float(ts[-1]) - self.raw_retention,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"传感器历史写入失败，丢弃 {len(rows)} 条采样: {e}")
+                return 0
+            finally:
+                conn.close()
+            self.flushes += 1
+            self.flushed_samples += len(rows)
+            self.flush_seconds += time.perf_counter() - start
+            return len(rows)
+
+    # --- 查询 ---
+    def choose_resolution(self, start, end):
+        """返回不超过 max_points 个点的最细分辨率，0 表示原始采样"""
+        span = max(0.0, end - start)
+        if span <= self.raw_retention and span / 2.0 <= self.max_points:
+            return 0
+        for resolution in RESOLUTIONS:
+            if span / resolution <= self.max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, field, start, end, resolution=None):
+        """
+        查询 [start, end) 区间的数据
+        返回:
+            {"field", "resolution", "points": [[ts, min, max, avg], ...]}，原始采样时 min = max = avg
+        """
+        if field not in FIELDS:
+            raise ValueError(f"未知的传感器字段: {field}，可选: {', '.join(FIELDS)}")
+        if resolution is None:
+            resolution = self.choose_resolution(start, end)
+        elif resolution != 0 and resolution not in RESOLUTIONS:
+            raise ValueError(f"不支持的分辨率: {resolution}，可选: 0, {', '.join(map(str, RESOLUTIONS))}")
+
+        conn = models._connect()
+        try:
+            cursor = conn.cursor()
+            if resolution == 0:
+                cursor.execute(f"SELECT ts, {field} FROM sensor_samples WHERE ts >= ? AND ts < ? "
+                               f"AND {field} IS NOT NULL ORDER BY ts", (start, end))
+                points = {ts: [ts, v, v, v, 1] for ts, v in cursor.fetchall()}
+            else:
+                cursor.execute("SELECT bucket, min, max, sum, count FROM sensor_rollups "
+                               "WHERE resolution = ? AND field = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                               (resolution, field, int(bucket_starts([start], resolution)[0]), end))
+                points = {b: [b, vmin, vmax, vsum, count] for b, vmin, vmax, vsum, count in cursor.fetchall()}
+        finally:
+            conn.close()
+
+        self._merge_pending(points, field, start, end, resolution)
+        result = []
+        for key in sorted(points):
+            ts, vmin, vmax, vsum, count = points[key]
+            avg = vsum if resolution == 0 else vsum / count
+            result.append([ts, round(vmin, 3), round(vmax, 3), round(avg, 3)])
+        return {"field": field, "resolution": resolution, "points": result}
+
+    def _merge_pending(self, points, field, start, end, resolution):
+        """把尚未写入数据库的缓冲区数据并入查询结果"""
+        with self._lock:
+            rows = self._buffer[:self._size].copy()
+        if not len(rows):
+            return
+        rows = rows[(rows[:, 0] >= start) & (rows[:, 0] < end)]
+        if not len(rows):
+            return
+        values = rows[:, 1 + FIELDS.index(field)]
+        if resolution == 0:
+            for ts, v in zip(rows[:, 0], values):
+                if not np.isnan(v):
+                    points[float(ts)] = [float(ts), float(v), float(v), float(v), 1]
+            return
+        for bucket, count, vmin, vmax, vsum in zip(*aggregate(rows[:, 0], values, resolution)):
+            bucket = int(bucket)
+            if bucket in points:
+                p = points[bucket]
+                points[bucket] = [bucket, min(p[1], vmin), max(p[2], vmax), p[3] + vsum, p[4] + count]
+            else:
+                points[bucket] = [bucket, float(vmin), float(vmax), float(vsum), int(count)]
+
+    def stats(self):
+        with self._lock:
+            pending = self._size
+        return {
+            "pending": pending,
+            "flushes": self.flushes,
+            "flushed_samples": self.flushed_samples,
+            "avg_flush_ms": round(self.flush_seconds / self.flushes * 1000, 2) if self.flushes else 0.0,
+        }
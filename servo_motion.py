@@ -0,0 +1,99 @@
+# servo_motion.py
+"""
+舵机运动曲线
+运动曲线是一串 (角度, 停留秒数) 步骤，由 ServoController.play 依次执行:
+    ramp_profile      - 平滑 (smoothstep) 加减速地从一个角度转到另一个角度，减少冲击和猫粮飞溅
+    agitation_profile - 在某个角度附近来回抖动几次，疏通卡住的猫粮
+ServoController 持有舵机 PWM，并记录当前角度；绑定执行器线程后，其他线程直接驱动舵机会抛出 RuntimeError，
+保证所有舵机指令都经过执行器队列串行执行。
+"""
+import threading
+import time
+
+import numpy as np
+
+
+def ramp_profile(start, end, duration=0.3, step=0.02):
+    """从 start 平滑转到 end，用时约 duration 秒；duration 为 0 时直接跳到 end"""
+    steps = max(1, int(round(duration / step)))
+    if duration <= 0 or start == end:
+        return [(float(end), 0.0)]
+    s = np.linspace(0.0, 1.0, steps + 1)[1:]
+    angles = start + (end - start) * s * s * (3.0 - 2.0 * s)
+    return [(float(angle), duration / steps) for angle in angles]
+
+
+def agitation_profile(center, amplitude=15.0, pulses=3, period=0.16, low=0.0, high=180.0):
+    """以 center 为中心抖动 pulses 次，最后回到 center"""
+    up = min(high, center + amplitude)
+    down = max(low, center - amplitude)
+    profile = []
+    for _ in range(pulses):
+        profile += [(float(up), period / 2), (float(down), period / 2)]
+    return profile + [(float(center), period / 2)]
+
+
+class ServoController:
+    """
+    参数:
+        pwm: RPi.GPIO.PWM 对象 (已 start)
+        min_duty / max_duty: 0 度和 180 度对应的占空比 (%)
+        settle: 单步指令后等待舵机到位的时间 (秒)
+    """
+
+    def __init__(self, pwm, min_duty=2.5, max_duty=12.5, settle=0.1, sleep=time.sleep):
+        self.pwm = pwm
+        self.min_duty = min_duty
+        self.max_duty = max_duty
+        self.settle = settle
+        self.sleep = sleep
+        self.angle = None # 未知 (启动后还没有发过指令)
+        self.owner = None
+        self.commands = 0
+
+    def bind(self, thread):
+        """只允许 thread 驱动舵机 (执行器线程)"""
+        self.owner = thread
+
+    def _check_owner(self):
+        if self.owner is not None and threading.current_thread() is not self.owner:
+            raise RuntimeError(f"舵机由 {self.owner.name} 线程独占，请通过执行器提交动作")
+
+    def _write(self, angle):
+        if not 0 <= angle <= 180:
+            raise ValueError(f"舵机角度超出范围: {angle}")
+        self.pwm.ChangeDutyCycle(self.min_duty + angle / 180.0 * (self.max_duty - self.min_duty))
+        self.angle = angle
+        self.commands += 1
+
+    def play(self, profile, abort=None):
+        """执行运动曲线；abort (threading.Event) 被设置时停在当前步骤，返回是否完整执行"""
+        self._check_owner()
+        for angle, dwell in profile:
+            if abort is not None and abort.is_set():
+                return False
+            self._write(angle)
+            if dwell:
+                self.sleep(dwell)
+        return True
+
+    def move(self, angle, duration=0.0):
+        """转到 angle；duration > 0 且当前角度已知时按平滑曲线转动，最后等待 settle 秒到位"""
+        start = self.angle if self.angle is not None else angle
+        self.play(ramp_profile(start, angle, duration) if duration > 0 else [(angle, 0.0)])
+        self.sleep(self.settle)
+
+    def agitate(self, center=None, **kwargs):
+        center = self.angle if center is None else center
+        self.play(agitation_profile(center, **kwargs))
+
+    def release(self):
+        """停止输出脉冲 (占空比 0)，舵机保持当前位置且不再抖动"""
+        self.pwm.ChangeDutyCycle(0)
+
+    def stats(self):
+        return {
+            "angle": round(self.angle, 1) if self.angle is not None else None,
+            "commands": self.commands,
+            "owner": self.owner.name if self.owner is not None else None,
+        }
@@ -36,6 +36,7 @@ document.addEventListener('DOMContentLoaded', () => {
     let catDetectionState = false; // Current cat detection status
     let currentWeight = null; // Current food weight in kg
     let isSwitchingMode = false; // Flag to prevent state override during switch
+    let pendingState = null; // Latest snapshot skipped during a mode switch
 
     // 健康监测元素
     const heartRateElement = document.getElementById('heart-rate');
@@ -96,6 +97,66 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // --- 执行器任务: /api/feed 立即返回 job_id，结果由 job 事件推送 (事件流不可用时轮询查询) ---
+    const jobWaiters = new Map(); // job id -> resolve 函数
+    const FINISHED_JOB_STATUSES = ['done', 'failed', 'cancelled'];
+
+    function handleJobEvent(job) {
+        const resolve = jobWaiters.get(job.id);
+        if (resolve && FINISHED_JOB_STATUSES.includes(job.status)) {
+            resolve(job);
+        }
+    }
+
+    function waitForJob(jobId, timeoutMs = 30000) {
+        return new Promise((resolve, reject) => {
+            const started = Date.now();
+            let timer = null;
+            const finish = (job) => {
+                clearInterval(timer);
+                jobWaiters.delete(jobId);
+                resolve(job);
+            };
+            jobWaiters.set(jobId, finish);
+            // 推送可能因为断线丢失，每秒再查询一次作为兜底
+            timer = setInterval(async () => {
+                if (Date.now() - started > timeoutMs) {
+                    clearInterval(timer);
+                    jobWaiters.delete(jobId);
+                    reject(new Error('喂食任务长时间未完成，请稍后查看喂食记录'));
+                    return;
+                }
+                try {
+                    const response = await fetch(`/api/jobs/${jobId}`);
+                    if (response.ok) {
+                        handleJobEvent(await response.json());
+                    }
+                } catch (error) {
+                    console.warn('查询任务状态失败:', error);
+                }
+            }, 1000);
+        });
+    }
+
+    // 发送喂食指令并等待执行结果，返回 { ok, message }
+    async function requestFeed(amount) {
+        const response = await fetch('/api/feed', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ amount: amount })
+        });
+        const result = await response.json();
+        if (response.status !== 202) {
+            return { ok: response.ok && result.status === 'success', message: result.message };
+        }
+        showMessage(result.message || '喂食指令已排队...', 'info');
+        const job = await waitForJob(result.job_id);
+        if (job.status === 'done') {
+            return { ok: job.result.ok, message: job.result.message };
+        }
+        return { ok: false, message: job.status === 'cancelled' ? '喂食任务已取消' : `喂食失败: ${job.error}` };
+    }
+
     // 自动喂食函数
     async function autoFeed() {
         const currentTime = Date.now();
@@ -110,14 +171,9 @@ document.addEventListener('DOMContentLoaded', () => {
             const feedAmountValue = parseFloat(defaultFeedAmount.value) || 30;
 
             showMessage('检测到猫咪且食物不足，自动喂食中...', 'info');
-            const response = await fetch('/api/feed', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ amount: feedAmountValue })
-            });
-            const result = await response.json();
+            const result = await requestFeed(feedAmountValue);
 
-            if (response.ok && result.status === 'success') {
+            if (result.ok) {
                 showMessage(result.message || '自动喂食成功!', 'success');
             } else {
                 showMessage(result.message || '自动喂食失败', 'error');
@@ -130,81 +186,123 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // --- Function to update sensor data and check conditions ---
-    async function updateSensorData() {
+    // --- Function to apply a state snapshot and check conditions ---
+    function applyState(data) {
         // If a mode switch is in progress, skip this update to avoid conflicts
         if (isSwitchingMode) {
-            console.log("模式切换进行中，跳过本次传感器数据更新");
+            // 只在状态变化时推送，跳过的快照不会重发，先保存下来等切换结束后再应用
+            console.log("模式切换进行中，暂存本次状态更新");
+            pendingState = data;
             return;
         }
 
+        // Update UI elements
+        temperatureElement.textContent = data.temperature !== null ? data.temperature.toFixed(1) : '--';
+        humidityElement.textContent = data.humidity !== null ? data.humidity.toFixed(1) : '--';
+        const weight = data.weight !== null ? data.weight : null;
+        weightElement.textContent = weight !== null ? weight.toFixed(3) : '--';
+        updateFoodLevel(weight);
+
+        catDetectionState = data.cat_detected === true;
+        if (data.cat_detected !== null) {
+            catDetectedElement.textContent = catDetectionState ? '检测到' : '未检测到';
+            catDetectedElement.className = catDetectionState ? 'detected' : 'not-detected';
+        } else {
+            catDetectedElement.textContent = '未知';
+            catDetectedElement.className = '';
+        }
+
+        // Update mode from server data ONLY if it exists AND differs from local state
+        if (data.mode && data.mode !== currentMode) {
+            console.log(`服务器模式 (${data.mode}) 与本地模式 (${currentMode}) 不同，进行更新`);
+            currentMode = data.mode;
+        }
+        updateModeUI();
+
+        // 更新喂食计划列表（如果存在）
+        if (data.schedules) {
+            updateSchedulesList(data.schedules);
+        }
+
+        // Check auto feed condition AFTER all state is potentially updated
+        checkAutoFeedCondition();
+    }
+
+    // --- Function to show the result of a scheduled feed pushed by the server ---
+    function handleFeedEvent(data) {
+        if (!data.scheduled_feed) return;
+        if (data.feed_success) {
+            showMessage(data.feed_message || `定时喂食计划触发，正在喂食 ${data.feed_amount}g 猫粮...`, 'success');
+            lastFeedingTime = Date.now();
+        } else if (data.feed_cooldown) {
+            showMessage(data.feed_message || `喂食冷却中，还需等待 ${data.cooldown_time} 秒`, 'info');
+        } else {
+            showMessage(data.feed_message || '定时喂食失败', 'error');
+        }
+    }
+
+    function showSensorError() {
+        temperatureElement.textContent = '错误';
+        humidityElement.textContent = '错误';
+        weightElement.textContent = '错误';
+        catDetectedElement.textContent = '错误';
+    }
+
+    // --- Function to fetch the current state once (initial load and polling fallback) ---
+    async function updateSensorData() {
         try {
             const response = await fetch('/api/sensor_data');
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const data = await response.json();
-
-            // Update UI elements
-            temperatureElement.textContent = data.temperature !== null ? data.temperature.toFixed(1) : '--';
-            humidityElement.textContent = data.humidity !== null ? data.humidity.toFixed(1) : '--';
-            const weight = data.weight !== null ? data.weight : null;
-            weightElement.textContent = weight !== null ? weight.toFixed(3) : '--';
-            updateFoodLevel(weight);
-
-            catDetectionState = data.cat_detected === true;
-            if (data.cat_detected !== null) {
-                catDetectedElement.textContent = catDetectionState ? '检测到' : '未检测到';
-                catDetectedElement.className = catDetectionState ? 'detected' : 'not-detected';
-            } else {
-                catDetectedElement.textContent = '未知';
-                catDetectedElement.className = '';
-            }
-
-            // Update mode from server data ONLY if it exists AND differs from local state
-            // AND a mode switch isn't currently in progress
-            if (data.mode && data.mode !== currentMode) {
-                console.log(`服务器模式 (${data.mode}) 与本地模式 (${currentMode}) 不同，进行更新`);
-                currentMode = data.mode;
-                updateModeUI(); // Update UI based on server state
-            } else {
-                // Ensure UI reflects current local state even if server matches
-                updateModeUI();
-            }
+            applyState(await response.json());
+        } catch (error) {
+            console.error("无法获取传感器数据:", error);
+            showSensorError();
+        }
+    }
 
-            // 更新喂食计划列表（如果存在）
-            if (data.schedules) {
-                updateSchedulesList(data.schedules);
-            }
+    // --- Subscribe to server push; fall back to polling when EventSource is unavailable ---
+    let pollTimer = null;
 
-            // 检查是否有定时喂食需要执行
-            if (data.scheduled_feed && currentMode === 'auto') {
-                if (data.feed_success) {
-                    // 喂食成功
-                    showMessage(data.feed_message || `定时喂食计划触发，正在喂食 ${data.feed_amount}g 猫粮...`, 'success');
-                    lastFeedingTime = Date.now();
-                } else if (data.feed_cooldown) {
-                    // 喂食冷却中
-                    showMessage(data.feed_message || `喂食冷却中，还需等待 ${data.cooldown_time} 秒`, 'info');
-                } else if (data.feed_message) {
-                    // 其他喂食相关消息
-                    showMessage(data.feed_message, data.feed_success ? 'success' : 'error');
-                } else {
-                    // 兜底消息
-                    showMessage(`定时喂食计划触发，正在喂食 ${data.feed_amount}g 猫粮...`, 'info');
-                }
-            }
+    function startPolling() {
+        if (pollTimer === null) {
+            console.log('使用轮询获取状态');
+            pollTimer = setInterval(updateSensorData, 3000);
+        }
+    }
 
-            // Check auto feed condition AFTER all state is potentially updated
-            checkAutoFeedCondition();
+    function stopPolling() {
+        if (pollTimer !== null) {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        }
+    }
 
-        } catch (error) {
-            console.error("无法获取传感器数据:", error);
-            temperatureElement.textContent = '错误';
-            humidityElement.textContent = '错误';
-            weightElement.textContent = '错误';
-            catDetectedElement.textContent = '错误';
+    function subscribeEvents() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
         }
+        const source = new EventSource('/api/events');
+        source.addEventListener('state', (event) => {
+            stopPolling();
+            applyState(JSON.parse(event.data));
+        });
+        source.addEventListener('feed', (event) => {
+            handleFeedEvent(JSON.parse(event.data));
+        });
+        source.addEventListener('job', (event) => {
+            handleJobEvent(JSON.parse(event.data));
+        });
+        source.onerror = () => {
+            // 浏览器会自动重连；连接断开期间先用轮询保持页面更新
+            console.warn('事件流连接中断，正在重连...');
+            if (source.readyState === EventSource.CLOSED) {
+                showSensorError();
+            }
+            startPolling();
+        };
     }
 
     // Function to update the mode switch UI based on currentMode variable
@@ -256,14 +354,9 @@ document.addEventListener('DOMContentLoaded', () => {
             // 获取自定义喂食量
             const feedAmountValue = parseFloat(feedAmount.value) || 30;
 
-            const response = await fetch('/api/feed', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ amount: feedAmountValue })
-            });
-            const result = await response.json();
+            const result = await requestFeed(feedAmountValue);
 
-            if (response.ok && result.status === 'success') {
+            if (result.ok) {
                 showMessage(result.message || '喂食成功!', 'success');
                 lastFeedingTime = Date.now();
             } else {
@@ -344,6 +437,11 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log("切换操作完成，重置状态标志");
             setTimeout(() => {
                 isSwitchingMode = false;
+                if (pendingState !== null) {
+                    const data = pendingState;
+                    pendingState = null;
+                    applyState(data);
+                }
             }, 500); // 增加短暂延迟，避免过快重置
         }
     }
@@ -580,8 +678,8 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log(`初始化模式设置为: ${currentMode}`);
             console.log("初始化后开关状态:", modeSwitch.checked);
 
-            // Start periodic updates AFTER initial load
-            setInterval(updateSensorData, 3000);
+            // Receive state changes from the server AFTER initial load
+            subscribeEvents();
 
             // Initialize health data simulation
             simulateHealthData();
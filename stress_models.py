@@ -0,0 +1,98 @@
+# stress_models.py
+"""
+并发压力测试：多个线程同时调用 models.log_feeding 和 models.get_user_setting
+模拟 Flask threaded=True 下多个请求同时读写数据库，结束后检查:
+    - 没有任何调用失败 (log_feeding 返回 False 或读取到默认值都算失败，通常是 "database is locked")
+    - feeding_logs 中的行数与成功写入次数一致
+在临时目录中创建数据库，不会影响 catfeeder.db。
+
+用法:
+    python stress_models.py --threads 32 --seconds 5 --write-ratio 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="models.py 并发压力测试")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3, help="log_feeding 调用所占比例")
+    parser.add_argument("--pool-size", type=int, default=None)
+    parser.add_argument("--async-writes", action="store_true", help="通过后台写入队列记录喂食")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="catfeeder-stress-")
+    models.configure(os.path.join(workdir, "catfeeder.db"), pool_size=args.pool_size)
+    models.init_db()
+    if args.async_writes:
+        models.start_write_queue()
+    ok, user_id = models.register_user("stress", "stress-password")
+    if not ok:
+        print(f"创建测试用户失败: {user_id}")
+        sys.exit(1)
+
+    counts = {"writes": 0, "reads": 0, "write_errors": 0, "read_errors": 0}
+    counts_lock = threading.Lock()
+    stop = threading.Event()
+    barrier = threading.Barrier(args.threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = dict.fromkeys(counts, 0)
+        barrier.wait()
+        while not stop.is_set():
+            if rng.random() < args.write_ratio:
+                if models.log_feeding(user_id, rng.choice([10, 20, 30]), "manual"):
+                    local["writes"] += 1
+                else:
+                    local["write_errors"] += 1
+            else:
+                # 注册时写入了默认值 "30"，读到 None 说明查询失败
+                if models.get_user_setting(user_id, "default_feed_amount") == "30":
+                    local["reads"] += 1
+                else:
+                    local["read_errors"] += 1
+        with counts_lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if args.async_writes:
+        print(f"写入队列: {models.write_queue_stats()}")
+        models.stop_write_queue() # 写完剩余记录后再统计行数
+
+    logged = len(models.get_feeding_logs(user_id, limit=10 ** 9))
+    print(f"{args.threads} 线程 {elapsed:.1f}s: 写入 {counts['writes']} 次 ({counts['writes'] / elapsed:.0f}/s), "
+          f"读取 {counts['reads']} 次 ({counts['reads'] / elapsed:.0f}/s)")
+    print(f"失败: 写入 {counts['write_errors']}, 读取 {counts['read_errors']}; 连接池 {models.pool_stats()}")
+
+    failures = []
+    if counts["write_errors"] or counts["read_errors"]:
+        failures.append("存在失败的调用")
+    if logged != counts["writes"]:
+        failures.append(f"feeding_logs 行数 {logged} 与成功写入次数 {counts['writes']} 不一致")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
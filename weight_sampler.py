@@ -0,0 +1,269 @@
+# weight_sampler.py
+"""
+HX711 连续采样引擎
+专用采集线程以 HX711 的原生输出速率 (10 / 80 SPS) 连续读取重量，每个采样依次经过:
+    滑动中位数 - 剔除猫碰到碗造成的尖峰
+    EMA / 一维卡尔曼 - 在中位数输出上平滑噪声
+每个采样到达时滤波器只做一次增量更新，读取方拿到的是已经算好的最新估计 (O(1)，不阻塞、不接触硬件)。
+原始值和各级滤波结果写入固定大小的 numpy 环形缓冲区，供调试曲线和喂食控制使用。
+
+数据源只需提供 getWeight() (克，失败返回 None / False)，HX711 对象可以直接使用；
+SimulatedHX711 回放录制的采样，便于在没有硬件的机器上测试。
+"""
+import bisect
+import collections
+import threading
+import time
+
+import numpy as np
+
+FILTERS = ("raw", "median", "ema", "kalman")
+_COLUMNS = ("ts",) + FILTERS
+
+
+class StreamingMedian:
+    """固定窗口的滑动中位数：有序窗口 + 二分插入/删除，窗口很小 (默认 5) 时每个采样只是几次比较"""
+
+    def __init__(self, window=5):
+        if window < 1:
+            raise ValueError(f"中位数窗口必须 >= 1: {window}")
+        self.window = window
+        self._fifo = collections.deque()
+        self._sorted = []
+
+    def update(self, value):
+        if len(self._fifo) == self.window:
+            old = self._fifo.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._fifo.append(value)
+        bisect.insort(self._sorted, value)
+        n = len(self._sorted)
+        mid = n // 2
+        return self._sorted[mid] if n % 2 else (self._sorted[mid - 1] + self._sorted[mid]) / 2.0
+
+    def reset(self):
+        self._fifo.clear()
+        self._sorted.clear()
+
+
+class EMA:
+    """指数移动平均，alpha 越大跟随越快"""
+
+    def __init__(self, alpha=0.2):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError(f"EMA alpha 必须在 (0, 1] 之间: {alpha}")
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+
+class Kalman1D:
+    """
+    一维卡尔曼滤波 (随机游走模型)
+    参数:
+        q: 过程噪声方差 (克^2/采样)，越大越快跟上真实重量的变化
+        r: 测量噪声方差 (克^2)，取传感器静止时读数的方差
+    """
+
+    def __init__(self, q=0.05, r=4.0):
+        self.q = q
+        self.r = r
+        self.value = None
+        self.p = r
+
+    def update(self, value):
+        if self.value is None:
+            self.value, self.p = value, self.r
+            return value
+        p = self.p + self.q
+        gain = p / (p + self.r)
+        self.value += gain * (value - self.value)
+        self.p = (1.0 - gain) * p
+        return self.value
+
+    def reset(self):
+        self.value = None
+        self.p = self.r
+
+
+class SimulatedHX711:
+    """
+    回放录制的重量采样 (克) 的 HX711 替身
+    参数:
+        samples: 采样序列，NaN 表示一次读取失败
+        rate: 回放速率 (采样/秒)，None 表示不等待、尽快回放
+        loop: 回放完后是否从头开始；否则之后的读取一直返回最后一个值
+    """
+
+    def __init__(self, samples, rate=10.0, loop=False):
+        self.samples = np.asarray(samples, dtype=np.float64)
+        if not len(self.samples):
+            raise ValueError("回放采样为空")
+        self.rate = rate
+        self.loop = loop
+        self.index = 0
+        self._next = time.monotonic()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """从文本文件加载录制的采样 (每行一个值，或 CSV 的最后一列)"""
+        data = np.loadtxt(path, delimiter="," if path.endswith(".csv") else None, ndmin=2)
+        return cls(data[:, -1], **kwargs)
+
+    @property
+    def exhausted(self):
+        return not self.loop and self.index >= len(self.samples)
+
+    def getWeight(self):
+        if self.rate:
+            # 模拟 HX711 的转换周期：每个采样要等到下一次 DOUT 就绪
+            self._next += 1.0 / self.rate
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._next = time.monotonic()
+        if self.index >= len(self.samples):
+            if not self.loop:
+                return float(self.samples[-1])
+            self.index = 0
+        value = self.samples[self.index]
+        self.index += 1
+        return None if np.isnan(value) else float(value)
+
+
+class WeightSampler:
+    """
+    参数:
+        source: 提供 getWeight() 的数据源 (HX711 或 SimulatedHX711)
+        capacity: 环形缓冲区行数
+        median_window / ema_alpha / kalman_q / kalman_r: 滤波参数
+        max_age: 最新估计超过多少秒没有更新就视为失效 (latest 返回 None)
+    """
+
+    def __init__(self, source, capacity=1024, median_window=5, ema_alpha=0.2,
+                 kalman_q=0.05, kalman_r=4.0, max_age=2.0):
+        self.source = source
+        self.capacity = capacity
+        self.max_age = max_age
+        self.median = StreamingMedian(median_window)
+        self.ema = EMA(ema_alpha)
+        self.kalman = Kalman1D(kalman_q, kalman_r)
+        self._lock = threading.Lock()
+        self._new_sample = threading.Condition(self._lock)
+        self._buffer = np.full((capacity, len(_COLUMNS)), np.nan)
+        self._count = 0 # 写入过的采样总数，写指针 = _count % capacity
+        self._latest = dict.fromkeys(FILTERS)
+        self._latest_time = None
+        self.offset = 0.0 # 去皮偏移 (克)，在滤波之前扣除
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="weight-sampler", daemon=True)
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread.start()
+        return self
+
+    # --- 采集线程 ---
+    def _run(self):
+        while not self._closed:
+            try:
+                value = self.source.getWeight()
+            except Exception as e:
+                print(f"重量采样失败: {e}")
+                value = None
+                time.sleep(0.1)
+            if value is None or value is False:
+                with self._lock:
+                    self.errors += 1
+                continue
+            self.push(value)
+
+    def push(self, grams, ts=None):
+        """处理一个原始采样 (采集线程调用；测试时也可以直接喂数据)"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            raw = float(grams) - self.offset
+            med = self.median.update(raw)
+            ema = self.ema.update(med)
+            kalman = self.kalman.update(med)
+            row = self._buffer[self._count % self.capacity]
+            row[0], row[1], row[2], row[3], row[4] = ts, raw, med, ema, kalman
+            self._count += 1
+            self._latest = {"raw": raw, "median": med, "ema": ema, "kalman": kalman}
+            self._latest_time = time.monotonic()
+            self._new_sample.notify_all()
+
+    # --- 读取 ---
+    def latest(self, filter="kalman", max_age=None):
+        """返回最新的滤波估计 (克)；还没有采样或数据已过期时返回 None"""
+        if filter not in FILTERS:
+            raise ValueError(f"未知的滤波器: {filter}，可选: {', '.join(FILTERS)}")
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if self._latest_time is None or time.monotonic() - self._latest_time > max_age:
+                return None
+            return self._latest[filter]
+
+    def window(self, n=None):
+        """按时间顺序返回最近 n 个采样 (默认整个缓冲区)，结构化为 {列名: 数组}"""
+        with self._lock:
+            size = min(self._count, self.capacity)
+            n = size if n is None else min(n, size)
+            end = self._count % self.capacity
+            idx = (np.arange(end - n, end)) % self.capacity
+            rows = self._buffer[idx].copy()
+        return {name: rows[:, i] for i, name in enumerate(_COLUMNS)}
+
+    def wait_samples(self, n, timeout=5.0):
+        """等待 n 个新采样到达，超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._new_sample:
+            target = self._count + n
+            while self._count < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return False
+                self._new_sample.wait(remaining)
+        return True
+
+    def tare(self, samples=10, timeout=5.0):
+        """用接下来 samples 个原始采样的中位数作为新的零点，并重置滤波器"""
+        if not self.wait_samples(samples, timeout):
+            return False
+        raw = self.window(samples)["raw"]
+        with self._lock:
+            self.offset += float(np.median(raw))
+            self.median.reset()
+            self.ema.reset()
+            self.kalman.reset()
+            self._latest_time = None
+        return True
+
+    def close(self, timeout=2.0):
+        self._closed = True
+        with self._lock:
+            self._new_sample.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            age = time.monotonic() - self._latest_time if self._latest_time is not None else None
+            return {
+                "samples": self._count,
+                "errors": self.errors,
+                "rate": round(self._count / elapsed, 1) if elapsed > 0 else 0.0,
+                "offset": round(self.offset, 2),
+                "age": round(age, 3) if age is not None else None,
+                "latest": {k: (round(v, 2) if v is not None else None) for k, v in self._latest.items()},
+            }
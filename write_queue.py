@@ -0,0 +1,202 @@
+# write_queue.py
+"""
+异步批量写入队列
+调用方把 (SQL, 参数) 或同一事务的一组语句放入有界队列后立即返回，后台线程每 flush_interval 秒 (或攒够 max_batch 条)
+在一个事务中执行所有待写语句，多次插入只需要一次提交 / fsync，请求处理不再等待 SD 卡写入。
+队列满时调用方最多等待 put_timeout 秒，仍然放不进去则同步写入，保证记录不丢失。
+批量事务中某条语句出错时回滚后逐条记录重试，只丢弃出错的记录。
+"""
+import queue
+import threading
+import time
+
+
+class WriteQueue:
+    """
+    参数:
+        connect: 返回数据库连接的函数 (models._connect)
+        max_size: 队列容量
+        flush_interval: 最长攒批时间 (秒)
+        max_batch: 单个事务最多包含的记录数 (每条记录可以包含多条语句)
+    """
+
+    def __init__(self, connect, max_size=1000, flush_interval=1.0, max_batch=500, put_timeout=1.0):
+        self.connect = connect
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._put_lock = threading.Lock() # 检查 _closed 和放入队列在同一把锁内，close() 之后不会再有记录进入队列
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self.enqueued = 0
+        self.written = 0
+        self.sync_writes = 0
+        self.failed = 0 # 队列中写入失败的记录数
+        self.sync_failed = 0 # 同步写入失败的记录数 (不在队列中，flush 不等待这部分)
+        self.flushes = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def put(self, sql, params=()):
+        """放入一条待写语句，返回 True；队列已关闭或写入失败时返回 False"""
+        return self.put_many([(sql, params)])
+
+    def put_many(self, statements):
+        """放入一组必须在同一事务中写入的语句 [(sql, params), ...]"""
+        statements = list(statements)
+        deadline = time.monotonic() + self.put_timeout
+        queued = closed = False
+        if self._put_lock.acquire(timeout=self.put_timeout):
+            try:
+                closed = self._closed
+                if not closed:
+                    self._queue.put(statements, timeout=max(0.0, deadline - time.monotonic()))
+                    queued = True
+            except queue.Full:
+                pass
+            finally:
+                self._put_lock.release()
+        if queued:
+            with self._lock:
+                self.enqueued += 1
+                self.max_depth = max(self.max_depth, self._queue.qsize())
+            return True
+        if not closed:
+            # 后台线程跟不上 (例如 SD 卡卡顿)，退化为同步写入
+            with self._lock:
+                self.sync_writes += 1
+        return self._write_sync(statements)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _drain(self, first):
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None) # 交给主循环处理关闭
+                break
+            batch.append(item)
+        return batch
+
+    @staticmethod
+    def _execute(conn, batch):
+        cursor = conn.cursor()
+        for statements in batch:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+        conn.commit()
+
+    def _write_now(self, batch):
+        """
+        在一个事务中执行 batch (每项是一组语句)，返回 (写入的记录数, 丢弃的记录数)
+        事务失败时逐条记录重试，一条记录出错不会连累同批的其他记录
+        """
+        conn = self.connect()
+        try:
+            try:
+                self._execute(conn, batch)
+                return len(batch), 0
+            except Exception as e:
+                conn.rollback()
+                if len(batch) == 1:
+                    print(f"写入失败，丢弃 1 条记录: {e}")
+                    return 0, 1
+                print(f"批量写入失败，逐条重试 {len(batch)} 条记录: {e}")
+            failed = 0
+            for statements in batch:
+                try:
+                    self._execute(conn, [statements])
+                except Exception as e:
+                    conn.rollback()
+                    failed += 1
+                    print(f"写入失败，丢弃 1 条记录: {e}")
+            return len(batch) - failed, failed
+        finally:
+            conn.close()
+
+    def _write_sync(self, statements):
+        """在调用线程中写入一条记录，返回是否成功"""
+        written, failed = self._write_now([statements])
+        if failed:
+            with self._lock:
+                self.sync_failed += failed
+        return not failed
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        written, failed = self._write_now(batch)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self.written += written
+            self.failed += failed
+            self.flushes += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+            self._flushed.notify_all()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # 第一条语句到达后再等待 flush_interval，把这段时间内的写入合并到同一个事务
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue.qsize() < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.05))
+            self._flush(self._drain(item))
+
+    def flush(self, timeout=None):
+        """等待当前队列中的语句全部写入 (测试和关闭前使用)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            target = self.enqueued
+            while self.written + self.failed < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._flushed.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def close(self, timeout=10.0):
+        """停止接收新语句 (之后的写入改为同步)，写完队列中剩余的语句后退出"""
+        with self._put_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "sync_writes": self.sync_writes,
+                "failed": self.failed,
+                "sync_failed": self.sync_failed,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+                "max_flush_ms": round(self.max_flush_ms, 2),
+                "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            }